@@ -1,9 +1,18 @@
+from django.utils.decorators import method_decorator
 from django.views.generic.base import TemplateView
 
+from posts.pagecache import cache_anonymous
 
+ABOUT_CACHE_TIMEOUT = 60 * 60
+
+
+@method_decorator(cache_anonymous(timeout=ABOUT_CACHE_TIMEOUT),
+                  name='dispatch')
 class AboutAuthorView(TemplateView):
     template_name = 'app_name/about_author.html'
 
 
+@method_decorator(cache_anonymous(timeout=ABOUT_CACHE_TIMEOUT),
+                  name='dispatch')
 class AboutTechView(TemplateView):
     template_name = 'app_name/about_tech.html'
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .instrumentation import instrument_connection
+
+        autodiscover_modules('tasks')
+        connection_created.connect(
+            instrument_connection, dispatch_uid='core_instrumentation')
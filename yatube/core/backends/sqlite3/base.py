@@ -0,0 +1,34 @@
+from django.db.backends.sqlite3 import base
+
+from core.db import apply_pragmas
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с прагмами и режимом транзакций из OPTIONS.
+
+    OPTIONS['pragmas'] выполняются на каждом новом соединении,
+    OPTIONS['transaction_mode'] задаёт BEGIN IMMEDIATE для atomic():
+    запись берёт блокировку сразу и ждёт busy_timeout, а не падает
+    с «database is locked» при повышении блокировки чтения.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        apply_pragmas(connection, self.settings_dict['OPTIONS'].get(
+            'pragmas', {}))
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode and mode.upper() in TRANSACTION_MODES:
+            self.cursor().execute(f'BEGIN {mode.upper()}')
+        else:
+            super()._start_transaction_under_autocommit()
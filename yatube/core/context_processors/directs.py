@@ -0,0 +1,8 @@
+from posts.models import Conversation
+
+
+def directs_count(request):
+    """Число непрочитанных личных сообщений для значка в шапке."""
+    if not request.user.is_authenticated:
+        return {'directs_count': 0}
+    return {'directs_count': Conversation.unread_count(request.user.pk)}
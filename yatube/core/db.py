@@ -0,0 +1,100 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# journal_mode первым: от него зависит смысл synchronous.
+PRAGMA_ORDER = ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size',
+                'mmap_size', 'temp_store')
+
+
+def pragma_statements(pragmas):
+    order = {key: index for index, key in enumerate(PRAGMA_ORDER)}
+    return [
+        f'PRAGMA {key} = {value}'
+        for key, value in sorted(
+            pragmas.items(), key=lambda item: order.get(item[0], len(order)))
+    ]
+
+
+def apply_pragmas(connection, pragmas):
+    for statement in pragma_statements(pragmas):
+        connection.execute(statement)
+
+
+def connect(path, pragmas):
+    db = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(db, pragmas)
+    return db
+
+
+def prepare(path, pragmas, rows=5000):
+    db = connect(path, pragmas)
+    db.execute('CREATE TABLE IF NOT EXISTS stress (id INTEGER PRIMARY KEY, '
+               'worker INTEGER, payload TEXT)')
+    db.execute('BEGIN')
+    db.executemany('INSERT INTO stress (worker, payload) VALUES (?, ?)',
+                   [(-1, 'x' * 200)] * rows)
+    db.execute('COMMIT')
+    db.close()
+
+
+def write_loop(path, pragmas, begin, deadline, worker):
+    """Транзакции «прочитать, затем вставить» до deadline.
+
+    Возвращает (записей, ошибок).
+    """
+    db = connect(path, pragmas)
+    writes = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            db.execute(begin)
+            db.execute('SELECT count(*) FROM stress WHERE worker = ?',
+                       (worker,)).fetchone()
+            db.execute('INSERT INTO stress (worker, payload) VALUES (?, ?)',
+                       (worker, 'y' * 200))
+            db.execute('COMMIT')
+            writes += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+    db.close()
+    return writes, errors
+
+
+def read_loop(path, pragmas, deadline):
+    db = connect(path, pragmas)
+    errors = 0
+    while time.monotonic() < deadline:
+        try:
+            db.execute('SELECT count(*), max(length(payload)) '
+                       'FROM stress').fetchone()
+        except sqlite3.OperationalError:
+            errors += 1
+    db.close()
+    return 0, errors
+
+
+def stress(path, options, writers=4, readers=2, duration=2.0):
+    """Нагружает файл SQLite конкурентными записью и чтением.
+
+    Каждая запись — транзакция «прочитать, затем вставить», как
+    toggle_reaction или send_message. options — OPTIONS профиля базы.
+    Возвращает записей в секунду и число ошибок «database is locked».
+    Результат зависит от машины: это замер, а не проверка.
+    """
+    pragmas = options.get('pragmas', {})
+    begin = f'BEGIN {options.get("transaction_mode", "DEFERRED")}'
+    prepare(path, pragmas)
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(writers + readers) as pool:
+        futures = [
+            pool.submit(write_loop, path, pragmas, begin, deadline, number)
+            for number in range(writers)
+        ] + [
+            pool.submit(read_loop, path, pragmas, deadline)
+            for _ in range(readers)
+        ]
+    results = [future.result() for future in futures]
+    return (sum(writes for writes, _ in results) / duration,
+            sum(errors for _, errors in results))
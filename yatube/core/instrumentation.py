@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.template import base
+
+SAMPLE_SIZE = 500
+
+current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: запросы к БД и время отрисовки шаблонов."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+def count_queries(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    """Ставит count_queries на соединение при его открытии.
+
+    Метрики берутся из current, поэтому запросы async ORM, идущие
+    через sync_to_async по соединению своего потока, тоже считаются.
+    Обёртка встаёт первой, чтобы не мешать execute_wrapper() снаружи.
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.latency = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, metrics, latency):
+        self.requests += 1
+        self.queries += metrics.queries
+        self.max_queries = max(self.max_queries, metrics.queries)
+        self.db_time += metrics.db_time
+        self.template_time += metrics.template_time
+        self.latency += latency
+        self.samples.append(latency)
+
+    def percentile(self, fraction):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'queries_avg': round(self.queries / self.requests, 2),
+            'queries_max': self.max_queries,
+            'db_ms_avg': round(self.db_time / self.requests * 1000, 2),
+            'template_ms_avg': round(
+                self.template_time / self.requests * 1000, 2),
+            'latency_ms_avg': round(self.latency / self.requests * 1000, 2),
+            'latency_ms_p50': round(self.percentile(0.5) * 1000, 2),
+            'latency_ms_p95': round(self.percentile(0.95) * 1000, 2),
+        }
+
+
+class Registry:
+    """Сводная статистика по именам представлений внутри процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, metrics, latency):
+        with self.lock:
+            self.views.setdefault(view_name, ViewStats()).add(
+                metrics, latency)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: stats.as_dict()
+                    for name, stats in sorted(self.views.items())}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+registry = Registry()
+
+_original_render = base.Template.render
+
+
+def _timed_render(self, context):
+    metrics = current.get()
+    if metrics is None:
+        return _original_render(self, context)
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += time.perf_counter() - started
+
+
+def install_template_timer():
+    """Оборачивает Template.render; вложенные include не суммируются."""
+    base.Template.render = _timed_render
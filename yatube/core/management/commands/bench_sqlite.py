@@ -0,0 +1,36 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import stress
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает профили SQLITE_PROFILES под конкурентной записью: '
+            'записей в секунду и ошибок «database is locked»')
+
+    def add_arguments(self, parser):
+        parser.add_argument('profiles', nargs='*',
+                            help='Профили, по умолчанию все')
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=2.0,
+                            help='Секунд на профиль')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or list(settings.SQLITE_PROFILES)
+        unknown = set(profiles) - set(settings.SQLITE_PROFILES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные профили: {", ".join(sorted(unknown))}')
+        for name in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                rate, errors = stress(
+                    os.path.join(directory, 'stress.sqlite3'),
+                    settings.SQLITE_PROFILES[name]['OPTIONS'],
+                    writers=options['writers'], readers=options['readers'],
+                    duration=options['duration'])
+            self.stdout.write(
+                f'{name:12} {rate:10.1f} записей/с  ошибок {errors}')
@@ -0,0 +1,110 @@
+import logging
+import os
+import socket
+import time
+from collections import Counter
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core import tasks
+
+logger = logging.getLogger(__name__)
+
+
+def run_task(task_id):
+    close_old_connections()
+    try:
+        return tasks.execute(task_id)
+    finally:
+        close_old_connections()
+
+
+def init_process():
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread')
+        parser.add_argument(
+            '--poll', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, секунды')
+        parser.add_argument(
+            '--visibility-timeout', type=int,
+            default=tasks.VISIBILITY_TIMEOUT,
+            help='Через сколько секунд зависшую задачу заберёт другой')
+        parser.add_argument(
+            '--purge-after', type=int, default=24,
+            help='Удалять выполненные задачи старше стольких часов')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить то, что есть в очереди, и выйти')
+
+    def handle(self, *args, **options):
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.metrics = Counter()
+        self.durations = 0.0
+        if options['pool'] == 'process':
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                options['concurrency'], initializer=init_process)
+        else:
+            executor = ThreadPoolExecutor(options['concurrency'])
+        try:
+            with executor:
+                self.loop(executor, options)
+        except KeyboardInterrupt:
+            pass
+        self.report()
+
+    def loop(self, executor, options):
+        running = set()
+        last_report = time.monotonic()
+        while True:
+            free = options['concurrency'] - len(running)
+            claimed = tasks.claim(
+                self.worker, free, options['visibility_timeout'])
+            running.update(
+                executor.submit(run_task, task_id) for task_id in claimed)
+            if not running:
+                if options['once']:
+                    return
+                tasks.purge(timedelta(hours=options['purge_after']))
+                time.sleep(options['poll'])
+                continue
+            done, running = wait(
+                running, timeout=options['poll'],
+                return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    status, duration = future.result()
+                except Exception:
+                    # Сбой учёта (например, «database is locked»): задача
+                    # осталась за воркером и вернётся в очередь по таймауту.
+                    logger.exception('Сбой при выполнении задачи')
+                    self.metrics['crashed'] += 1
+                    continue
+                self.metrics[status] += 1
+                self.durations += duration
+            if time.monotonic() - last_report > 60:
+                self.report()
+                last_report = time.monotonic()
+
+    def report(self):
+        processed = sum(self.metrics.values()) - self.metrics['crashed']
+        average = self.durations / processed if processed else 0
+        self.stdout.write(
+            f'{self.worker}: выполнено {self.metrics["done"]}, '
+            f'повтор {self.metrics["queued"]}, '
+            f'ошибок {self.metrics["failed"]}, '
+            f'сбоев {self.metrics["crashed"]}, '
+            f'среднее время {average:.3f} с'
+        )
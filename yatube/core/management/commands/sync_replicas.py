@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.replication import sync_replicas
+
+
+class Command(BaseCommand):
+    help = 'Копирует primary SQLite в файлы реплик (локальная «репликация»)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        while True:
+            synced = sync_replicas()
+            self.stdout.write(f'Обновлено реплик: {len(synced)}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
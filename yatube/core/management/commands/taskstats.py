@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, F
+
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Показывает состояние очереди фоновых задач'
+
+    def handle(self, *args, **options):
+        rows = (
+            Task.objects.values('name', 'status')
+            .annotate(
+                total=Count('id'),
+                wait=Avg(F('started_at') - F('created')),
+                run=Avg(F('finished_at') - F('started_at')),
+            )
+            .order_by('name', 'status')
+        )
+        for row in rows:
+            self.stdout.write(
+                '{name:40} {status:8} {total:6} '
+                'ожидание {wait} выполнение {run}'.format(**row))
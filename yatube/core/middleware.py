@@ -0,0 +1,149 @@
+import logging
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.db import connections
+
+from .instrumentation import (RequestMetrics, current, install_template_timer,
+                              instrument_connection, registry)
+from .routers import replicas, use_replica
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_pin'
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class InstrumentationMiddleware:
+    """Считает запросы к БД, время БД, шаблонов и ответа по view_name.
+
+    Пишет заголовок Server-Timing и проверяет бюджет запросов из
+    QUERY_BUDGETS: в строгом режиме превышение — исключение, иначе
+    предупреждение в лог.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_template_timer()
+        for alias in connections:
+            instrument_connection(connections[alias])
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return await sync_to_async(self.finish)(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        latency = metrics.elapsed
+        match = request.resolver_match
+        if match is None:
+            return response
+        registry.record(match.view_name, metrics, latency)
+        if self.show_timing(request):
+            response['Server-Timing'] = server_timing(metrics, latency)
+        self.check_budget(match.view_name, metrics.queries)
+        return response
+
+    def show_timing(self, request):
+        if getattr(settings, 'SERVER_TIMING', settings.DEBUG):
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_staff)
+
+    def check_budget(self, view_name, queries):
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is None or queries <= budget:
+            return
+        message = (f'{view_name}: {queries} запросов к БД '
+                   f'при бюджете {budget}')
+        if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ReplicaMiddleware:
+    """Включает чтение с реплик для представлений с @replica_reads.
+
+    После запроса с записью ставит короткую куку: пока она жива,
+    пользователь читает с primary и видит свои изменения.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request._replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if request._replica_token is not None:
+                use_replica.reset(request._replica_token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        request._replica_token = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            # process_view выполнялся через sync_to_async: токен создан
+            # в другом контексте, поэтому флаг просто снимается.
+            if request._replica_token is not None:
+                use_replica.set(False)
+        return self.pin(request, response)
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                and getattr(view_func, 'replica_reads', False)
+                and PIN_COOKIE not in request.COOKIES):
+            request._replica_token = use_replica.set(True)
+
+
+def server_timing(metrics, latency):
+    db = f'db;dur={metrics.db_time * 1000:.1f}'
+    return ', '.join((
+        f'{db};desc="{metrics.queries} queries"',
+        f'tpl;dur={metrics.template_time * 1000:.1f}',
+        f'total;dur={latency * 1000:.1f}',
+    ))
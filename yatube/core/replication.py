@@ -0,0 +1,28 @@
+import sqlite3
+
+from django.conf import settings
+from django.db import connections
+
+from .routers import PRIMARY, replicas
+
+
+def copy_database(source, target):
+    """Копирует SQLite-файл через backup API: снимок согласован."""
+    source_db = sqlite3.connect(source)
+    target_db = sqlite3.connect(target)
+    try:
+        source_db.backup(target_db)
+    finally:
+        target_db.close()
+        source_db.close()
+
+
+def sync_replicas():
+    """Переливает primary во все SQLite-реплики, возвращает их алиасы."""
+    source = settings.DATABASES[PRIMARY]['NAME']
+    synced = []
+    for alias in replicas():
+        connections[alias].close()
+        copy_database(source, settings.DATABASES[alias]['NAME'])
+        synced.append(alias)
+    return synced
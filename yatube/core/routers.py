@@ -0,0 +1,46 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+use_replica = ContextVar('use_replica', default=False)
+
+
+def replicas():
+    return tuple(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def replica_reads(view):
+    """Помечает представление только для чтения: оно читает с реплик."""
+    view.replica_reads = True
+    return view
+
+
+class ReplicaRouter:
+    """Чтение в помеченных представлениях — с реплики, остальное — с primary.
+
+    Запись всегда идёт в primary, даже для объектов, прочитанных
+    с реплики.
+    """
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and use_replica.get():
+            return random.choice(aliases)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
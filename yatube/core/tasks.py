@@ -0,0 +1,109 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_DELAY = 10
+VISIBILITY_TIMEOUT = 300
+
+
+def task(func=None, *, name=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Регистрирует функцию как фоновую задачу с методом delay()."""
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = func
+
+        def delay(run_at=None, **kwargs):
+            return enqueue(task_name, run_at=run_at,
+                           max_attempts=max_attempts, **kwargs)
+
+        func.task_name = task_name
+        func.delay = delay
+        return func
+    if func is not None:
+        return register(func)
+    return register
+
+
+def enqueue(name, run_at=None, max_attempts=DEFAULT_MAX_ATTEMPTS, **kwargs):
+    """Ставит задачу в очередь или, в режиме eager, сразу выполняет."""
+    if name not in registry:
+        raise KeyError(f'Неизвестная задача {name}')
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        registry[name](**kwargs)
+        return None
+    return Task.objects.create(
+        name=name,
+        payload=kwargs,
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def claim(worker, limit, visibility_timeout=VISIBILITY_TIMEOUT):
+    """Забирает готовые задачи, включая зависшие после таймаута."""
+    now = timezone.now()
+    available = (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    )
+    candidates = Task.objects.filter(available).order_by('run_at')
+    claimed = []
+    for task_id in candidates.values_list('pk', flat=True)[:limit]:
+        updated = Task.objects.filter(available, pk=task_id).update(
+            status=Task.RUNNING,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=visibility_timeout),
+            started_at=now,
+        )
+        if updated:
+            claimed.append(task_id)
+    return claimed
+
+
+def execute(task_id):
+    """Выполняет задачу и возвращает (статус, длительность в секундах)."""
+    task = Task.objects.get(pk=task_id)
+    task.attempts += 1
+    started = timezone.now()
+    try:
+        func = registry[task.name]
+        with transaction.atomic():
+            func(**task.payload)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            task.status = Task.QUEUED
+            task.run_at = timezone.now() + timedelta(
+                seconds=RETRY_DELAY * 2 ** (task.attempts - 1))
+        else:
+            task.status = Task.FAILED
+            logger.error('Задача %s #%s не выполнена', task.name, task.pk)
+    else:
+        task.status = Task.DONE
+    task.finished_at = timezone.now()
+    task.locked_until = None
+    task.save(update_fields=[
+        'attempts', 'status', 'run_at', 'last_error', 'finished_at',
+        'locked_until',
+    ])
+    return task.status, (task.finished_at - started).total_seconds()
+
+
+def purge(older_than):
+    """Удаляет выполненные задачи старше older_than."""
+    return Task.objects.filter(
+        status=Task.DONE,
+        finished_at__lt=timezone.now() - older_than,
+    ).delete()[0]
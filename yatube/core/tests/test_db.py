@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+
+class SqliteProfileTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        """Прагмы профиля выполняются на каждом новом соединении."""
+        pragmas = connection.settings_dict['OPTIONS']['pragmas']
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], pragmas['busy_timeout'])
+
+    def test_transaction_mode(self):
+        """transaction_mode превращает BEGIN в BEGIN IMMEDIATE."""
+        wrapper = connection.copy()
+        wrapper.settings_dict['OPTIONS'] = {
+            **wrapper.settings_dict['OPTIONS'],
+            'transaction_mode': 'immediate',
+        }
+        try:
+            with CaptureQueriesContext(wrapper) as captured:
+                wrapper._start_transaction_under_autocommit()
+            wrapper.cursor().execute('ROLLBACK')
+        finally:
+            wrapper.close()
+        self.assertIn('BEGIN IMMEDIATE',
+                      [query['sql'] for query in captured])
+
+
+class ProductionProfileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'production.sqlite3')
+        self.wrapper = self.connect()
+
+    def connect(self, **options):
+        profile = settings.SQLITE_PROFILES['production']
+        wrapper = connection.copy()
+        wrapper.settings_dict.update(
+            profile, NAME=self.path,
+            OPTIONS={**profile['OPTIONS'], **options})
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def read_then_write(self, wrapper, concurrent_write):
+        """Транзакция читает, пока другое соединение пишет, затем
+        сама пишет и фиксируется."""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS notes (id INTEGER PRIMARY KEY)')
+        wrapper._start_transaction_under_autocommit()
+        cursor = wrapper.cursor()
+        try:
+            cursor.execute('SELECT count(*) FROM notes').fetchone()
+            concurrent_write()
+            cursor.execute('INSERT INTO notes DEFAULT VALUES')
+            cursor.execute('COMMIT')
+        finally:
+            if wrapper.connection.in_transaction:
+                cursor.execute('ROLLBACK')
+
+    def pragma(self, name):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Файловая база в профиле production открывается в WAL
+        с его настройками."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+    def test_atomic_begins_immediate(self):
+        """atomic() в профиле production начинается с BEGIN IMMEDIATE."""
+        with CaptureQueriesContext(self.wrapper) as captured:
+            self.wrapper._start_transaction_under_autocommit()
+        self.wrapper.cursor().execute('ROLLBACK')
+        self.assertEqual(captured[-1]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_deferred_upgrade_fails(self):
+        """Без BEGIN IMMEDIATE чтение не может стать записью, если
+        между ними писало другое соединение."""
+        other = self.connect()
+
+        def write():
+            other.cursor().execute('INSERT INTO notes DEFAULT VALUES')
+
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            self.read_then_write(self.connect(transaction_mode=None), write)
+
+    def test_immediate_upgrade_waits_instead_of_failing(self):
+        """В профиле production читающая транзакция дописывает без
+        «database is locked», а параллельная запись ждёт её фиксации."""
+        errors = []
+        started = threading.Event()
+
+        def other_writer():
+            other = connection.copy()
+            other.settings_dict.update(
+                settings.SQLITE_PROFILES['production'], NAME=self.path)
+            try:
+                started.set()
+                other.cursor().execute('INSERT INTO notes DEFAULT VALUES')
+            except OperationalError as error:
+                errors.append(error)
+            finally:
+                other.close()
+
+        thread = threading.Thread(target=other_writer)
+
+        def write():
+            thread.start()
+            started.wait()
+
+        self.read_then_write(self.wrapper, write)
+        thread.join()
+        self.assertEqual(errors, [])
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM notes')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class BenchSqliteTests(SimpleTestCase):
+    def test_reports_every_profile(self):
+        """bench_sqlite печатает замер по каждому профилю."""
+        stdout = StringIO()
+        call_command('bench_sqlite', '--duration', '0.1', '--writers', '1',
+                     '--readers', '1', stdout=stdout)
+        for name in settings.SQLITE_PROFILES:
+            self.assertRegex(stdout.getvalue(),
+                             rf'{name} +[\d.]+ записей/с  ошибок \d+')
@@ -0,0 +1,92 @@
+import asyncio
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import ResolverMatch, reverse
+
+from core.instrumentation import registry
+from core.middleware import InstrumentationMiddleware, QueryBudgetExceeded
+from posts.models import Post
+
+User = get_user_model()
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='plain')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.client_ = Client()
+        cls.client_.force_login(cls.user)
+        cls.staff_client = Client()
+        cls.staff_client.force_login(cls.staff)
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        registry.reset()
+
+    def test_server_timing_for_staff(self):
+        """Server-Timing видят только сотрудники, если DEBUG выключен."""
+        response = self.staff_client.get(
+            reverse('posts:profile', args=('plain',)))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, '
+            r'total;dur=[\d.]+')
+        response = self.client_.get(
+            reverse('posts:profile', args=('plain',)))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_stats_endpoint(self):
+        """Сводка по представлениям доступна сотрудникам."""
+        self.client_.get(reverse('posts:post_search'), {'q': 'пост'})
+        self.client_.get(reverse('posts:post_search'), {'q': 'пост'})
+        self.assertEqual(
+            self.client_.get(reverse('request_stats')).status_code, 302)
+        stats = self.staff_client.get(reverse('request_stats')).json()
+        self.assertEqual(stats['posts:post_search']['requests'], 2)
+        self.assertGreater(stats['posts:post_search']['queries_max'], 0)
+        self.assertIn('latency_ms_p95', stats['posts:post_search'])
+
+    def test_budgets_are_strict_in_tests(self):
+        """Тестовый прогон включает строгий режим бюджетов."""
+        self.assertTrue(settings.QUERY_BUDGETS_STRICT)
+
+    @override_settings(QUERY_BUDGETS={'posts:post_search': 0},
+                       QUERY_BUDGETS_STRICT=True)
+    def test_budget_exceeded_fails_request(self):
+        """В строгом режиме превышение бюджета роняет запрос."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client_.get(reverse('posts:post_search'), {'q': 'пост'})
+
+    @override_settings(QUERY_BUDGETS={'posts:post_search': 0},
+                       QUERY_BUDGETS_STRICT=False)
+    def test_budget_exceeded_logs_warning(self):
+        """Без строгого режима превышение только пишется в лог."""
+        with self.assertLogs('core.middleware', 'WARNING'):
+            response = self.client_.get(
+                reverse('posts:post_search'), {'q': 'пост'})
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncInstrumentationTests(TransactionTestCase):
+    def setUp(self):
+        registry.reset()
+
+    def test_async_orm_queries_are_counted(self):
+        """Запросы async ORM из потока sync_to_async попадают в метрики."""
+        async def view(request):
+            await Post.objects.acount()
+            await User.objects.filter(is_staff=True).acount()
+            return HttpResponse('ok')
+
+        request = RequestFactory().get('/')
+        request.resolver_match = ResolverMatch(
+            view, (), {}, url_name='async_view', namespaces=['test'])
+        asyncio.run(InstrumentationMiddleware(view)(request))
+        stats = registry.snapshot()['test:async_view']
+        self.assertEqual((stats['requests'], stats['queries_max']), (1, 2))
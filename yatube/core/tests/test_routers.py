@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import tempfile
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import PIN_COOKIE, ReplicaMiddleware
+from core.replication import copy_database
+from core.routers import ReplicaRouter, replica_reads, use_replica
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.seen = []
+
+        @replica_reads
+        def feed(request):
+            self.seen.append(ReplicaRouter().db_for_read(Post))
+            return HttpResponse()
+
+        def create(request):
+            self.seen.append(ReplicaRouter().db_for_read(Post))
+            return HttpResponse()
+
+        self.views = {'/feed/': feed, '/create/': create}
+        self.middleware = ReplicaMiddleware(self.dispatch)
+        self.factory = RequestFactory()
+
+    def dispatch(self, request):
+        view = self.views[request.path]
+        self.middleware.process_view(request, view, (), {})
+        return view(request)
+
+    def test_read_only_view_reads_from_replica(self):
+        """GET помеченного представления читает с реплики."""
+        self.middleware(self.factory.get('/feed/'))
+        self.middleware(self.factory.get('/create/'))
+        self.assertEqual(self.seen, ['replica1', 'default'])
+        self.assertFalse(use_replica.get())
+
+    def test_writes_go_to_primary(self):
+        """Запись всегда в primary."""
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(ReplicaRouter().db_for_write(Post), 'default')
+        finally:
+            use_replica.reset(token)
+
+    def test_read_your_writes_after_post(self):
+        """После POST пользователь какое-то время читает с primary."""
+        response = self.middleware(self.factory.post('/create/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        request = self.factory.get('/feed/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.middleware(request)
+        self.assertEqual(self.seen, ['default', 'default'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё идёт в default и куку не ставим."""
+        response = self.middleware(self.factory.post('/create/'))
+        self.middleware(self.factory.get('/feed/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.seen, ['default', 'default'])
+
+
+class CopyReplicationTests(SimpleTestCase):
+    def test_copy_database(self):
+        """Копия SQLite-файла содержит данные primary."""
+        with tempfile.TemporaryDirectory() as directory:
+            primary = os.path.join(directory, 'primary.sqlite3')
+            replica = os.path.join(directory, 'replica.sqlite3')
+            db = sqlite3.connect(primary)
+            db.execute('CREATE TABLE item (name TEXT)')
+            db.execute("INSERT INTO item VALUES ('первый')")
+            db.commit()
+            db.close()
+            copy_database(primary, replica)
+            db = sqlite3.connect(replica)
+            self.assertEqual(
+                db.execute('SELECT name FROM item').fetchall(),
+                [('первый',)])
+            db.close()
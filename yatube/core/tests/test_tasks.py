@@ -0,0 +1,84 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Task
+
+calls = []
+
+
+@tasks.task(max_attempts=2)
+def remember(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@tasks.task
+def vanish():
+    Task.objects.filter(name=vanish.task_name).delete()
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_failed_task_is_retried_then_failed(self):
+        """Ошибка ведёт к повтору с задержкой, затем к статусу failed."""
+        task = explode.delay()
+        status, _ = tasks.execute(task.pk)
+        task.refresh_from_db()
+        self.assertEqual(status, Task.QUEUED)
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('boom', task.last_error)
+        self.assertEqual(tasks.claim('test', 10), [])
+        status, _ = tasks.execute(task.pk)
+        self.assertEqual(status, Task.FAILED)
+
+    def test_visibility_timeout(self):
+        """Зависшую задачу забирает другой воркер после таймаута."""
+        task = remember.delay(value=2)
+        self.assertEqual(tasks.claim('first', 10), [task.pk])
+        self.assertEqual(tasks.claim('second', 10), [])
+        Task.objects.filter(pk=task.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(tasks.claim('second', 10), [task.pk])
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode(self):
+        """В режиме eager задача выполняется сразу."""
+        self.assertIsNone(remember.delay(value=3))
+        self.assertEqual(calls, [3])
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class RunWorkerTests(TransactionTestCase):
+    def test_delay_stores_task_and_worker_runs_it(self):
+        """delay() кладёт задачу в таблицу, runworker --once её выполняет."""
+        calls.clear()
+        remember.delay(value=1)
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+        call_command('runworker', '--once', stdout=StringIO())
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_worker_survives_bookkeeping_error(self):
+        """Сбой учёта задачи пишется в лог, воркер продолжает работу."""
+        calls.clear()
+        vanish.delay()
+        remember.delay(value=4)
+        stdout = StringIO()
+        with self.assertLogs('core.management.commands.runworker', 'ERROR'):
+            call_command('runworker', '--once', '--concurrency', '1',
+                         stdout=stdout)
+        self.assertEqual(calls, [4])
+        self.assertIn('сбоев 1', stdout.getvalue())
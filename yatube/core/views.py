@@ -1,9 +1,20 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from .instrumentation import registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
 def csrf_failure(request, reason=''):
-    return render(request, 'core/403csrf.html')
\ No newline at end of file
+    return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def request_stats(request):
+    if request.method == 'POST':
+        registry.reset()
+    return JsonResponse(registry.snapshot())
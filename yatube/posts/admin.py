@@ -1,17 +1,43 @@
 from django.contrib import admin
 
-from .models import Comment, Group, Post, Profile, Message
+from . import search
+from .models import Comment, Conversation, Group, Message, Post, Profile
+
+
+class IndexedSearchMixin:
+    """Поиск в админке по полнотекстовому индексу вместо LIKE."""
+    search_doc_type = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = [
+            doc_id for _, doc_id, _ in search.search(
+                search_term, self.search_doc_type,
+                limit=search.ADMIN_RESULTS_LIMIT)
+        ]
+        return queryset.filter(pk__in=ids), False
 
 
 class MessageAdmin(admin.ModelAdmin):
     list_display = ['sender', 'recipient']
 
 
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = [
+        'first_user',
+        'second_user',
+        'last_message_at',
+        'first_unread',
+        'second_unread',
+    ]
+
+
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'bio', 'profile_photo', 'instagram']
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -22,11 +48,12 @@ class PostAdmin(admin.ModelAdmin):
     )
     list_editable = ('group',)
     search_fields = ('text',)
+    search_doc_type = search.POST
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = (
         'id',
         'author',
@@ -38,10 +65,8 @@ class CommentAdmin(admin.ModelAdmin):
         'created',
         'updated',
     )
-    search_fields = (
-        'author',
-        'body',
-    )
+    search_fields = ('text',)
+    search_doc_type = search.COMMENT
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -55,6 +80,7 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Message, MessageAdmin)
+admin.site.register(Conversation, ConversationAdmin)
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,328 @@
+from functools import wraps
+
+from django.contrib.auth import authenticate
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+
+from core.routers import replica_reads
+
+from . import comments, timeline
+from .models import ApiToken, Conversation, Follow, Group, Message, Post, User
+from .paginator import CursorPaginator
+from .reactions import DISLIKES, LIKES, toggle_reaction
+from .realtime import serialize_message
+
+API_VERSION = 'v1'
+POSTS_PER_PAGE = 20
+MAX_PER_PAGE = 100
+MESSAGES_LIMIT = 50
+
+# Поле ответа -> поля модели для .only(); связанные поля — через '__'.
+# fields= задаёт и состав ответа, и запрос, поэтому число запросов
+# не зависит от размера страницы.
+POST_FIELDS = {
+    'id': (),
+    'text': ('text',),
+    'pub_date': (),
+    'image': ('image',),
+    'likes_count': ('likes_count',),
+    'dislikes_count': ('dislikes_count',),
+    'author': ('author__username', 'author__first_name',
+               'author__last_name'),
+    'group': ('group__slug', 'group__title'),
+}
+RELATED_FIELDS = ('author', 'group')
+DETAIL_FIELDS = {**POST_FIELDS, 'comments': ()}
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def token_key(request):
+    """Ключ из заголовка Authorization: Token <key> или None."""
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'token' or not key.strip():
+        return None
+    return key.strip()
+
+
+class CsrfCheck(CsrfViewMiddleware):
+    """Проверка CSRF, возвращающая причину отказа вместо HTML-страницы."""
+
+    def _reject(self, request, reason):
+        return reason
+
+
+def csrf_rejection(request):
+    """Причина отказа, если у запроса с сессией нет верного CSRF-токена."""
+    return CsrfCheck(lambda request: None).process_view(
+        request, None, (), {})
+
+
+def api_login_required(view):
+    """Пускает по токену API или по сессии.
+
+    Токен в заголовке не отправляется браузером сам, поэтому такие
+    запросы не проверяются на CSRF; сессионные — проверяются как обычно.
+    """
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = token_key(request)
+        if key is not None:
+            user = ApiToken.user_for(key)
+            if user is None:
+                return error('Неверный токен', status=401)
+            request.user = user
+        elif not request.user.is_authenticated:
+            return error('Требуется авторизация', status=401)
+        else:
+            reason = csrf_rejection(request)
+            if reason is not None:
+                return error(f'CSRF: {reason}', status=403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def parse_fields(value, allowed):
+    """Поля из ?fields=a,b; без параметра — все. ValueError на чужие."""
+    if not value:
+        return list(allowed)
+    fields = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def parse_limit(value, default, maximum):
+    try:
+        return min(max(int(value), 1), maximum)
+    except (TypeError, ValueError):
+        return default
+
+
+def select_fields(queryset, fields):
+    """Загружает из БД только поля, нужные для fields."""
+    only = {'id', 'pub_date'}
+    for name in fields:
+        only.update(POST_FIELDS.get(name, ()))
+    related = [name for name in RELATED_FIELDS if name in fields]
+    return queryset.select_related(*related).only(*only)
+
+
+def serialize_post(post, fields):
+    data = {}
+    for name in fields:
+        if name == 'id':
+            data[name] = post.pk
+        elif name == 'pub_date':
+            data[name] = post.pub_date.isoformat()
+        elif name == 'image':
+            data[name] = post.image.url if post.image else None
+        elif name == 'author':
+            data[name] = {
+                'username': post.author.username,
+                'first_name': post.author.first_name,
+                'last_name': post.author.last_name,
+            }
+        elif name == 'group':
+            data[name] = post.group and {
+                'slug': post.group.slug,
+                'title': post.group.title,
+            }
+        elif name in POST_FIELDS:
+            data[name] = getattr(post, name)
+    return data
+
+
+def feed_response(request, queryset):
+    try:
+        fields = parse_fields(request.GET.get('fields'), POST_FIELDS)
+    except ValueError as exc:
+        return error(str(exc))
+    per_page = parse_limit(request.GET.get('limit'), POSTS_PER_PAGE,
+                           MAX_PER_PAGE)
+    page = CursorPaginator(select_fields(queryset, fields),
+                           per_page).get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize_post(post, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def _pk(queryset, **lookup):
+    return queryset.filter(**lookup).values_list('pk', flat=True).first()
+
+
+@replica_reads
+@require_GET
+def posts(request):
+    return feed_response(request, Post.objects.all())
+
+
+@replica_reads
+@require_GET
+def group_posts(request, slug):
+    group_id = _pk(Group.objects, slug=slug)
+    if group_id is None:
+        return error('Группа не найдена', status=404)
+    return feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@replica_reads
+@require_GET
+def user_posts(request, username):
+    author_id = _pk(User.objects, username=username)
+    if author_id is None:
+        return error('Пользователь не найден', status=404)
+    return feed_response(request, Post.objects.filter(author_id=author_id))
+
+
+@replica_reads
+@require_GET
+@api_login_required
+def follow_feed(request):
+    return feed_response(request, timeline.follow_feed(request.user))
+
+
+@replica_reads
+@require_GET
+def post_detail(request, post_id):
+    try:
+        fields = parse_fields(request.GET.get('fields'), DETAIL_FIELDS)
+    except ValueError as exc:
+        return error(str(exc))
+    post = select_fields(Post.objects.filter(pk=post_id), fields).first()
+    if post is None:
+        return error('Пост не найден', status=404)
+    data = serialize_post(post, fields)
+    if 'comments' in fields:
+        page, next_cursor = comments.comment_page(
+            post, request.GET.get('after'))
+        data['comments'] = {
+            'results': [comments.serialize_comment(item) for item in page],
+            'next': next_cursor,
+        }
+    return JsonResponse(data)
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def token(request):
+    """Выдаёт токен API по username и password."""
+    user = authenticate(
+        request,
+        username=request.POST.get('username', ''),
+        password=request.POST.get('password', ''),
+    )
+    if user is None:
+        return error('Неверные имя пользователя или пароль', status=401)
+    return JsonResponse({'token': ApiToken.issue(user)}, status=201)
+
+
+def _react(request, post_id, reaction):
+    post = Post.objects.filter(pk=post_id).only(
+        'pk', 'author_id', 'group_id').first()
+    if post is None:
+        return error('Пост не найден', status=404)
+    active = toggle_reaction(post, request.user, reaction)
+    counts = Post.objects.filter(pk=post_id).values(
+        'likes_count', 'dislikes_count').get()
+    return JsonResponse({'active': active, **counts})
+
+
+@require_http_methods(['POST'])
+@api_login_required
+def like(request, post_id):
+    return _react(request, post_id, LIKES)
+
+
+@require_http_methods(['POST'])
+@api_login_required
+def dislike(request, post_id):
+    return _react(request, post_id, DISLIKES)
+
+
+@require_http_methods(['POST', 'DELETE'])
+@api_login_required
+def follow(request, username):
+    """POST — подписаться на автора, DELETE — отписаться."""
+    author_id = _pk(User.objects, username=username)
+    if author_id is None:
+        return error('Пользователь не найден', status=404)
+    if author_id == request.user.pk:
+        return error('Нельзя подписаться на себя')
+    if request.method == 'POST':
+        _, created = Follow.objects.get_or_create(
+            author_id=author_id, user=request.user)
+        if created:
+            timeline.backfill(request.user.pk, author_id)
+        return JsonResponse({'following': True})
+    Follow.objects.filter(author_id=author_id, user=request.user).delete()
+    timeline.prune(request.user.pk, author_id)
+    return JsonResponse({'following': False})
+
+
+@require_GET
+@api_login_required
+def directs(request):
+    return JsonResponse({'results': [
+        {
+            'user': message['user'].username,
+            'last': message['last'] and message['last'].isoformat(),
+            'snippet': message['snippet'],
+            'unread': message['unread'],
+        }
+        for message in Message.get_messages(request.user)
+    ]})
+
+
+@require_http_methods(['GET', 'POST'])
+@api_login_required
+def direct_thread(request, username):
+    """GET — страница диалога, POST — отправка body.
+
+    Без параметров GET отдаёт последние сообщения; ?before=<id> листает
+    назад, ?after=<id> догружает новые.
+    """
+    partner = User.objects.filter(username=username).only(
+        'pk', 'username').first()
+    if partner is None:
+        return error('Пользователь не найден', status=404)
+    if request.method == 'POST':
+        body = request.POST.get('body', '').strip()
+        if not body:
+            return error('Пустое сообщение')
+        message = Message.send_message(request.user, partner, body)
+        return JsonResponse(
+            {'message': serialize_message(message)}, status=201)
+    try:
+        after = int(request.GET.get('after', 0))
+        before = int(request.GET.get('before', 0))
+    except ValueError:
+        return error('after и before должны быть числами')
+    thread = Message.thread(request.user, partner)
+    earlier = None
+    if after:
+        messages = list(thread.filter(pk__gt=after)[:MESSAGES_LIMIT])
+    else:
+        if before:
+            thread = thread.filter(pk__lt=before)
+        messages = list(
+            thread.order_by('-date', '-pk')[:MESSAGES_LIMIT + 1])[::-1]
+        if len(messages) > MESSAGES_LIMIT:
+            messages = messages[1:]
+            earlier = messages[0].pk
+    if messages:
+        Message.mark_read(request.user, partner)
+    return JsonResponse({
+        'results': [serialize_message(message) for message in messages],
+        'before': earlier,
+        'unread': Conversation.unread_total(request.user),
+    })
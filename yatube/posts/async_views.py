@@ -0,0 +1,137 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, HttpResponse
+from django.shortcuts import render
+from django.template import loader
+
+from core.routers import replica_reads
+
+from . import comments, feed, stats
+from .conditional import (feed_scopes, group_scopes, post_scopes,
+                          profile_scopes, versioned)
+from .forms import CommentForm
+from .models import Conversation, Group, Message, Post, User
+from .pagecache import cache_anonymous
+from .paginator import aget_page
+from .views import POSTS_PER_PAGE
+
+arender = sync_to_async(render)
+
+
+async def get_user(request):
+    """request.user, загруженный вне цикла событий."""
+    await sync_to_async(lambda: request.user.pk)()
+    return request.user
+
+
+async def aget_object_or_404(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404
+
+
+@replica_reads
+@versioned(feed_scopes)
+@cache_anonymous(feed_scopes)
+async def index(request):
+    user = await get_user(request)
+    page_obj = await aget_page(request, Post.objects.all(), POSTS_PER_PAGE,
+                               count_key='index')
+    await feed.aassemble(page_obj, user)
+    context = {
+        'comment_form': CommentForm(data=request.POST or None),
+        'page_obj': page_obj,
+    }
+    return await arender(request, 'posts/index.html', context)
+
+
+@replica_reads
+@versioned(group_scopes)
+@cache_anonymous(group_scopes)
+async def group_posts(request, slug):
+    group = await aget_object_or_404(Group.objects, slug=slug)
+    user = await get_user(request)
+    page_obj = await aget_page(request, Post.objects.filter(group=group),
+                               POSTS_PER_PAGE, count_key=f'group:{group.pk}')
+    await feed.aassemble(page_obj, user, groups=[group])
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+    }
+    return await arender(request, 'posts/group_list.html', context)
+
+
+@replica_reads
+@versioned(profile_scopes)
+async def profile(request, username):
+    author = await aget_object_or_404(User.objects, username=username)
+    user = await get_user(request)
+    author_stats = await stats.afor_user(author)
+    following = (
+        user.is_authenticated
+        and await author.following.filter(user=user).aexists()
+    )
+    page_obj = await aget_page(request, Post.objects.filter(author=author),
+                               POSTS_PER_PAGE,
+                               count_key=f'author:{author.pk}')
+    await feed.aassemble(page_obj, user, authors=[author])
+    context = {
+        'following': following,
+        'name': [author_stats] if author_stats.pk else [],
+        'stats': author_stats,
+        'post_count': author_stats.posts_count,
+        'author': author,
+        'page_obj': page_obj,
+    }
+    return await arender(request, 'posts/profile.html', context)
+
+
+@replica_reads
+@versioned(post_scopes)
+async def post_detail(request, post_id):
+    post = await aget_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
+    comment, next_cursor = await comments.acomment_page(post)
+    author_stats = await stats.afor_user(post.author)
+    context = {
+        'comment': comment,
+        'next_cursor': next_cursor,
+        'comment_form': CommentForm(data=request.POST or None),
+        'post_count': author_stats.posts_count,
+        'post': post,
+    }
+    return await arender(request, 'posts/post_detail.html', context)
+
+
+async def inbox(request):
+    user = await get_user(request)
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    messages = [
+        {
+            'user': conversation.partner_for(user),
+            'last': conversation.last_message_at,
+            'snippet': conversation.last_snippet,
+            'unread': conversation.unread_for(user),
+        }
+        async for conversation in Conversation.for_user(user)
+    ]
+    active_direct = None
+    directs = None
+    if messages:
+        message = messages[0]
+        active_direct = message['user'].username
+        directs = [
+            direct async for direct in Message.thread(user, message['user'])
+        ]
+        await sync_to_async(Message.mark_read)(user, message['user'])
+        message['unread'] = 0
+    context = {
+        'directs': directs,
+        'messages': messages,
+        'active_direct': active_direct,
+    }
+    template = loader.get_template('direct/direct.html')
+    content = await sync_to_async(template.render)(context, request)
+    return HttpResponse(content)
@@ -0,0 +1,111 @@
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def fragment_cache():
+    return caches[getattr(settings, 'POSTS_FRAGMENT_CACHE', 'default')]
+
+
+def post_version_key(post_id):
+    return f'version:post:{post_id}'
+
+
+def author_version_key(user_id):
+    return f'version:author:{user_id}'
+
+
+def group_version_key(group_id):
+    return f'version:group:{group_id}'
+
+
+def feed_version_key():
+    return 'version:feed'
+
+
+def unread_directs_key(user_id):
+    return f'directs:unread:{user_id}'
+
+
+def pending_reaction_key(post_id, user_id):
+    return f'reactions:pending:{post_id}:{user_id}'
+
+
+def new_version():
+    """Метка версии: время изменения в микросекундах плюс случайный хвост."""
+    return f'{time.time_ns() // 1000:x}.{uuid4().hex[:12]}'
+
+
+def version_time(version):
+    try:
+        micros = int(version.split('.', 1)[0], 16)
+    except (AttributeError, ValueError):
+        return None
+    return datetime.fromtimestamp(micros / 1_000_000, tz=timezone.utc)
+
+
+def get_versions(keys):
+    """Текущие метки версий; отсутствующие создаются заново."""
+    cache = fragment_cache()
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return versions
+
+
+def bump(*keys):
+    """Меняет метки версий после фиксации транзакции."""
+    def set_versions():
+        fragment_cache().set_many(
+            {key: new_version() for key in keys}, timeout=None)
+    transaction.on_commit(set_versions)
+
+
+def reset_unread_directs(user_id):
+    """Сбрасывает счётчик непрочитанных после фиксации транзакции."""
+    transaction.on_commit(
+        lambda: fragment_cache().delete(unread_directs_key(user_id)))
+
+
+def bump_post(post_id):
+    bump(post_version_key(post_id))
+
+
+def bump_author(user_id):
+    bump(author_version_key(user_id))
+
+
+def bump_post_scopes(post_id, author_id, *group_ids):
+    """Пост изменился: сбросить его, ленту, автора и группы."""
+    keys = [post_version_key(post_id), feed_version_key(),
+            author_version_key(author_id)]
+    keys += [group_version_key(pk) for pk in group_ids if pk]
+    bump(*keys)
+
+
+def bump_author_scopes(user_id, *group_ids):
+    """Имя или профиль автора изменились: сбросить автора, ленту и
+    группы, где есть его посты."""
+    keys = [author_version_key(user_id), feed_version_key()]
+    keys += [group_version_key(pk) for pk in group_ids if pk]
+    bump(*keys)
+
+
+def article_key(post):
+    post_key = post_version_key(post.pk)
+    author_key = author_version_key(post.author_id)
+    versions = get_versions([post_key, author_key])
+    return 'article:{}:{}:{}:{}'.format(
+        post.pk,
+        post.pub_date.timestamp(),
+        versions[post_key],
+        versions[author_key],
+    )
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+from .caching import fragment_cache
+from .pagecache import page_cache
+from .reactions import write_behind_settings
+
+HINT = ('Укажите общий кэш (CACHE_BACKEND / FRAGMENT_CACHE_BACKEND, '
+        'например Redis или Memcached).')
+
+
+def local_caches():
+    """Псевдонимы кэшей версий и страниц, живущих в памяти процесса."""
+    aliases = {
+        getattr(settings, 'POSTS_FRAGMENT_CACHE', 'default'): fragment_cache(),
+        getattr(settings, 'POSTS_PAGE_CACHE', 'default'): page_cache(),
+    }
+    return sorted(alias for alias, cache in aliases.items()
+                  if isinstance(cache, LocMemCache))
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """Метки версий (ETag, Last-Modified, кэш страниц) меняют и другие
+    процессы: воркер задач и сброс write-behind. С кэшем в памяти
+    процесса чужой сброс не виден, и страницы остаются устаревшими."""
+    aliases = local_caches()
+    if not aliases:
+        return []
+    writers = []
+    if not getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        writers.append('фоновые задачи (TASKS_ALWAYS_EAGER выключен)')
+    if write_behind_settings()['ENABLED']:
+        writers.append('write-behind реакций')
+    if not writers:
+        return []
+    return [Warning(
+        f'Кэш «{alias}» хранится в памяти процесса, а метки версий '
+        f'меняют {" и ".join(writers)}.',
+        hint=HINT,
+        id='posts.W001',
+    ) for alias in aliases]
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_caches_deploy(app_configs, **kwargs):
+    aliases = local_caches()
+    if not aliases:
+        return []
+    return [Warning(
+        f'Кэш «{alias}» хранится в памяти процесса: при нескольких '
+        'процессах сервера ETag, Last-Modified и кэш страниц в каждом '
+        'свои, и процесс, не видевший изменения, отдаёт 304 или '
+        'страницу из кэша.',
+        hint=HINT,
+        id='posts.W002',
+    ) for alias in aliases]
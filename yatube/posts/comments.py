@@ -0,0 +1,68 @@
+import re
+
+from .models import Comment
+
+COMMENTS_PER_PAGE = 20
+PATH_RE = re.compile(r'^\d+(\.\d+)*$')
+
+
+def active_comments(post):
+    return (
+        Comment.objects.filter(post_id=post.pk, active=True)
+        .select_related('author')
+        .order_by('path')
+    )
+
+
+def comment_page(post, after=None, limit=COMMENTS_PER_PAGE):
+    """Страница комментариев в порядке дерева и курсор следующей.
+
+    Курсор — путь последнего комментария: следующая страница читается
+    диапазоном path > курсор по индексу (post, path), без OFFSET.
+    """
+    page = list(_page_query(post, after, limit))
+    return _split(page, limit)
+
+
+async def acomment_page(post, after=None, limit=COMMENTS_PER_PAGE):
+    """comment_page() на async ORM."""
+    page = [comment async for comment in _page_query(post, after, limit)]
+    return _split(page, limit)
+
+
+def _page_query(post, after, limit):
+    comments = active_comments(post)
+    if after and PATH_RE.match(after):
+        comments = comments.filter(path__gt=after)
+    return comments[:limit + 1]
+
+
+def _split(page, limit):
+    next_cursor = page[limit - 1].path if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def comment_subtree(comment, limit=None):
+    comments = comment.subtree().filter(active=True).select_related('author')
+    return list(comments[:limit] if limit else comments)
+
+
+def find_parent(post, parent_id):
+    if not parent_id:
+        return None
+    try:
+        return Comment.objects.filter(
+            pk=int(parent_id), post_id=post.pk, active=True).first()
+    except (TypeError, ValueError):
+        return None
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
@@ -0,0 +1,118 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth import SESSION_KEY
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                quote_etag)
+from django.utils.http import http_date
+
+from .caching import (author_version_key, feed_version_key, get_versions,
+                      group_version_key, post_version_key, version_time)
+from .models import Conversation, Group, Post, User
+
+
+def viewer(request):
+    """Id пользователя из сессии, без запроса к таблице пользователей."""
+    return request.session.get(SESSION_KEY) or 'anon'
+
+
+def scope_versions(request, scopes, args, kwargs):
+    """Метки версий областей страницы, одни на весь запрос."""
+    if not hasattr(request, '_scope_versions'):
+        keys = scopes(request, *args, **kwargs)
+        request._scope_versions = get_versions(keys) if keys else None
+    return request._scope_versions
+
+
+def validators(request, scopes, args, kwargs):
+    """ETag и Last-Modified (в секундах) страницы или (None, None)."""
+    versions = scope_versions(request, scopes, args, kwargs)
+    if versions is None:
+        return None, None
+    user_id = viewer(request)
+    payload = '|'.join([
+        *(f'{key}={versions[key]}' for key in sorted(versions)),
+        str(user_id),
+        request.get_full_path(),
+    ])
+    if user_id != 'anon':
+        payload += f'|directs={Conversation.unread_count(user_id)}'
+    etag = quote_etag(hashlib.md5(payload.encode()).hexdigest())
+    times = [version_time(value) for value in versions.values()]
+    modified = max((moment for moment in times if moment), default=None)
+    return etag, modified and int(modified.timestamp())
+
+
+def not_modified(request, etag, modified):
+    if etag is None or request.method not in ('GET', 'HEAD'):
+        return None
+    return get_conditional_response(
+        request, etag=etag, last_modified=modified)
+
+
+def finish(request, response, etag, modified):
+    if etag is None or request.method not in ('GET', 'HEAD'):
+        return response
+    if modified and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(modified)
+    response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, no_cache=True)
+    if viewer(request) != 'anon':
+        patch_cache_control(response, private=True)
+    return response
+
+
+def versioned(scopes):
+    """Условный GET по меткам версий областей страницы.
+
+    scopes(request, *args, **kwargs) возвращает ключи версий, от которых
+    зависит страница, или None, если объекта нет. ETag — хеш меток,
+    зрителя и адреса, Last-Modified — самая свежая из меток. На
+    совпавший If-None-Match ответ 304 уходит без вызова представления.
+    Подходит и для async-представлений.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                etag, modified = await sync_to_async(validators)(
+                    request, scopes, args, kwargs)
+                response = not_modified(request, etag, modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return await sync_to_async(finish)(
+                    request, response, etag, modified)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag, modified = validators(request, scopes, args, kwargs)
+            response = not_modified(request, etag, modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return finish(request, response, etag, modified)
+        return wrapper
+    return decorator
+
+
+def feed_scopes(request):
+    return [feed_version_key()]
+
+
+def group_scopes(request, slug):
+    pk = Group.objects.filter(slug=slug).values_list('pk', flat=True).first()
+    return pk and [group_version_key(pk)]
+
+
+def profile_scopes(request, username):
+    pk = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    return pk and [author_version_key(pk)]
+
+
+def post_scopes(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True).first()
+    return author_id and [post_version_key(post_id),
+                          author_version_key(author_id)]
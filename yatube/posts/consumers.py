@@ -0,0 +1,40 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .models import Message, User
+from .realtime import user_group
+
+
+class DirectConsumer(AsyncJsonWebsocketConsumer):
+    """Личные сообщения пользователя в реальном времени."""
+
+    async def connect(self):
+        user = self.scope['user']
+        if not user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = user_group(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(
+                self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        body = (content.get('body') or '').strip()
+        if body:
+            await self.send_message(content.get('to_user'), body)
+
+    @database_sync_to_async
+    def send_message(self, username, body):
+        to_user = User.objects.filter(username=username).first()
+        if to_user is not None and to_user != self.scope['user']:
+            Message.send_message(self.scope['user'], to_user, body)
+
+    async def direct_message(self, event):
+        await self.send_json({
+            'message': event['message'],
+            'unread': event['unread'],
+        })
@@ -0,0 +1,101 @@
+from django.db.models import Value
+
+from .models import Group, Post, User
+from .reactions import (DISLIKES, LIKES, apending_reactions,
+                        pending_reactions)
+
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+PROFILE_FIELDS = ('profile__id', 'profile__profile_photo')
+
+
+def _reactions_query(viewer, post_ids):
+    if viewer is None or not viewer.is_authenticated or not post_ids:
+        return None
+    likes, dislikes = (
+        getattr(Post, reaction).through.objects
+        .filter(user_id=viewer.pk, post_id__in=post_ids)
+        .annotate(reaction=Value(reaction))
+        .values_list('post_id', 'reaction')
+        for reaction in (LIKES, DISLIKES)
+    )
+    return likes.union(dislikes, all=True)
+
+
+def viewer_reactions(viewer, post_ids):
+    """{post_id: LIKES | DISLIKES} для реакций зрителя одним запросом."""
+    query = _reactions_query(viewer, post_ids)
+    if query is None:
+        return {}
+    reactions = dict(query)
+    reactions.update(pending_reactions(viewer.pk, post_ids))
+    return reactions
+
+
+async def aviewer_reactions(viewer, post_ids):
+    query = _reactions_query(viewer, post_ids)
+    if query is None:
+        return {}
+    reactions = {post_id: reaction async for post_id, reaction in query}
+    reactions.update(await apending_reactions(viewer.pk, post_ids))
+    return reactions
+
+
+def _authors():
+    return User.objects.select_related('profile').only(
+        *AUTHOR_FIELDS, *PROFILE_FIELDS)
+
+
+def _missing(posts, authors, groups):
+    """Id авторов и групп страницы, которых ещё нет в authors и groups."""
+    return (
+        {post.author_id for post in posts} - set(authors),
+        {post.group_id for post in posts if post.group_id} - set(groups),
+    )
+
+
+def _attach(posts, authors, groups, reactions):
+    for post in posts:
+        post.author = authors[post.author_id]
+        if post.group_id:
+            post.group = groups.get(post.group_id)
+        post.viewer_reaction = reactions.get(post.pk)
+    return posts
+
+
+def assemble(posts, viewer=None, authors=(), groups=()):
+    """Готовит страницу ленты для шаблона.
+
+    Авторы вместе с профилями, группы и реакции зрителя читаются
+    запросами по IN, по одному на вид данных, сколько бы постов ни было.
+    Уже загруженные представлением authors и groups не перечитываются.
+    Посты получают author (с закэшированным profile), group и
+    viewer_reaction, так что шаблон больше не ходит в БД.
+    """
+    posts = list(posts)
+    if not posts:
+        return posts
+    authors = {author.pk: author for author in authors}
+    groups = {group.pk: group for group in groups}
+    author_ids, group_ids = _missing(posts, authors, groups)
+    if author_ids:
+        authors.update(_authors().in_bulk(author_ids))
+    if group_ids:
+        groups.update(Group.objects.in_bulk(group_ids))
+    reactions = viewer_reactions(viewer, [post.pk for post in posts])
+    return _attach(posts, authors, groups, reactions)
+
+
+async def aassemble(posts, viewer=None, authors=(), groups=()):
+    """assemble() на async ORM."""
+    posts = list(posts)
+    if not posts:
+        return posts
+    authors = {author.pk: author for author in authors}
+    groups = {group.pk: group for group in groups}
+    author_ids, group_ids = _missing(posts, authors, groups)
+    if author_ids:
+        authors.update(await _authors().ain_bulk(author_ids))
+    if group_ids:
+        groups.update(await Group.objects.ain_bulk(group_ids))
+    reactions = await aviewer_reactions(viewer, [post.pk for post in posts])
+    return _attach(posts, authors, groups, reactions)
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+from .caching import FRAGMENT_TIMEOUT, fragment_cache
+
+DEFAULT_WIDTHS = (320, 640, 1024)
+DERIVATIVE_RE = re.compile(r'\.w\d+\.[a-z]+$')
+METADATA_KEYS = {'exif', 'xmp', 'XML:com.adobe.xmp'}
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpg': 'image/jpeg',
+    'png': 'image/png',
+}
+SAVE_OPTIONS = {
+    'avif': {'format': 'AVIF', 'quality': 60},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True,
+            'progressive': True},
+    'png': {'format': 'PNG', 'optimize': True},
+}
+
+
+def derivative_widths():
+    return tuple(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', DEFAULT_WIDTHS))
+
+
+def modern_formats():
+    """Форматы, которые умеет кодировать установленный Pillow."""
+    return [fmt for fmt in ('avif', 'webp') if features.check(fmt)]
+
+
+def is_derivative(name):
+    return bool(DERIVATIVE_RE.search(name))
+
+
+def derivative_name(name, width, fmt):
+    """Имя копии хранит расширение оригинала: у a.jpg и a.png из одного
+    каталога копии разные."""
+    return f'{name}.w{width}.{fmt}'
+
+
+def fallback_format(name):
+    return 'png' if name.lower().endswith('.png') else 'jpg'
+
+
+def _encode(image, fmt):
+    if fmt == 'jpg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, **SAVE_OPTIONS[fmt])
+    return ContentFile(buffer.getvalue())
+
+
+def strip_metadata(file):
+    """Копия загрузки без EXIF (в том числе GPS) и XMP.
+
+    Поворот из EXIF переносится в пиксели. None — чистить нечего или
+    файл не удалось перекодировать; анимацию не трогаем.
+    """
+    try:
+        file.seek(0)
+        image = Image.open(file)
+        if (getattr(image, 'is_animated', False)
+                or not (image.getexif() or METADATA_KEYS & set(image.info))):
+            return None
+        fmt = 'JPEG' if image.format == 'MPO' else image.format
+        options = {'format': fmt}
+        if fmt == 'JPEG':
+            options['quality'] = 90
+        if 'icc_profile' in image.info:
+            options['icc_profile'] = image.info['icc_profile']
+        image = ImageOps.exif_transpose(image)
+        buffer = BytesIO()
+        image.save(buffer, **options)
+    except (OSError, KeyError, ValueError):
+        return None
+    finally:
+        file.seek(0)
+    return ContentFile(buffer.getvalue(), name=os.path.basename(file.name))
+
+
+def generate_derivatives(field_file, force=False):
+    if not field_file:
+        return []
+    return create_derivatives(field_file.storage, field_file.name, force)
+
+
+def create_derivatives(storage, name, force=False):
+    """Создаёт уменьшенные копии рядом с оригиналом, без EXIF.
+
+    Анимированные изображения не трогаем, чтобы не потерять анимацию.
+    Список готовых копий запоминается для srcset. Возвращает список
+    имён созданных файлов.
+    """
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        if getattr(image, 'is_animated', False):
+            _remember(name, [])
+            return []
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              else 'RGB')
+    formats = modern_formats() + [fallback_format(name)]
+    created = []
+    available = []
+    for width in derivative_widths():
+        if width >= image.width:
+            continue
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            target = derivative_name(name, width, fmt)
+            available.append((width, fmt))
+            if storage.exists(target):
+                if not force:
+                    continue
+                storage.delete(target)
+            created.append(storage.save(target, _encode(resized, fmt)))
+    _remember(name, available)
+    return created
+
+
+def _exists(storage, name):
+    try:
+        return storage.exists(name)
+    except SuspiciousFileOperation:
+        return False
+
+
+def derivatives_key(name):
+    return f'derivatives:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def delete_image(storage, name):
+    """Удаляет оригинал вместе со всеми копиями."""
+    for width in derivative_widths():
+        for fmt in MIME_TYPES:
+            storage.delete(derivative_name(name, width, fmt))
+    storage.delete(name)
+    fragment_cache().delete(derivatives_key(name))
+
+
+def _remember(name, available):
+    fragment_cache().set(derivatives_key(name), available, FRAGMENT_TIMEOUT)
+
+
+def available_derivatives(storage, name):
+    """Пары (ширина, формат) готовых копий.
+
+    Берутся из кэша; обход хранилища — только при промахе.
+    """
+    available = fragment_cache().get(derivatives_key(name))
+    if available is None:
+        available = [
+            (width, fmt)
+            for width in derivative_widths()
+            for fmt in modern_formats() + [fallback_format(name)]
+            if _exists(storage, derivative_name(name, width, fmt))
+        ]
+        _remember(name, available)
+    return available
+
+
+def srcset(field_file):
+    """Наборы srcset по форматам для уже созданных копий."""
+    if not field_file:
+        return {}
+    storage = field_file.storage
+    name = field_file.name
+    candidates = {}
+    for width, fmt in available_derivatives(storage, name):
+        candidates.setdefault(fmt, []).append(
+            f'{storage.url(derivative_name(name, width, fmt))} {width}w')
+    return {
+        fmt: ', '.join(candidates[fmt])
+        for fmt in modern_formats() + [fallback_format(name)]
+        if fmt in candidates
+    }
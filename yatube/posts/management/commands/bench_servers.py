@@ -0,0 +1,164 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.test import Client
+from django.utils import timezone
+
+from .run_bench import Command as BenchCommand
+from .run_bench import git_revision, percentile
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'inbox')
+HOST = '127.0.0.1'
+STARTUP_TIMEOUT = 30
+WARMUP = 5
+
+
+def load(url, total, concurrency, headers=None, timeout=30):
+    """Делает total GET-запросов в concurrency потоков.
+
+    Возвращает запросы в секунду, p50/p95 в мс и число ошибок.
+    """
+    def fetch(_):
+        started = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=headers or {}),
+                         timeout=timeout) as response:
+                response.read()
+                ok = response.status == 200
+        except OSError:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(fetch, range(total)))
+    elapsed = time.perf_counter() - started
+    timings = [timing for timing, ok in results if ok]
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3) if timings else None,
+        'p95_ms': round(percentile(timings, 0.95), 3) if timings else None,
+        'errors': total - len(timings),
+    }
+
+
+def wait_for_port(port, process, timeout=STARTUP_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection((HOST, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BenchCommand):
+    help = ('Сравнивает WSGI (gunicorn, синхронные представления) и ASGI '
+            '(daphne, async-представления) под конкурентной нагрузкой')
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*',
+                            help=f'Страницы: {", ".join(VIEWS)}')
+        parser.add_argument('--username',
+                            help='Пользователь, от имени которого замер')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждую страницу и уровень')
+        parser.add_argument('--concurrency', type=int, nargs='+',
+                            default=[1, 10, 50])
+        parser.add_argument('--wsgi-port', type=int, default=8101)
+        parser.add_argument('--wsgi-workers', type=int, default=1,
+                            help='Процессов gunicorn')
+        parser.add_argument('--wsgi-threads', type=int, default=8,
+                            help='Потоков на процесс gunicorn')
+        parser.add_argument('--asgi-port', type=int, default=8102)
+        parser.add_argument('--output', help='Файл для JSON')
+
+    def handle(self, *args, **options):
+        unknown = set(options['views']) - set(VIEWS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные страницы: {", ".join(sorted(unknown))}')
+        user = self.bench_user(options['username'])
+        targets = self.targets(user)
+        views = [view for view in options['views'] or VIEWS
+                 if view in targets]
+        client = Client()
+        client.force_login(user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+        headers = {'Cookie': f'{settings.SESSION_COOKIE_NAME}={cookie}'}
+        servers = {
+            'wsgi': (options['wsgi_port'], '0', [
+                sys.executable, '-m', 'gunicorn',
+                '-b', f'{HOST}:{options["wsgi_port"]}',
+                '--workers', str(options['wsgi_workers']),
+                '--threads', str(options['wsgi_threads']),
+                'yatube.wsgi:application']),
+            'asgi': (options['asgi_port'], '1', [
+                sys.executable, '-m', 'daphne', '-b', HOST,
+                '-p', str(options['asgi_port']), 'yatube.asgi:application']),
+        }
+        results = {}
+        for name, (port, async_views, command) in servers.items():
+            results[name] = {}
+            with self.server(command, port, async_views):
+                for view in views:
+                    url = f'http://{HOST}:{port}{targets[view]}'
+                    load(url, WARMUP, 1, headers)
+                    results[name][view] = {
+                        str(level): load(url, options['requests'], level,
+                                         headers)
+                        for level in options['concurrency']
+                    }
+        self.report(results, views, options)
+
+    @contextmanager
+    def server(self, command, port, async_views):
+        env = {**os.environ, 'POSTS_ASYNC_VIEWS': async_views}
+        process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_for_port(port, process):
+                raise CommandError(
+                    f'Сервер не запустился: {" ".join(command)}')
+            yield
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    def report(self, results, views, options):
+        for view in views:
+            for level in map(str, options['concurrency']):
+                wsgi = results['wsgi'][view][level]
+                asgi = results['asgi'][view][level]
+                change = (asgi['rps'] - wsgi['rps']) / max(
+                    wsgi['rps'], 0.1) * 100
+                self.stdout.write(
+                    f'{view:12} x{level:<4} WSGI {wsgi["rps"]:8.1f} rps  '
+                    f'ASGI {asgi["rps"]:8.1f} rps ({change:+.1f}%)')
+        data = json.dumps({
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'wsgi_workers': options['wsgi_workers'],
+            'wsgi_threads': options['wsgi_threads'],
+            'servers': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(data + '\n')
+        else:
+            self.stdout.write(data)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import reactions
+
+
+class Command(BaseCommand):
+    help = ('Записывает в БД реакции из журналов write-behind, '
+            'оставшихся после остановленных процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Применить и журналы работающих процессов')
+
+    def handle(self, *args, **options):
+        settings = reactions.write_behind_settings()
+        applied = reactions.recover(settings['LOG_DIR'], force=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано реакций: {applied}'))
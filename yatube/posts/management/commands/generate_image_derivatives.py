@@ -0,0 +1,47 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.images import create_derivatives, is_derivative
+from posts.models import Post, Profile
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')
+
+
+def walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for subdirectory in directories:
+        yield from walk(storage, os.path.join(directory, subdirectory))
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии уже загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать существующие копии')
+
+    def handle(self, *args, **options):
+        directories = {
+            Post._meta.get_field('image').upload_to.split('%')[0],
+            Profile._meta.get_field('profile_photo').upload_to,
+        }
+        created = 0
+        for directory in sorted(directories):
+            directory = directory.rstrip('/')
+            if not default_storage.exists(directory):
+                continue
+            for name in walk(default_storage, directory):
+                if (is_derivative(name)
+                        or not name.lower().endswith(IMAGE_EXTENSIONS)):
+                    continue
+                try:
+                    created += len(create_derivatives(
+                        default_storage, name, options['force']))
+                except OSError as error:
+                    self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Создано копий: {created}'))
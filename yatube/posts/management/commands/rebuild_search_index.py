@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        backend.clear()
+        total = 0
+        for pk, text in Post.objects.values_list('pk', 'text').iterator():
+            backend.index(search.POST, pk, search.tokenize(text))
+            total += 1
+        comments = Comment.objects.filter(active=True)
+        for pk, text in comments.values_list('pk', 'text').iterator():
+            backend.index(search.COMMENT, pk, search.tokenize(text))
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано документов: {total}'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Заново собирает ленты подписок пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*')
+
+    def handle(self, *args, **options):
+        users = Follow.objects.values_list('user_id', flat=True).distinct()
+        if options['usernames']:
+            users = users.filter(user__username__in=options['usernames'])
+        total = 0
+        for user_id in users.iterator():
+            timeline.rebuild(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {total}'))
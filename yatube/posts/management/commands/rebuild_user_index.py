@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import user_index
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс пользователей'
+
+    def handle(self, *args, **options):
+        total = user_index.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано пользователей: {total}'))
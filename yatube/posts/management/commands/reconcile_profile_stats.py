@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import Profile
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики профилей (посты, подписчики, подписки, '
+            'лайки) с данными и исправляет расхождения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*')
+
+    def handle(self, *args, **options):
+        profiles = Profile.objects.all()
+        if options['usernames']:
+            profiles = profiles.filter(
+                user__username__in=options['usernames'])
+        fixed = stats.reconcile(profiles)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено профилей: {fixed}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.reactions import recount_reactions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики лайков и дизлайков постов'
+
+    def handle(self, *args, **options):
+        updated = recount_reactions()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {updated}'))
@@ -0,0 +1,170 @@
+import json
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Conversation, Follow, Group, Post, User
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+         'inbox', 'directs')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95 задержки и число запросов горячих страниц '
+            'и пишет результат в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('views', nargs='*',
+                            help=f'Страницы: {", ".join(VIEWS)}')
+        parser.add_argument('--username',
+                            help='Пользователь, от имени которого замер')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--output', help='Файл для JSON')
+        parser.add_argument('--compare',
+                            help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        unknown = set(options['views']) - set(VIEWS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные страницы: {", ".join(sorted(unknown))}')
+        user = self.bench_user(options['username'])
+        client = Client()
+        client.force_login(user)
+        targets = self.targets(user)
+        results = {}
+        for view in options['views'] or VIEWS:
+            if view not in targets:
+                self.stderr.write(f'{view}: нет данных, пропуск')
+                continue
+            results[view] = self.measure(
+                client, targets[view], options['iterations'],
+                options['warmup'])
+            self.stdout.write(
+                f'{view:14} p50 {results[view]["p50_ms"]:8.2f} мс  '
+                f'p95 {results[view]["p95_ms"]:8.2f} мс  '
+                f'запросов {results[view]["queries"]}')
+        report = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'user': user.username,
+            'iterations': options['iterations'],
+            'views': results,
+        }
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(data + '\n')
+        else:
+            self.stdout.write(data)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def bench_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Пользователь {username} не найден')
+            return user
+        followers = (
+            Follow.objects.values('user').annotate(total=Count('id'))
+            .order_by('-total').values_list('user', flat=True)[:50])
+        user = None
+        for candidate in User.objects.filter(pk__in=list(followers)):
+            user = user or candidate
+            if Conversation.for_user(candidate).exists():
+                user = candidate
+                break
+        user = user or User.objects.first()
+        if user is None:
+            raise CommandError('База пуста, запустите seed_bench')
+        return user
+
+    def targets(self, user):
+        targets = {
+            'index': reverse('posts:index'),
+            'follow_index': reverse('posts:follow_index'),
+            'inbox': reverse('posts:inbox'),
+        }
+        group = Group.objects.annotate(total=Count('posts')).order_by(
+            '-total').first()
+        if group is not None:
+            targets['group_posts'] = reverse(
+                'posts:group_list', args=(group.slug,))
+        author = (
+            Post.objects.values('author__username')
+            .annotate(total=Count('id')).order_by('-total').first())
+        if author is not None:
+            targets['profile'] = reverse(
+                'posts:profile', args=(author['author__username'],))
+        post = Post.objects.annotate(total=Count('comments')).order_by(
+            '-total').values_list('pk', flat=True).first()
+        if post is not None:
+            targets['post_detail'] = reverse(
+                'posts:post_detail', args=(post,))
+        conversation = Conversation.for_user(user).annotate(
+            total=Count('messages')).order_by('-total').first()
+        if conversation is not None:
+            targets['directs'] = reverse('posts:directs', args=(
+                conversation.partner_for(user).username,))
+        return targets
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        timings = []
+        queries = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        if response.status_code != 200:
+            raise CommandError(f'{url}: код ответа {response.status_code}')
+        return {
+            'url': url,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+        }
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['views']
+        for view, current in results.items():
+            before = baseline.get(view)
+            if before is None:
+                continue
+            change = (current['p95_ms'] - before['p95_ms']) / max(
+                before['p95_ms'], 0.001) * 100
+            self.stdout.write(
+                f'{view:14} p95 {before["p95_ms"]:.2f} → '
+                f'{current["p95_ms"]:.2f} мс ({change:+.1f}%), '
+                f'запросов {before["queries"]} → {current["queries"]}')
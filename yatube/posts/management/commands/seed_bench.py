@@ -0,0 +1,283 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import CharField, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, LPad, Substr
+from django.utils import timezone
+from faker import Faker
+
+from posts import stats, user_index
+from posts.models import (Comment, Conversation, Follow, Group, Message,
+                          MessageState, Post, Profile, User)
+from posts.reactions import recount_reactions
+
+PREFIX = 'bench_'
+PASSWORD = 'bench-password'
+TEXT_POOL = 2000
+PERIOD_DAYS = 730
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Отключает auto_now_add, чтобы задать даты в прошлом."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными для замеров: '
+            'пользователи, посты, подписки, лайки, комментарии, сообщения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок на пользователя')
+        parser.add_argument('--likes', type=int, default=2_000_000)
+        parser.add_argument('--comments', type=int, default=300_000)
+        parser.add_argument('--messages', type=int, default=200_000)
+        parser.add_argument('--batch', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить ранее созданные данные')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        self.batch = options['batch']
+        self.now = timezone.now()
+        if options['clear']:
+            self.clear()
+        self.texts = [self.faker.paragraph(nb_sentences=4)
+                      for _ in range(TEXT_POOL)]
+        with manual_dates(Post._meta.get_field('pub_date'),
+                          Comment._meta.get_field('created'),
+                          Message._meta.get_field('date')):
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            posts = self.create_posts(options['posts'], users, groups)
+            self.create_follows(users, options['follows'])
+            self.create_likes(options['likes'], users, posts)
+            self.create_comments(options['comments'], users, posts)
+            self.create_messages(options['messages'], users)
+        self.log('Пересчёт счётчиков реакций')
+        if posts:
+            recount_reactions(Post.objects.filter(pk__gte=posts[0]))
+        self.create_profiles(users)
+        self.log('Индекс поиска пользователей')
+        user_index.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            'Готово. Ленты и полнотекстовый индекс пересобираются '
+            'командами rebuild_timelines и rebuild_search_index.'))
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def bulk(self, model, objects, **kwargs):
+        buffer = []
+        for obj in objects:
+            buffer.append(obj)
+            if len(buffer) >= self.batch:
+                with transaction.atomic():
+                    model.objects.bulk_create(buffer, **kwargs)
+                buffer = []
+        if buffer:
+            model.objects.bulk_create(buffer, **kwargs)
+
+    def past(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(PERIOD_DAYS * 86400))
+
+    def clear(self):
+        self.log('Удаление данных прошлого прогона')
+        Group.objects.filter(slug__startswith=PREFIX).delete()
+        users = User.objects.filter(username__startswith=PREFIX)
+        while users.exists():
+            User.objects.filter(pk__in=list(
+                users.values_list('pk', flat=True)[:self.batch])).delete()
+
+    def create_users(self, total):
+        self.log(f'Пользователи: {total}')
+        start = User.objects.filter(username__startswith=PREFIX).count()
+        password = make_password(PASSWORD)
+        self.bulk(User, (
+            User(
+                username=f'{PREFIX}{start + number}',
+                first_name=self.faker.first_name(),
+                last_name=self.faker.last_name(),
+                email=f'{PREFIX}{start + number}@example.com',
+                password=password,
+            )
+            for number in range(total)
+        ))
+        return list(User.objects.filter(username__startswith=PREFIX)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    def create_profiles(self, users):
+        """Профили со счётчиками, чтобы замеры шли через них."""
+        self.log('Профили и счётчики')
+        self.bulk(Profile, (Profile(user_id=pk) for pk in users),
+                  ignore_conflicts=True)
+        stats.reconcile(Profile.objects.filter(
+            user__username__startswith=PREFIX))
+
+    def create_groups(self, total):
+        self.log(f'Группы: {total}')
+        self.bulk(Group, (
+            Group(
+                title=self.faker.catch_phrase()[:200],
+                slug=f'{PREFIX}{number}',
+                description=self.random.choice(self.texts),
+            )
+            for number in range(total)
+        ), ignore_conflicts=True)
+        return list(Group.objects.filter(slug__startswith=PREFIX)
+                    .values_list('pk', flat=True))
+
+    def create_posts(self, total, users, groups):
+        self.log(f'Посты: {total}')
+        first = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        # Активность авторов неравномерна: треть постов у 1% авторов.
+        prolific = users[:max(1, len(users) // 100)]
+        self.bulk(Post, (
+            Post(
+                author_id=self.random.choice(
+                    prolific if self.random.random() < 0.33 else users),
+                group_id=(self.random.choice(groups)
+                          if groups and self.random.random() < 0.6
+                          else None),
+                text=self.random.choice(self.texts),
+                pub_date=self.past(),
+            )
+            for _ in range(total)
+        ))
+        return list(Post.objects.filter(pk__gt=first).order_by('pk')
+                    .values_list('pk', flat=True))
+
+    def create_follows(self, users, per_user):
+        self.log(f'Подписки: до {per_user} на пользователя')
+        prolific = users[:max(1, len(users) // 100)]
+
+        def follows():
+            for user_id in users:
+                authors = set(self.random.sample(
+                    prolific, min(per_user // 2, len(prolific))))
+                authors.update(self.random.sample(
+                    users, min(per_user - len(authors), len(users))))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.bulk(Follow, follows(), ignore_conflicts=True)
+
+    def create_likes(self, total, users, posts):
+        self.log(f'Лайки: {total}')
+        through = Post.likes.through
+        self.bulk(through, (
+            through(post_id=self.random.choice(posts),
+                    user_id=self.random.choice(users))
+            for _ in range(total)
+        ), ignore_conflicts=True)
+
+    def create_comments(self, total, users, posts):
+        self.log(f'Комментарии: {total}')
+        first = Comment.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        hot = posts[:max(1, len(posts) // 1000)]
+        self.bulk(Comment, (
+            Comment(
+                post_id=self.random.choice(
+                    hot if self.random.random() < 0.2 else posts),
+                author_id=self.random.choice(users),
+                text=self.random.choice(self.texts)[:300],
+                created=self.past(),
+            )
+            for _ in range(total)
+        ))
+        # bulk_create минует Comment.save(), путь верхнего уровня — id.
+        Comment.objects.filter(pk__gt=first).update(
+            path=LPad(Cast('id', CharField()), Comment.PATH_STEP,
+                      Value('0')),
+            depth=0)
+
+    def create_messages(self, total, users):
+        if len(users) < 2 or not total:
+            return
+        self.log(f'Сообщения: {total}')
+        pairs = set()
+        while len(pairs) < max(1, total // 20):
+            first, second = sorted(self.random.sample(users, 2))
+            pairs.add((first, second))
+        self.bulk(Conversation, (
+            Conversation(first_user_id=first, second_user_id=second)
+            for first, second in pairs
+        ), ignore_conflicts=True)
+        conversations = {
+            (first, second): pk
+            for pk, first, second in Conversation.objects.filter(
+                first_user_id__in=users).values_list(
+                    'pk', 'first_user_id', 'second_user_id')
+            if (first, second) in pairs
+        }
+        pairs = list(conversations)
+        first_message = Message.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+        def messages():
+            for _ in range(total):
+                pair = self.random.choice(pairs)
+                sender, recipient = pair
+                if self.random.random() < 0.5:
+                    sender, recipient = recipient, sender
+                yield Message(
+                    conversation_id=conversations[pair],
+                    sender_id=sender,
+                    recipient_id=recipient,
+                    body=self.faker.sentence(),
+                    date=self.past(),
+                )
+
+        self.bulk(Message, messages())
+        self.bulk(MessageState, (
+            MessageState(message_id=pk, user_id=recipient,
+                         is_read=self.random.random() < 0.8)
+            for pk, recipient in Message.objects.filter(
+                pk__gt=first_message).values_list('pk', 'recipient_id')
+            .iterator()
+        ), ignore_conflicts=True)
+        Conversation.objects.filter(
+            first_user__username__startswith=PREFIX,
+        ).update(last_message_at=self.last_message('date'),
+                 last_snippet=Coalesce(
+                     Substr(self.last_message('body'), 1, 100), Value('')),
+                 first_unread=self.unread('first_user'),
+                 second_unread=self.unread('second_user'))
+
+    def last_message(self, field):
+        """Поле последнего сообщения диалога."""
+        return Subquery(
+            Message.objects.filter(conversation=OuterRef('pk'))
+            .order_by('-date').values(field)[:1])
+
+    def unread(self, participant):
+        """Непрочитанные участником сообщения диалога по MessageState."""
+        return Coalesce(Subquery(
+            MessageState.objects.filter(
+                message__conversation=OuterRef('pk'),
+                user=OuterRef(participant), is_read=False)
+            .values('message__conversation')
+            .annotate(total=Count('*'))
+            .values('total')
+        ), Value(0))
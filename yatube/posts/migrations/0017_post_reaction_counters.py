@@ -0,0 +1,50 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_reaction_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+
+    def count(through):
+        return Coalesce(
+            Subquery(
+                through.objects.filter(post_id=OuterRef("pk"))
+                .values("post_id")
+                .annotate(total=Count("*"))
+                .values("total")
+            ),
+            Value(0),
+        )
+
+    Post.objects.update(
+        likes_count=count(Post.likes.through),
+        dislikes_count=count(Post.dislikes.through),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0016_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="dislikes_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Дизлайки"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Лайки"
+            ),
+        ),
+        migrations.RunPython(fill_reaction_counters, migrations.RunPython.noop),
+    ]
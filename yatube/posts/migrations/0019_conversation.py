@@ -0,0 +1,92 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_conversations(apps, schema_editor):
+    Message = apps.get_model("posts", "Message")
+    Conversation = apps.get_model("posts", "Conversation")
+    summaries = {}
+    for message in Message.objects.order_by("date").iterator():
+        owner, partner = message.user_id, message.recipient_id
+        pair = (min(owner, partner), max(owner, partner))
+        summary = summaries.setdefault(pair, {"first_unread": 0, "second_unread": 0})
+        summary["last_message_at"] = message.date
+        summary["last_snippet"] = (message.body or "")[:100]
+        if not message.is_read:
+            side = "first_unread" if owner == pair[0] else "second_unread"
+            summary[side] += 1
+    Conversation.objects.bulk_create(
+        Conversation(first_user_id=first, second_user_id=second, **summary)
+        for (first, second), summary in summaries.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0018_timelineentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Conversation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_message_at", models.DateTimeField(blank=True, null=True)),
+                ("last_snippet", models.CharField(blank=True, max_length=100)),
+                ("first_unread", models.PositiveIntegerField(default=0)),
+                ("second_unread", models.PositiveIntegerField(default=0)),
+                (
+                    "first_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="conversations_started",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "second_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="conversations_joined",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Диалог",
+                "verbose_name_plural": "Диалоги",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["first_user", "-last_message_at"], name="conv_first_last_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="conversation",
+            index=models.Index(
+                fields=["second_user", "-last_message_at"], name="conv_second_last_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="conversation",
+            constraint=models.UniqueConstraint(
+                fields=("first_user", "second_user"), name="unique_conversation"
+            ),
+        ),
+        migrations.RunPython(build_conversations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,154 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:05
+
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def deduplicate_messages(apps, schema_editor):
+    """Оставляет копию отправителя, копию получателя переносит в состояние."""
+    Message = apps.get_model("posts", "Message")
+    MessageState = apps.get_model("posts", "MessageState")
+    Conversation = apps.get_model("posts", "Conversation")
+    conversations = {
+        (conversation.first_user_id, conversation.second_user_id): conversation.pk
+        for conversation in Conversation.objects.all()
+    }
+
+    def conversation_id(user_id, other_id):
+        pair = (min(user_id, other_id), max(user_id, other_id))
+        if pair not in conversations:
+            conversations[pair] = Conversation.objects.create(
+                first_user_id=pair[0], second_user_id=pair[1]
+            ).pk
+        return conversations[pair]
+
+    sent = defaultdict(deque)
+    kept, states, duplicates = [], [], []
+    for message in Message.objects.order_by("id").iterator():
+        if message.user_id == message.sender_id:
+            sent[(message.sender_id, message.recipient_id, message.body)].append(
+                message
+            )
+            message.conversation_id = conversation_id(
+                message.sender_id, message.recipient_id
+            )
+            kept.append(message)
+            continue
+        waiting = sent[(message.sender_id, message.user_id, message.body)]
+        if waiting:
+            original = waiting.popleft()
+            duplicates.append(message.pk)
+        else:
+            original = message
+            original.recipient_id = message.user_id
+            original.conversation_id = conversation_id(
+                message.sender_id, message.user_id
+            )
+            kept.append(original)
+        states.append(
+            MessageState(
+                message_id=original.pk,
+                user_id=message.user_id,
+                is_read=message.is_read,
+            )
+        )
+    Message.objects.bulk_update(
+        kept, ["conversation", "recipient"], batch_size=BATCH_SIZE
+    )
+    MessageState.objects.bulk_create(states, batch_size=BATCH_SIZE)
+    for start in range(0, len(duplicates), BATCH_SIZE):
+        Message.objects.filter(pk__in=duplicates[start : start + BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0019_conversation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MessageState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("is_read", models.BooleanField(default=False)),
+                ("is_deleted", models.BooleanField(default=False)),
+                (
+                    "message",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="states",
+                        to="posts.message",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="message_states",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="conversation",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="messages",
+                to="posts.conversation",
+            ),
+        ),
+        migrations.RunPython(deduplicate_messages, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="message",
+            name="is_read",
+        ),
+        migrations.RemoveField(
+            model_name="message",
+            name="user",
+        ),
+        migrations.AlterField(
+            model_name="message",
+            name="conversation",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="messages",
+                to="posts.conversation",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "date"], name="message_conversation_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="messagestate",
+            index=models.Index(
+                fields=["user", "is_read"], name="message_state_unread_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="messagestate",
+            constraint=models.UniqueConstraint(
+                fields=("message", "user"), name="unique_message_state"
+            ),
+        ),
+    ]
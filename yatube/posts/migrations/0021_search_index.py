@@ -0,0 +1,63 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:12
+
+from django.db import OperationalError, migrations, models
+
+FTS_TABLE = "posts_search_fts"
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(body, tokenize='unicode61 remove_diacritics 0')"
+        )
+    except OperationalError:
+        pass
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0020_single_row_messages"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("doc_type", models.PositiveSmallIntegerField()),
+                ("doc_id", models.PositiveIntegerField()),
+                ("frequency", models.PositiveIntegerField(default=1)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="searchterm",
+            index=models.Index(
+                fields=["term", "doc_type", "doc_id"], name="search_term_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="searchterm",
+            index=models.Index(
+                fields=["doc_type", "doc_id"], name="search_document_idx"
+            ),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
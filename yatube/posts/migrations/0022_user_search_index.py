@@ -0,0 +1,100 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+SEPARATOR_RE = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    return (text or "").strip().lower().replace("ё", "е")
+
+
+def index_users(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    UserSearchToken = apps.get_model("posts", "UserSearchToken")
+    UserTrigram = apps.get_model("posts", "UserTrigram")
+    tokens, grams = [], []
+    for user in User.objects.only("username", "first_name", "last_name"):
+        words = {normalize(user.username)}
+        for value in (user.username, user.first_name, user.last_name):
+            words.update(SEPARATOR_RE.split(normalize(value)))
+        words.discard("")
+        user_grams = set()
+        for word in words:
+            tokens.append(UserSearchToken(user_id=user.pk, token=word))
+            padded = f"  {word} "
+            user_grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+        grams.extend(UserTrigram(user_id=user.pk, trigram=g) for g in user_grams)
+    UserSearchToken.objects.bulk_create(tokens, batch_size=500)
+    UserTrigram.objects.bulk_create(grams, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0021_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("trigram", models.CharField(max_length=3)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_trigrams",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UserSearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=150)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="usertrigram",
+            constraint=models.UniqueConstraint(
+                fields=("trigram", "user"), name="unique_user_trigram"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usersearchtoken",
+            index=models.Index(fields=["token", "user"], name="user_search_token_idx"),
+        ),
+        migrations.RunPython(index_users, migrations.RunPython.noop),
+    ]
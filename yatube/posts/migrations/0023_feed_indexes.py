@@ -0,0 +1,56 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:18
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model("posts", "Follow")
+    duplicates = (
+        Follow.objects.values("user", "author")
+        .annotate(keep=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for row in duplicates:
+        Follow.objects.filter(user=row["user"], author=row["author"]).exclude(
+            pk=row["keep"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0022_user_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created"], name="comment_post_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["-pub_date", "-id"], name="post_pub_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-pub_date", "-id"], name="post_author_pub_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["group", "-pub_date", "-id"], name="post_group_pub_date_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="follow",
+            constraint=models.UniqueConstraint(
+                fields=("user", "author"), name="unique_follow"
+            ),
+        ),
+    ]
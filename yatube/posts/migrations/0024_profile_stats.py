@@ -0,0 +1,69 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:22
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("user_id")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("*"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Profile = apps.get_model("posts", "Profile")
+    Post = apps.get_model("posts", "Post")
+    Follow = apps.get_model("posts", "Follow")
+    Profile.objects.update(
+        posts_count=count(Post.objects.all(), "author_id"),
+        followers_count=count(Follow.objects.all(), "author_id"),
+        following_count=count(Follow.objects.all(), "user_id"),
+        likes_received=count(Post.likes.through.objects.all(), "post__author_id"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0023_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="followers_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Подписчиков"
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="following_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Подписок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="likes_received",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Получено лайков"
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="posts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Постов"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+
+
+def fill_paths(apps, schema_editor):
+    Comment = apps.get_model("posts", "Comment")
+    Comment.objects.update(path=LPad(Cast("id", CharField()), 10, Value("0")), depth=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0024_profile_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="replies",
+                to="posts.comment",
+                verbose_name="Ответ на",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["post", "path"], name="comment_post_path_idx"),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def mark_built(apps, schema_editor):
+    TimelineEntry = apps.get_model("posts", "TimelineEntry")
+    TimelineState = apps.get_model("posts", "TimelineState")
+    now = timezone.now()
+    TimelineState.objects.bulk_create(
+        [
+            TimelineState(user_id=user_id, built_at=now)
+            for user_id in TimelineEntry.objects.values_list(
+                "user_id", flat=True
+            ).distinct()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("posts", "0025_comment_threads"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimelineState",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="timeline_state",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("built_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(mark_built, migrations.RunPython.noop),
+    ]
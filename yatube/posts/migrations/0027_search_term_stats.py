@@ -0,0 +1,54 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_stats(apps, schema_editor):
+    SearchTerm = apps.get_model("posts", "SearchTerm")
+    SearchTermStats = apps.get_model("posts", "SearchTermStats")
+    rows = [
+        SearchTermStats(term=row["term"], doc_type=row["doc_type"], documents=row["total"])
+        for row in SearchTerm.objects.values("term", "doc_type").annotate(total=Count("id"))
+    ]
+    rows += [
+        SearchTermStats(term="", doc_type=row["doc_type"], documents=row["total"])
+        for row in SearchTerm.objects.values("doc_type").annotate(
+            total=Count("doc_id", distinct=True)
+        )
+    ]
+    SearchTermStats.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0026_timeline_state"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchTermStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("doc_type", models.PositiveSmallIntegerField()),
+                ("documents", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="searchtermstats",
+            constraint=models.UniqueConstraint(
+                fields=("term", "doc_type"), name="unique_search_term_stats"
+            ),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
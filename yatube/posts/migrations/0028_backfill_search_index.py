@@ -0,0 +1,79 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations
+
+FTS_TABLE = "posts_search_fts"
+DOC_TYPES = {"post": 0, "comment": 1}
+
+
+def documents(apps):
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    for pk, text in Post.objects.values_list("pk", "text").iterator():
+        yield DOC_TYPES["post"], pk, text
+    comments = Comment.objects.filter(active=True).values_list("pk", "text")
+    for pk, text in comments.iterator():
+        yield DOC_TYPES["comment"], pk, text
+
+
+def use_fts(connection):
+    name = getattr(settings, "POSTS_SEARCH_BACKEND", "auto")
+    return name == "fts5" or (
+        name == "auto"
+        and connection.vendor == "sqlite"
+        and FTS_TABLE in connection.introspection.table_names()
+    )
+
+
+def backfill_search_index(apps, schema_editor):
+    from posts.search import tokenize
+
+    connection = schema_editor.connection
+    if use_fts(connection):
+        rows = [
+            (doc_id * len(DOC_TYPES) + doc_type, " ".join(terms))
+            for doc_type, doc_id, text in documents(apps)
+            if (terms := tokenize(text))
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)", rows
+            )
+        return
+    SearchTerm = apps.get_model("posts", "SearchTerm")
+    SearchTermStats = apps.get_model("posts", "SearchTermStats")
+    SearchTerm.objects.all().delete()
+    SearchTermStats.objects.all().delete()
+    postings, stats = [], Counter()
+    for doc_type, doc_id, text in documents(apps):
+        counts = Counter(term[:64] for term in tokenize(text))
+        if not counts:
+            continue
+        postings.extend(
+            SearchTerm(
+                term=term, doc_type=doc_type, doc_id=doc_id, frequency=n
+            )
+            for term, n in counts.items()
+        )
+        stats.update((term, doc_type) for term in ["", *counts])
+    SearchTerm.objects.bulk_create(postings, batch_size=500)
+    SearchTermStats.objects.bulk_create(
+        [
+            SearchTermStats(term=term, doc_type=doc_type, documents=total)
+            for (term, doc_type), total in stats.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0027_search_term_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
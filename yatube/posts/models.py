@@ -1,9 +1,19 @@
+import hashlib
+import secrets
+
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import Max
+from django.db import models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Sum, When
+
+from .caching import (fragment_cache, reset_unread_directs,
+                      unread_directs_key)
 
 User = get_user_model()
 
+# Недолгий срок: промах, прочитавший счётчик до фиксации нового
+# сообщения, может положить в кэш старое значение.
+UNREAD_TIMEOUT = 60
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -17,6 +27,14 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+        ]
+
 
 class Profile(models.Model):
     user = models.OneToOneField(
@@ -42,6 +60,22 @@ class Profile(models.Model):
         blank=True,
         null=True,
         verbose_name='День рождения')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Постов')
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Подписок')
+    likes_received = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Получено лайков')
 
     def __str__(self):
         return str(self.user)
@@ -100,14 +134,43 @@ class Post(models.Model):
         User,
         blank=True,
         related_name='dislikes')
+    likes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Лайки')
+    dislikes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Дизлайки')
 
     def __str__(self):
         return self.text[:15]
 
+    @staticmethod
+    def author_group_ids(user_id):
+        """Группы, в которых есть посты автора."""
+        return Post.objects.filter(
+            author_id=user_id, group__isnull=False,
+        ).order_by().values_list('group_id', flat=True).distinct()
+
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -127,21 +190,192 @@ class Comment(models.Model):
     text = models.TextField(verbose_name='Комментарий')
     updated = models.DateTimeField(auto_now=True)
     active = models.BooleanField(default=True, verbose_name='Статус')
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='replies',
+        verbose_name='Ответ на',
+    )
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    PATH_STEP = 10
+    PATH_SEPARATOR = '.'
+    MAX_DEPTH = 8
 
     class Meta:
         ordering = ('created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx',
+            ),
+            models.Index(
+                fields=('post', 'path'),
+                name='comment_post_path_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        """Материализованный путь: id предков и свой, дополненные нулями.
 
-class Message(models.Model):
-    user = models.ForeignKey(
+        Ответы глубже MAX_DEPTH прикрепляются к предку на этой глубине.
+        """
+        while self.parent is not None and self.parent.depth >= self.MAX_DEPTH:
+            self.parent = self.parent.parent
+        super().save(*args, **kwargs)
+        if self.path:
+            return
+        segment = str(self.pk).zfill(self.PATH_STEP)
+        if self.parent is None:
+            self.path, self.depth = segment, 0
+        else:
+            self.path = self.PATH_SEPARATOR.join((self.parent.path, segment))
+            self.depth = self.parent.depth + 1
+        Comment.objects.filter(pk=self.pk).update(
+            path=self.path, depth=self.depth)
+
+    def subtree(self):
+        """Комментарий с ответами одним диапазонным запросом по пути."""
+        return Comment.objects.filter(
+            post_id=self.post_id,
+            path__gte=self.path,
+            path__lt=self.path + chr(ord(self.PATH_SEPARATOR) + 1),
+        ).order_by('path')
+
+
+class Conversation(models.Model):
+    first_user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='conversations_started',
+    )
+    second_user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='user'
+        related_name='conversations_joined',
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_snippet = models.CharField(max_length=100, blank=True)
+    first_unread = models.PositiveIntegerField(default=0)
+    second_unread = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('first_user', 'second_user'),
+                name='unique_conversation',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('first_user', '-last_message_at'),
+                name='conv_first_last_idx',
+            ),
+            models.Index(
+                fields=('second_user', '-last_message_at'),
+                name='conv_second_last_idx',
+            ),
+        ]
+        verbose_name = 'Диалог'
+        verbose_name_plural = 'Диалоги'
+
+    def __str__(self):
+        return f'{self.first_user} — {self.second_user}'
+
+    @staticmethod
+    def ordered_pair(user, other):
+        """Участники диалога в порядке возрастания pk."""
+        if user.pk < other.pk:
+            return user, other
+        return other, user
+
+    @classmethod
+    def for_user(cls, user):
+        return (
+            cls.objects.filter(Q(first_user=user) | Q(second_user=user))
+            .select_related('first_user', 'second_user')
+            .order_by('-last_message_at')
+        )
+
+    @classmethod
+    def between(cls, user, other):
+        first, second = cls.ordered_pair(user, other)
+        conversation, _ = cls.objects.get_or_create(
+            first_user=first, second_user=second)
+        return conversation
+
+    def record_message(self, message):
+        """Обновляет сводку диалога после нового сообщения."""
+        unread = (
+            'second_unread' if message.recipient_id == self.second_user_id
+            else 'first_unread')
+        Conversation.objects.filter(pk=self.pk).update(
+            last_message_at=message.date,
+            last_snippet=(message.body or '')[:100],
+            **{unread: F(unread) + 1},
+        )
+        reset_unread_directs(message.recipient_id)
+
+    @classmethod
+    def mark_read(cls, user, other):
+        """Обнуляет непрочитанные сообщения user в диалоге с other."""
+        first, second = cls.ordered_pair(user, other)
+        unread = 'first_unread' if user == first else 'second_unread'
+        if cls.objects.filter(
+                first_user=first, second_user=second,
+                **{f'{unread}__gt': 0}).update(**{unread: 0}):
+            reset_unread_directs(user.pk)
+
+    @classmethod
+    def unread_total(cls, user):
+        return cls.objects.filter(
+            Q(first_user=user) | Q(second_user=user)
+        ).aggregate(total=Sum(Case(
+            When(first_user=user, then=F('first_unread')),
+            default=F('second_unread'),
+        )))['total'] or 0
+
+    @classmethod
+    def unread_count(cls, user_id):
+        """unread_total из кэша: в БД идёт только промах.
+
+        Отправка и прочтение удаляют ключ. С общим кэшем фрагментов
+        это видно всем воркерам сразу; с кэшем процесса (LocMemCache)
+        удаление доходит лишь до своего воркера, и счётчик у других
+        отстаёт не дольше UNREAD_TIMEOUT секунд.
+        """
+        cache = fragment_cache()
+        key = unread_directs_key(user_id)
+        total = cache.get(key)
+        if total is None:
+            total = cls.unread_total(user_id)
+            cache.add(key, total, UNREAD_TIMEOUT)
+        return total
+
+    def partner_for(self, user):
+        if self.first_user_id == user.pk:
+            return self.second_user
+        return self.first_user
+
+    def unread_for(self, user):
+        if self.first_user_id == user.pk:
+            return self.first_unread
+        return self.second_unread
+
+
+class Message(models.Model):
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='messages'
     )
     sender = models.ForeignKey(
         User,
@@ -155,41 +389,241 @@ class Message(models.Model):
     )
     body = models.TextField(max_length=1000, blank=True, null=True)
     date = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('conversation', 'date'),
+                name='message_conversation_date_idx',
+            ),
+        ]
+
+    @transaction.atomic
     def send_message(from_user, to_user, body):
-        sender_message = Message(
-            user=from_user,
+        conversation = Conversation.between(from_user, to_user)
+        message = Message.objects.create(
+            conversation=conversation,
             sender=from_user,
             recipient=to_user,
-            body=body,
-            is_read=True)
-        sender_message.save()
-
-        recipient_message = Message(
-            user=to_user,
-            sender=from_user,
-            body=body,
-            recipient=from_user,)
-        recipient_message.save()
-        return sender_message
+            body=body)
+        MessageState.objects.create(message=message, user=to_user)
+        conversation.record_message(message)
+        return message
 
     def get_messages(user):
-        messages = (
-            Message
-            .objects.filter(user=user)
-            .values('recipient')
-            .annotate(last=Max('date'))
-            .order_by('-last')
+        return [
+            {
+                'user': conversation.partner_for(user),
+                'last': conversation.last_message_at,
+                'snippet': conversation.last_snippet,
+                'unread': conversation.unread_for(user),
+            }
+            for conversation in Conversation.for_user(user)
+        ]
+
+    def thread(user, partner):
+        """Сообщения диалога, видимые user, в порядке отправки."""
+        first, second = Conversation.ordered_pair(user, partner)
+        return (
+            Message.objects.filter(
+                conversation__first_user=first,
+                conversation__second_user=second)
+            .exclude(Exists(MessageState.objects.filter(
+                message=OuterRef('pk'), user=user, is_deleted=True)))
+            .select_related('sender', 'recipient')
+            .order_by('date')
         )
-        users = []
-        for message in messages:
-            users.append({
-                'user': User.objects.get(pk=message['recipient']),
-                'last': message['last'],
-                'unread': Message.objects.filter(
-                    user=user,
-                    recipient__pk=message['recipient'],
-                    is_read=False).count()
-            })
-        return users
+
+    def mark_read(user, partner):
+        MessageState.objects.filter(
+            user=user,
+            is_read=False,
+            message__in=Message.thread(user, partner).values('pk'),
+        ).update(is_read=True)
+        Conversation.mark_read(user, partner)
+
+    def hide_for(self, user):
+        MessageState.objects.update_or_create(
+            message=self,
+            user=user,
+            defaults={'is_deleted': True, 'is_read': True})
+
+
+class MessageState(models.Model):
+    """Состояние сообщения для участника, если оно не по умолчанию.
+
+    Строка создаётся для получателя при отправке; отсутствие строки
+    означает, что сообщение прочитано и не удалено.
+    """
+    message = models.ForeignKey(
+        Message,
+        on_delete=models.CASCADE,
+        related_name='states'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='message_states'
+    )
+    is_read = models.BooleanField(default=False)
+    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('message', 'user'),
+                name='unique_message_state',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', 'is_read'),
+                name='message_state_unread_idx',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date'),
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+
+
+class TimelineState(models.Model):
+    """Отметка о том, что лента пользователя собрана, даже пустая."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timeline_state',
+    )
+    built_at = models.DateTimeField(auto_now=True)
+
+
+class SearchTerm(models.Model):
+    """Запись обратного индекса: основа слова в посте или комментарии."""
+    term = models.CharField(max_length=64)
+    doc_type = models.PositiveSmallIntegerField()
+    doc_id = models.PositiveIntegerField()
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('term', 'doc_type', 'doc_id'),
+                name='search_term_idx',
+            ),
+            models.Index(
+                fields=('doc_type', 'doc_id'),
+                name='search_document_idx',
+            ),
+        ]
+
+
+class SearchTermStats(models.Model):
+    """Число документов типа doc_type со словом term.
+
+    Строка с пустым term хранит число проиндексированных документов
+    типа, так что idf считается без прохода по SearchTerm.
+    """
+    term = models.CharField(max_length=64)
+    doc_type = models.PositiveSmallIntegerField()
+    documents = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('term', 'doc_type'),
+                name='unique_search_term_stats',
+            ),
+        ]
+
+
+class UserSearchToken(models.Model):
+    """Нормализованное слово из имени пользователя для поиска по префиксу."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+    )
+    token = models.CharField(max_length=150)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=('token', 'user'),
+                name='user_search_token_idx',
+            ),
+        ]
+
+
+class UserTrigram(models.Model):
+    """Триграмма имени пользователя для нечёткого поиска."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='search_trigrams',
+    )
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('trigram', 'user'),
+                name='unique_user_trigram',
+            ),
+        ]
+
+
+class ApiToken(models.Model):
+    """Токен API для клиентов без cookie: Authorization: Token <key>.
+
+    В базе лежит только SHA-256 ключа, сам ключ отдаётся один раз
+    при выпуске.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_tokens',
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def hash(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        key = secrets.token_urlsafe(32)
+        cls.objects.create(digest=cls.hash(key), user=user)
+        return key
+
+    @classmethod
+    def user_for(cls, key):
+        token = cls.objects.filter(
+            digest=cls.hash(key), user__is_active=True,
+        ).select_related('user').first()
+        return token and token.user
@@ -0,0 +1,137 @@
+import hashlib
+import re
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .conditional import scope_versions, viewer
+
+PAGE_TIMEOUT = 60 * 60 * 24
+LOCK_TIMEOUT = 30
+CSRF_PLACEHOLDER = '<!--csrf_token-->'
+CSRF_INPUT = re.compile(
+    r'(<input type="hidden" name="csrfmiddlewaretoken" value=")[^"]*(">)')
+
+
+def page_cache():
+    return caches[getattr(settings, 'POSTS_PAGE_CACHE', 'default')]
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{request.method}:{path}'
+
+
+def cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and viewer(request) == 'anon'
+        and 'messages' not in request.COOKIES
+    )
+
+
+def _serve(request, entry):
+    content = entry['content']
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+    return HttpResponse(content, content_type=entry['content_type'])
+
+
+def _store(plan, response, timeout):
+    if hasattr(response, 'render'):
+        response = response.render()
+    if (response.status_code != 200 or response.streaming
+            or response.cookies):
+        return response
+    key, signature, _ = plan
+    content = CSRF_INPUT.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>',
+                             response.content.decode(response.charset))
+    page_cache().set(key, {
+        'signature': signature,
+        'content': content,
+        'content_type': response['Content-Type'],
+    }, timeout)
+    return response
+
+
+def _release(plan):
+    key, _, locked = plan
+    if locked:
+        page_cache().delete(f'{key}:lock')
+
+
+def _lookup(request, scopes, args, kwargs):
+    """Копия из кэша или план пересборки (key, signature, locked).
+
+    (None, None) — страницу не кэшируем.
+    """
+    if not cacheable(request):
+        return None, None
+    signature = ''
+    if scopes is not None:
+        versions = scope_versions(request, scopes, args, kwargs)
+        if versions is None:
+            return None, None
+        signature = '|'.join(versions[key] for key in sorted(versions))
+    cache = page_cache()
+    key = page_key(request)
+    entry = cache.get(key)
+    if entry is not None and entry['signature'] == signature:
+        return _serve(request, entry), None
+    locked = cache.add(f'{key}:lock', 1, LOCK_TIMEOUT)
+    if entry is not None and not locked:
+        return _serve(request, entry), None
+    return None, (key, signature, locked)
+
+
+def cache_anonymous(scopes=None, timeout=PAGE_TIMEOUT):
+    """Кэш страницы целиком для анонимных посетителей.
+
+    Копия помечена метками версий областей scopes (лента, группа, автор):
+    после их смены она устаревает, но не удаляется. Пересобирает
+    страницу только тот, кто первым взял блокировку через cache.add,
+    остальные пока отдают устаревшую копию. Без scopes копия живёт
+    timeout секунд. CSRF-токен подставляется при каждом ответе.
+    Подходит и для async-представлений.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_wrapper(view, scopes, timeout)
+        return _sync_wrapper(view, scopes, timeout)
+    return decorator
+
+
+def _sync_wrapper(view, scopes, timeout):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        cached, plan = _lookup(request, scopes, args, kwargs)
+        if cached is not None:
+            return cached
+        if plan is None:
+            return view(request, *args, **kwargs)
+        try:
+            return _store(plan, view(request, *args, **kwargs), timeout)
+        finally:
+            _release(plan)
+    return wrapper
+
+
+def _async_wrapper(view, scopes, timeout):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        cached, plan = await sync_to_async(_lookup)(
+            request, scopes, args, kwargs)
+        if cached is not None:
+            return cached
+        if plan is None:
+            return await view(request, *args, **kwargs)
+        try:
+            response = await view(request, *args, **kwargs)
+            return await sync_to_async(_store)(plan, response, timeout)
+        finally:
+            await sync_to_async(_release)(plan)
+    return wrapper
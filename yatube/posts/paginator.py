@@ -0,0 +1,222 @@
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+
+CURSOR_SALT = 'posts.paginator.cursor'
+COUNT_CACHE_TIMEOUT = 60
+FIRST = 'first'
+LAST = 'last'
+NEXT = 'next'
+PREVIOUS = 'prev'
+
+
+class CursorPaginator:
+    """Постраничная навигация по ключу (pub_date, id) без COUNT и OFFSET."""
+
+    def __init__(self, object_list, per_page, count_key=None):
+        self.object_list = object_list.order_by('-pub_date', '-id')
+        self.per_page = int(per_page)
+        self.count_key = count_key
+
+    @property
+    def count_cache_key(self):
+        return f'paginator:count:{self.count_key}'
+
+    @property
+    def count(self):
+        """Приблизительное число объектов, если задан ключ кэша."""
+        if self.count_key is None:
+            return None
+        return cache.get_or_set(
+            self.count_cache_key, self.object_list.count,
+            COUNT_CACHE_TIMEOUT)
+
+    async def acount(self):
+        if self.count_key is None:
+            return None
+        count = await cache.aget(self.count_cache_key)
+        if count is None:
+            count = await self.object_list.acount()
+            await cache.aset(self.count_cache_key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    def pages_for(self, count):
+        if count is None:
+            return None
+        return max(1, -(-count // self.per_page))
+
+    @property
+    def num_pages(self):
+        return self.pages_for(self.count)
+
+    @property
+    def page_range(self):
+        if self.num_pages is None:
+            return range(1, 1)
+        return range(1, self.num_pages + 1)
+
+    def encode_cursor(self, post, direction, number):
+        return signing.dumps(
+            [post.pub_date.isoformat(), post.pk, direction, number],
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    def decode_cursor(self, cursor):
+        if cursor in (FIRST, LAST):
+            return None, None, cursor, None
+        try:
+            pub_date, pk, direction, number = signing.loads(
+                cursor, salt=CURSOR_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None, None, FIRST, 1
+        return pub_date, pk, direction, number
+
+    def _plan(self, cursor=None, number=None):
+        """Запрос страницы: (queryset, forward, number, flag).
+
+        queryset уже ограничен per_page + 1 строками. None вместо него —
+        последняя страница: её номер известен только из count. flag —
+        has_previous для движения вперёд и has_next для движения назад.
+        """
+        if cursor:
+            pub_date, pk, direction, number = self.decode_cursor(cursor)
+            if direction == LAST:
+                return None, False, None, False
+            if direction == NEXT:
+                after = self.object_list.filter(
+                    Q(pub_date__lt=pub_date)
+                    | Q(pub_date=pub_date, pk__lt=pk))
+                return self._slice(after, True), True, number, True
+            if direction == PREVIOUS:
+                before = self.object_list.filter(
+                    Q(pub_date__gt=pub_date)
+                    | Q(pub_date=pub_date, pk__gt=pk))
+                return self._slice(before, False), False, number, True
+            return self._slice(self.object_list, True), True, 1, False
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            number = 1
+        if number > 1:
+            offset = (number - 1) * self.per_page
+            return (self.object_list[offset:offset + self.per_page + 1],
+                    True, number, True)
+        return self._slice(self.object_list, True), True, 1, False
+
+    def _slice(self, queryset, forward):
+        if not forward:
+            queryset = queryset.reverse()
+        return queryset[:self.per_page + 1]
+
+    def get_page(self, cursor=None, number=None):
+        """Возвращает страницу по курсору или по старому номеру ?page=N."""
+        queryset, forward, number, flag = self._plan(cursor, number)
+        objects = [] if queryset is None else list(queryset)
+        if queryset is None or (not objects and not cursor and number > 1):
+            last = list(self._slice(self.object_list, False))
+            return self._page(last, False, self.num_pages, False)
+        return self._page(objects, forward, number, flag)
+
+    async def aget_page(self, cursor=None, number=None):
+        """get_page() на async ORM."""
+        queryset, forward, number, flag = self._plan(cursor, number)
+        objects = [] if queryset is None else [
+            obj async for obj in queryset]
+        if queryset is None or (not objects and not cursor and number > 1):
+            last = [obj async for obj in self._slice(self.object_list, False)]
+            pages = self.pages_for(await self.acount())
+            return self._page(last, False, pages, False)
+        return self._page(objects, forward, number, flag)
+
+    def _page(self, objects, forward, number, flag):
+        """CursorPage из строк, прочитанных по _plan()."""
+        if forward:
+            return CursorPage(
+                objects[:self.per_page], number, self,
+                has_next=len(objects) > self.per_page,
+                has_previous=flag,
+            )
+        has_previous = len(objects) > self.per_page
+        objects = objects[:self.per_page][::-1]
+        if not has_previous:
+            number = 1
+        elif number is not None and number <= 1:
+            number = None
+        return CursorPage(objects, number, self,
+                          has_next=flag, has_previous=has_previous)
+
+
+class CursorPage:
+    """Страница, совместимая с django.core.paginator.Page в шаблонах."""
+
+    def __init__(self, object_list, number, paginator, has_next,
+                 has_previous):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1 if self.number else None
+
+    def previous_page_number(self):
+        return self.number - 1 if self.number else None
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[-1], NEXT, self.next_page_number())
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(
+            self.object_list[0], PREVIOUS, self.previous_page_number())
+
+    @property
+    def first_cursor(self):
+        return FIRST
+
+    @property
+    def last_cursor(self):
+        return LAST
+
+
+def get_page(request, object_list, per_page, count_key=None):
+    """Страница ленты по параметрам запроса cursor или page."""
+    paginator = CursorPaginator(object_list, per_page, count_key=count_key)
+    return paginator.get_page(
+        request.GET.get('cursor'), request.GET.get('page'))
+
+
+async def aget_page(request, object_list, per_page, count_key=None):
+    """get_page() для async-представлений."""
+    paginator = CursorPaginator(object_list, per_page, count_key=count_key)
+    return await paginator.aget_page(
+        request.GET.get('cursor'), request.GET.get('page'))
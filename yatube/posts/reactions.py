@@ -0,0 +1,373 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (Count, Exists, F, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce
+
+from . import stats
+from .caching import bump_post_scopes, fragment_cache, pending_reaction_key
+from .models import Post, Profile, User
+
+LIKES = 'likes'
+DISLIKES = 'dislikes'
+OPPOSITE = {LIKES: DISLIKES, DISLIKES: LIKES}
+
+WRITE_BEHIND_DEFAULTS = {
+    'ENABLED': False,
+    'LOG_DIR': None,
+    'FLUSH_INTERVAL': 0.3,
+    'BATCH_SIZE': 1000,
+    'FSYNC': False,
+    'PENDING_TIMEOUT': 60 * 60,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def write_behind_settings():
+    return {**WRITE_BEHIND_DEFAULTS,
+            **getattr(settings, 'POSTS_REACTIONS_WRITE_BEHIND', {})}
+
+
+def _through(reaction):
+    return getattr(Post, reaction).through
+
+
+def _insert(through, post_id, user_id):
+    """True, если строка реакции вставлена, а не уже была."""
+    try:
+        with transaction.atomic():
+            through.objects.create(post_id=post_id, user_id=user_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def toggle_reaction(post, user, reaction):
+    """Ставит или снимает реакцию и возвращает True, если она поставлена.
+
+    Противоположная реакция пользователя снимается в той же транзакции,
+    счётчики поста меняются через F(), без чтения всего списка лайков.
+    Вставка идёт в точке сохранения: если параллельный двойной клик уже
+    вставил строку, IntegrityError гасится и счётчик не растёт второй
+    раз. post нужен с author_id и group_id. В режиме write-behind клик
+    только пишется в журнал буфера.
+    """
+    if write_behind_settings()['ENABLED']:
+        return get_buffer().toggle(post.pk, user.pk, reaction)
+    opposite = OPPOSITE[reaction]
+    counters = {}
+    with transaction.atomic():
+        removed_opposite, _ = _through(opposite).objects.filter(
+            post_id=post.pk, user_id=user.pk).delete()
+        if removed_opposite:
+            counters[f'{opposite}_count'] = F(f'{opposite}_count') - 1
+        removed, _ = _through(reaction).objects.filter(
+            post_id=post.pk, user_id=user.pk).delete()
+        if removed:
+            counters[f'{reaction}_count'] = F(f'{reaction}_count') - 1
+        elif _insert(_through(reaction), post.pk, user.pk):
+            counters[f'{reaction}_count'] = F(f'{reaction}_count') + 1
+        if counters:
+            Post.objects.filter(pk=post.pk).update(**counters)
+        if 'likes_count' in counters:
+            stats.adjust(post.author_id, likes_received=(
+                -1 if reaction == DISLIKES or removed else 1))
+        bump_post_scopes(post.pk, post.author_id, post.group_id)
+    return not removed
+
+
+def _count_subquery(reaction):
+    return Coalesce(
+        Subquery(
+            _through(reaction).objects
+            .filter(post_id=OuterRef('pk'))
+            .values('post_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def recount_reactions(posts=None):
+    """Пересчитывает счётчики реакций по таблицам M2M одним UPDATE."""
+    if posts is None:
+        posts = Post.objects.all()
+    return posts.update(
+        likes_count=_count_subquery(LIKES),
+        dislikes_count=_count_subquery(DISLIKES),
+    )
+
+
+def current_reaction(post_id, user_id):
+    """Реакция пользователя на пост одним запросом."""
+    flags = Post.objects.filter(pk=post_id).values_list(
+        *(Exists(_through(reaction).objects.filter(
+            post_id=OuterRef('pk'), user_id=user_id))
+          for reaction in (LIKES, DISLIKES))).first()
+    for reaction, flag in zip((LIKES, DISLIKES), flags or ()):
+        if flag:
+            return reaction
+    return None
+
+
+def pending_states(keys):
+    """{(post_id, user_id): (реакция, метка)} ещё не записанных кликов."""
+    keys = list(keys)
+    entries = fragment_cache().get_many(
+        [pending_reaction_key(*key) for key in keys])
+    return {
+        key: entries[pending_reaction_key(*key)]
+        for key in keys
+        if pending_reaction_key(*key) in entries
+    }
+
+
+def read_log(path):
+    """{(post_id, user_id): (реакция или None, метка)} из журнала; битые
+    строки (оборванная при сбое запись) пропускаются."""
+    states = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            try:
+                post_id, user_id, state, *token = json.loads(line)
+            except (TypeError, ValueError):
+                continue
+            states[(post_id, user_id)] = (state, token[0] if token else None)
+    return states
+
+
+def latest_states(states):
+    """{(post_id, user_id): реакция} из строк журнала, которые всё ещё
+    последние для своей пары.
+
+    Если после строки пользователь кликнул в другом процессе, в общем
+    кэше уже метка того клика: строку пропускаем, итог запишет журнал
+    того процесса. Так порядок сброса журналов разных процессов не
+    важен.
+    """
+    pending = pending_states(states)
+    return {
+        key: state
+        for key, (state, token) in states.items()
+        if token is None or pending.get(key, (None, token))[1] == token
+    }
+
+
+def apply_states(states, batch_size=WRITE_BEHIND_DEFAULTS['BATCH_SIZE']):
+    """Записывает итоговые реакции пакетом в одной транзакции.
+
+    Состояния абсолютные, поэтому повторное применение того же журнала
+    ничего не меняет.
+    """
+    post_ids = {post_id for post_id, _ in states}
+    posts = {
+        pk: (author_id, group_id)
+        for pk, author_id, group_id in Post.objects.filter(
+            pk__in=post_ids).order_by().values_list(
+            'pk', 'author_id', 'group_id')
+    }
+    user_ids = set(User.objects.filter(
+        pk__in={user_id for _, user_id in states}
+    ).values_list('pk', flat=True))
+    states = {
+        (post_id, user_id): state
+        for (post_id, user_id), state in states.items()
+        if post_id in posts and user_id in user_ids
+    }
+    if not states:
+        return 0
+    users_by_post = defaultdict(list)
+    for post_id, user_id in states:
+        users_by_post[post_id].append(user_id)
+    with transaction.atomic():
+        for reaction in (LIKES, DISLIKES):
+            through = _through(reaction)
+            for post_id, users in users_by_post.items():
+                through.objects.filter(
+                    post_id=post_id, user_id__in=users).delete()
+            through.objects.bulk_create(
+                [through(post_id=post_id, user_id=user_id)
+                 for (post_id, user_id), state in states.items()
+                 if state == reaction],
+                batch_size=batch_size, ignore_conflicts=True)
+        recount_reactions(Post.objects.filter(pk__in=users_by_post))
+        stats.reconcile(Profile.objects.filter(user_id__in={
+            posts[post_id][0] for post_id in users_by_post}))
+        for post_id in users_by_post:
+            bump_post_scopes(post_id, *posts[post_id])
+    return len(states)
+
+
+def apply_logs(paths, batch_size=WRITE_BEHIND_DEFAULTS['BATCH_SIZE']):
+    """Применяет журналы по порядку и удаляет их; вернёт число реакций."""
+    states = {}
+    for path in paths:
+        states.update(read_log(path))
+    applied = apply_states(latest_states(states), batch_size)
+    for path in paths:
+        os.remove(path)
+    return applied
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover(log_dir, force=False):
+    """Применяет журналы упавших процессов (или все при force)."""
+    paths = sorted(
+        glob.glob(os.path.join(log_dir, 'reactions-*.log'))
+        + glob.glob(os.path.join(log_dir, 'reactions-*.batch')),
+        key=os.path.getmtime)
+    orphaned = [
+        path for path in paths
+        if force or not _pid_alive(
+            int(os.path.basename(path).split('-')[1].split('.')[0]))
+    ]
+    if not orphaned:
+        return 0
+    return apply_logs(orphaned, write_behind_settings()['BATCH_SIZE'])
+
+
+class ReactionBuffer:
+    """Write-behind для лайков и дизлайков.
+
+    Клик сразу получает ответ: итоговая реакция пользователя на пост
+    (LIKES, DISLIKES или None) с уникальной меткой пишется строкой в
+    журнал процесса и в общий кэш фрагментов. Следующий клик, в каком
+    бы процессе он ни случился, считается от состояния в кэше, а не от
+    ещё не обновлённой БД. flush() переименовывает журнал и применяет
+    его одним пакетом через apply_states(), пропуская строки, которые
+    перебил клик в другом процессе (latest_states()); после сбоя
+    неприменённые журналы подбирает recover().
+
+    Гарантия для последовательных кликов одного пользователя держится,
+    пока кэш общий для всех процессов (иначе предупреждает posts.W001)
+    и запись живёт в нём дольше задержки сброса (PENDING_TIMEOUT).
+    Клики, пришедшие одновременно, решает последняя запись в кэш.
+
+    Строка журнала сразу уходит в ОС, поэтому падение процесса её не
+    теряет. fsync по умолчанию делается раз на пакет в flush(): при
+    отключении питания пропадут клики за последний FLUSH_INTERVAL.
+    fsync=True синхронизирует каждый клик ценой записи на диск в ответе.
+    """
+
+    def __init__(self, log_dir, batch_size, fsync=False,
+                 pending_timeout=WRITE_BEHIND_DEFAULTS['PENDING_TIMEOUT']):
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, f'reactions-{os.getpid()}.log')
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.pending_timeout = pending_timeout
+        self.lock = threading.Lock()
+        self.file = None
+
+    def toggle(self, post_id, user_id, reaction):
+        key = (post_id, user_id)
+        entry = pending_states([key]).get(key)
+        if entry is None:
+            current = current_reaction(post_id, user_id)
+        else:
+            current = entry[0]
+        state = None if current == reaction else reaction
+        token = uuid4().hex
+        fragment_cache().set(pending_reaction_key(*key), (state, token),
+                             self.pending_timeout)
+        with self.lock:
+            fd = self.record(key, state, token)
+        if fd is not None:
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        return state == reaction
+
+    def record(self, key, state, token):
+        """Пишет строку в журнал; при fsync вернёт копию дескриптора,
+        чтобы синхронизировать её уже без блокировки."""
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(json.dumps([*key, state, token]) + '\n')
+        self.file.flush()
+        return os.dup(self.file.fileno()) if self.fsync else None
+
+    def flush(self):
+        """Применяет накопленное; вернёт число записанных реакций."""
+        with self.lock:
+            if self.file is not None:
+                os.fsync(self.file.fileno())
+                self.file.close()
+                self.file = None
+                os.replace(self.path, f'{self.path}.{time.time_ns()}.batch')
+        paths = sorted(glob.glob(f'{glob.escape(self.path)}.*.batch'))
+        if not paths:
+            return 0
+        return apply_logs(paths, self.batch_size)
+
+    def run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать пакет реакций')
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Буфер процесса; при создании подбирает журналы упавших процессов
+    и запускает фоновый сброс раз в FLUSH_INTERVAL секунд."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            options = write_behind_settings()
+            log_dir = options['LOG_DIR'] or os.path.join(
+                settings.BASE_DIR, 'reactions_log')
+            recover(log_dir)
+            _buffer = ReactionBuffer(
+                log_dir, options['BATCH_SIZE'], options['FSYNC'],
+                options['PENDING_TIMEOUT'])
+            if options['FLUSH_INTERVAL']:
+                threading.Thread(
+                    target=_buffer.run, args=(options['FLUSH_INTERVAL'],),
+                    daemon=True).start()
+                atexit.register(_buffer.flush)
+        return _buffer
+
+
+def pending_reactions(user_id, post_ids):
+    """Ещё не записанные в БД реакции пользователя (read-your-writes)."""
+    if not write_behind_settings()['ENABLED']:
+        return {}
+    pending = pending_states((post_id, user_id) for post_id in post_ids)
+    return {post_id: state for (post_id, _), (state, _) in pending.items()}
+
+
+async def apending_reactions(user_id, post_ids):
+    if not write_behind_settings()['ENABLED']:
+        return {}
+    keys = {pending_reaction_key(post_id, user_id): post_id
+            for post_id in post_ids}
+    entries = await fragment_cache().aget_many(keys)
+    return {keys[key]: state for key, (state, _) in entries.items()}
@@ -0,0 +1,33 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from .models import Conversation
+
+
+def user_group(user_id):
+    return f'directs_{user_id}'
+
+
+def serialize_message(message):
+    return {
+        'id': message.pk,
+        'sender': message.sender.username,
+        'recipient': message.recipient.username,
+        'body': message.body or '',
+        'date': message.date.isoformat(),
+    }
+
+
+def notify_message(message):
+    """Рассылает новое сообщение обоим участникам через слой каналов."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    payload = serialize_message(message)
+    unread = Conversation.unread_total(message.recipient)
+    for user_id in {message.sender_id, message.recipient_id}:
+        async_to_sync(channel_layer.group_send)(user_group(user_id), {
+            'type': 'direct.message',
+            'message': payload,
+            'unread': unread if user_id == message.recipient_id else None,
+        })
@@ -0,0 +1,230 @@
+import logging
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from .models import Comment, Post, SearchTerm, SearchTermStats
+from .stemmer import stem
+
+POST = 'post'
+COMMENT = 'comment'
+DOC_TYPES = {POST: 0, COMMENT: 1}
+FTS_TABLE = 'posts_search_fts'
+DOCUMENTS_TERM = ''
+RESULTS_LIMIT = 50
+ADMIN_RESULTS_LIMIT = 1000
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'ее', 'мне', 'было', 'вот', 'от', 'меня',
+    'еще', 'нет', 'о', 'из', 'ему', 'ли', 'если', 'уже', 'или', 'ни',
+    'быть', 'был', 'до', 'вас', 'для', 'мы', 'их', 'это', 'the', 'a',
+    'an', 'and', 'or', 'of', 'to', 'in', 'is',
+))
+
+
+def tokenize(text):
+    """Основы слов текста без стоп-слов."""
+    words = (word.lower().replace('ё', 'е')
+             for word in WORD_RE.findall(text or ''))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+def _document(doc_type, doc_id):
+    if doc_type == POST:
+        post = Post.objects.filter(pk=doc_id).only('text').first()
+        return post.text if post else None
+    comment = (
+        Comment.objects.filter(pk=doc_id, active=True).only('text').first())
+    return comment.text if comment else None
+
+
+class FTS5Backend:
+    """Индекс в виртуальной таблице SQLite FTS5, ранжирование bm25."""
+
+    def rowid(self, doc_type, doc_id):
+        return doc_id * len(DOC_TYPES) + DOC_TYPES[doc_type]
+
+    def index(self, doc_type, doc_id, terms):
+        self.remove(doc_type, doc_id)
+        if terms:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                    [self.rowid(doc_type, doc_id), ' '.join(terms)],
+                )
+
+    def remove(self, doc_type, doc_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [self.rowid(doc_type, doc_id)],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, terms, doc_type=None, limit=RESULTS_LIMIT):
+        query = ' '.join('"{}"'.format(term.replace('"', '""'))
+                         for term in terms)
+        sql = (f'SELECT rowid, bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+               f'WHERE {FTS_TABLE} MATCH %s')
+        params = [query]
+        if doc_type is not None:
+            sql += f' AND rowid % {len(DOC_TYPES)} = %s'
+            params.append(DOC_TYPES[doc_type])
+        sql += f' ORDER BY bm25({FTS_TABLE}) LIMIT %s'
+        params.append(limit)
+        types = {value: key for key, value in DOC_TYPES.items()}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [
+                (types[rowid % len(DOC_TYPES)], rowid // len(DOC_TYPES),
+                 -rank)
+                for rowid, rank in cursor.fetchall()
+            ]
+
+
+class TableBackend:
+    """Обратный индекс в таблице SearchTerm, ранжирование tf-idf.
+
+    Число документов и документов с каждым словом ведутся в
+    SearchTermStats при индексации, поиск их только читает.
+    """
+
+    def index(self, doc_type, doc_id, terms):
+        self.remove(doc_type, doc_id)
+        counts = Counter(term[:64] for term in terms)
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, doc_type=DOC_TYPES[doc_type],
+                       doc_id=doc_id, frequency=frequency)
+            for term, frequency in counts.items()
+        )
+        if counts:
+            self.count(DOC_TYPES[doc_type], [DOCUMENTS_TERM, *counts], 1)
+
+    def remove(self, doc_type, doc_id):
+        postings = SearchTerm.objects.filter(
+            doc_type=DOC_TYPES[doc_type], doc_id=doc_id)
+        terms = list(postings.values_list('term', flat=True))
+        if terms:
+            postings.delete()
+            self.count(DOC_TYPES[doc_type], [DOCUMENTS_TERM, *terms], -1)
+
+    def count(self, doc_type, terms, delta):
+        if delta > 0:
+            SearchTermStats.objects.bulk_create(
+                [SearchTermStats(term=term, doc_type=doc_type)
+                 for term in terms],
+                ignore_conflicts=True)
+        SearchTermStats.objects.filter(
+            doc_type=doc_type, term__in=terms,
+        ).update(documents=F('documents') + delta)
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+        SearchTermStats.objects.all().delete()
+
+    def search(self, terms, doc_type=None, limit=RESULTS_LIMIT):
+        terms = sorted({term[:64] for term in terms})
+        postings = SearchTerm.objects.filter(term__in=terms)
+        stats = SearchTermStats.objects.filter(
+            term__in=[DOCUMENTS_TERM, *terms], documents__gt=0)
+        if doc_type is not None:
+            postings = postings.filter(doc_type=DOC_TYPES[doc_type])
+            stats = stats.filter(doc_type=DOC_TYPES[doc_type])
+        frequencies = dict(
+            stats.values('term').annotate(total=Sum('documents'))
+            .values_list('term', 'total')
+        )
+        documents = frequencies.pop(DOCUMENTS_TERM, 0)
+        if len(frequencies) < len(terms):
+            return []
+        weights = [
+            When(term=term, then=F('frequency') * math.log(
+                1 + documents / frequencies[term]))
+            for term in terms
+        ]
+        rows = (
+            postings.values('doc_type', 'doc_id')
+            .annotate(
+                matched=Count('term'),
+                score=Sum(Case(*weights, output_field=FloatField())),
+            )
+            .filter(matched=len(terms))
+            .order_by('-score')[:limit]
+        )
+        types = {value: key for key, value in DOC_TYPES.items()}
+        return [(types[row['doc_type']], row['doc_id'], row['score'])
+                for row in rows]
+
+
+_fts_available = None
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def get_backend():
+    name = getattr(settings, 'POSTS_SEARCH_BACKEND', 'auto')
+    if name == 'fts5' or (name == 'auto' and fts_available()):
+        return FTS5Backend()
+    return TableBackend()
+
+
+def index_document(doc_type, doc_id):
+    """Переиндексирует пост или комментарий; удалённые убирает."""
+    text = _document(doc_type, doc_id)
+    backend = get_backend()
+    if text is None:
+        backend.remove(doc_type, doc_id)
+    else:
+        backend.index(doc_type, doc_id, tokenize(text))
+
+
+def remove_document(doc_type, doc_id):
+    get_backend().remove(doc_type, doc_id)
+
+
+def search(query, doc_type=None, limit=RESULTS_LIMIT):
+    """Список (тип, id, вес) по убыванию релевантности."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    try:
+        return get_backend().search(terms, doc_type, limit)
+    except OperationalError:
+        logger.exception('Поиск по индексу не удался: %r', query)
+        return []
+
+
+def search_posts(query, limit=RESULTS_LIMIT):
+    ids = [doc_id for _, doc_id, _ in search(query, POST, limit)]
+    posts = Post.objects.in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_comments(query, limit=RESULTS_LIMIT):
+    ids = [doc_id for _, doc_id, _ in search(query, COMMENT, limit)]
+    comments = (
+        Comment.objects.filter(active=True)
+        .select_related('author', 'post')
+        .in_bulk(ids)
+    )
+    return [comments[pk] for pk in ids if pk in comments]
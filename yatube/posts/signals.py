@@ -0,0 +1,173 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import search, stats, user_index
+from .caching import (bump, bump_author, bump_author_scopes, bump_post,
+                      bump_post_scopes, feed_version_key,
+                      group_version_key)
+from .images import strip_metadata
+from .models import Comment, Follow, Group, Message, Post, Profile, User
+from .realtime import notify_message
+from .tasks import (delete_image_files, index_search_document,
+                    recount_post_reactions)
+
+IMAGE_FIELDS = {Post: 'image', Profile: 'profile_photo'}
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+@receiver(m2m_changed, sender=Post.dislikes.through)
+def sync_reaction_counters(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Держит счётчики в согласии с M2M при изменениях мимо toggle.
+
+    Счётчики постов и likes_received авторов пересчитывает задача, она
+    же сбрасывает кэш постов, когда счётчики готовы.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            recount_post_reactions.delay(post_ids=[instance.pk])
+        return
+    if action == 'pre_clear':
+        instance._cleared_post_ids = list(
+            sender.objects.filter(user_id=instance.pk)
+            .values_list('post_id', flat=True))
+    elif action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_post_ids', None)
+    if action in ('post_add', 'post_remove', 'post_clear') and pk_set:
+        recount_post_reactions.delay(post_ids=list(pk_set))
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(instance.author_id, posts_count=1)
+
+
+@receiver(pre_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    likes = Post.likes.through.objects.filter(post_id=instance.pk).count()
+    stats.adjust(instance.author_id, posts_count=-1, likes_received=-likes)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(instance.author_id, followers_count=1)
+        stats.adjust(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    stats.adjust(instance.author_id, followers_count=-1)
+    stats.adjust(instance.user_id, following_count=-1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Profile)
+def prepare_image(sender, instance, **kwargs):
+    """Чистит метаданные новой загрузки и запоминает прежний файл."""
+    field = IMAGE_FIELDS[sender]
+    file = getattr(instance, field)
+    if file and file._committed:
+        return
+    if file:
+        stripped = strip_metadata(file)
+        if stripped is not None:
+            setattr(instance, field, stripped)
+    if instance.pk:
+        instance._previous_image = sender.objects.filter(
+            pk=instance.pk).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Profile)
+def delete_replaced_image(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_previous_image', None)
+    if previous and previous != getattr(instance, IMAGE_FIELDS[sender]).name:
+        transaction.on_commit(lambda: delete_image_files.delay(path=previous))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Profile)
+def delete_removed_image(sender, instance, **kwargs):
+    name = getattr(instance, IMAGE_FIELDS[sender]).name
+    if name:
+        transaction.on_commit(lambda: delete_image_files.delay(path=name))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_fragment(sender, instance, **kwargs):
+    bump_post_scopes(instance.pk, instance.author_id, instance.group_id,
+                     instance.__dict__.pop('_previous_group_id', None))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(sender, instance, **kwargs):
+    bump_post(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_followed_author(sender, instance, **kwargs):
+    bump_author(instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    bump(group_version_key(instance.pk), feed_version_key())
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def update_search_index(sender, instance, **kwargs):
+    doc_type = search.POST if sender is Post else search.COMMENT
+    transaction.on_commit(lambda: index_search_document.delay(
+        doc_type=doc_type, doc_id=instance.pk))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def remove_from_search_index(sender, instance, **kwargs):
+    doc_type = search.POST if sender is Post else search.COMMENT
+    search.remove_document(doc_type, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_fragments(sender, instance, update_fields=None,
+                                **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_author_scopes(instance.pk, *Post.author_group_ids(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def update_user_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & set(
+            user_index.INDEXED_FIELDS):
+        return
+    user_index.update_user(instance)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_fragments(sender, instance, **kwargs):
+    if instance.user_id:
+        bump_author_scopes(instance.user_id,
+                           *Post.author_group_ids(instance.user_id))
+
+
+@receiver(post_save, sender=Message)
+def push_new_message(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: notify_message(instance))
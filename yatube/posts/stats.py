@@ -0,0 +1,92 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Follow, Post, Profile
+
+COUNTERS = ('posts_count', 'followers_count', 'following_count',
+            'likes_received')
+BATCH_SIZE = 500
+
+
+def adjust(user_id, **deltas):
+    """Меняет счётчики профиля на delta через F(), не уходя ниже нуля.
+
+    Если профиля нет, ничего не делает: его поправит reconcile().
+    """
+    changes = {
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items() if delta
+    }
+    if user_id and changes:
+        Profile.objects.filter(user_id=user_id).update(**changes)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('user_id')})
+            .values(field)
+            .annotate(total=Count('*'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def actual_counters():
+    return {
+        'posts_count': _count(Post.objects.order_by(), 'author_id'),
+        'followers_count': _count(Follow.objects.all(), 'author_id'),
+        'following_count': _count(Follow.objects.all(), 'user_id'),
+        'likes_received': _count(
+            Post.likes.through.objects.all(), 'post__author_id'),
+    }
+
+
+def reconcile(profiles=None):
+    """Исправляет разошедшиеся счётчики и возвращает число профилей."""
+    if profiles is None:
+        profiles = Profile.objects.all()
+    actual = {f'actual_{field}': value
+              for field, value in actual_counters().items()}
+    drifted = Q()
+    for field in COUNTERS:
+        drifted |= ~Q(**{field: F(f'actual_{field}')})
+    ids = list(
+        profiles.annotate(**actual).filter(drifted)
+        .values_list('pk', flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        Profile.objects.filter(
+            pk__in=ids[start:start + BATCH_SIZE]
+        ).update(**actual_counters())
+    return len(ids)
+
+
+def for_user(user):
+    """Профиль со счётчиками; для пользователя без профиля — подсчёт."""
+    profile = Profile.objects.filter(user=user).first()
+    if profile is not None:
+        return profile
+    return Profile(
+        user=user,
+        posts_count=Post.objects.filter(author=user).count(),
+        followers_count=Follow.objects.filter(author=user).count(),
+        following_count=Follow.objects.filter(user=user).count(),
+        likes_received=Post.likes.through.objects.filter(
+            post__author=user).count(),
+    )
+
+
+async def afor_user(user):
+    """for_user() для async-представлений."""
+    profile = await Profile.objects.filter(user=user).afirst()
+    if profile is not None:
+        return profile
+    return Profile(
+        user=user,
+        posts_count=await Post.objects.filter(author=user).acount(),
+        followers_count=await Follow.objects.filter(author=user).acount(),
+        following_count=await Follow.objects.filter(user=user).acount(),
+        likes_received=await Post.likes.through.objects.filter(
+            post__author=user).acount(),
+    )
@@ -0,0 +1,114 @@
+"""Стеммер Портера (Snowball) для русского языка."""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+CYRILLIC = re.compile('[а-я]')
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    r1 = _region_after(word, 0)
+    return rv, _region_after(word, r1)
+
+
+def _region_after(word, start):
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, start, endings):
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            return word[:-len(ending)]
+    return None
+
+
+def _strip_groups(word, start, groups):
+    """Группа 1 снимается только после а/я, группа 2 — всегда."""
+    first, second = groups
+    candidates = [(ending, True) for ending in first]
+    candidates += [(ending, False) for ending in second]
+    for ending, needs_a in sorted(
+            candidates, key=lambda item: len(item[0]), reverse=True):
+        stem_length = len(word) - len(ending)
+        if not word.endswith(ending) or stem_length < start:
+            continue
+        if needs_a and (stem_length - 1 < start
+                        or word[stem_length - 1] not in 'ая'):
+            continue
+        return word[:stem_length]
+    return None
+
+
+def _strip_adjectival(word, start):
+    stem = _strip(word, start, ADJECTIVE)
+    if stem is None:
+        return None
+    return _strip_groups(stem, start, PARTICIPLE) or stem
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.search(word):
+        return word
+    rv, r2 = _regions(word)
+    result = _strip_groups(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        result = (
+            _strip_adjectival(word, rv)
+            or _strip_groups(word, rv, VERB)
+            or _strip(word, rv, NOUN)
+        )
+    word = result if result is not None else word
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = _strip(word, max(r2, rv), DERIVATIONAL) or word
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith('нн'):
+            word = word[:-1]
+        return word
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
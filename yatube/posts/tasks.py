@@ -0,0 +1,53 @@
+from django.apps import apps
+from django.core.files.storage import default_storage
+
+from core.tasks import task
+
+from . import search, stats, timeline
+from .caching import bump_author_scopes, bump_post_scopes
+from .images import delete_image, generate_derivatives
+from .models import Post, Profile
+from .reactions import recount_reactions
+
+
+@task
+def make_image_derivatives(model, pk, field):
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    generate_derivatives(getattr(instance, field))
+    if isinstance(instance, Post):
+        bump_post_scopes(instance.pk, instance.author_id, instance.group_id)
+    elif isinstance(instance, Profile):
+        bump_author_scopes(instance.user_id,
+                           *Post.author_group_ids(instance.user_id))
+
+
+@task
+def delete_image_files(path):
+    delete_image(default_storage, path)
+
+
+@task
+def recount_post_reactions(post_ids):
+    """Пересчитывает счётчики постов и их авторов, затем сбрасывает
+    кэш постов."""
+    posts = Post.objects.filter(pk__in=post_ids)
+    recount_reactions(posts)
+    stats.reconcile(Profile.objects.filter(
+        user_id__in=posts.values('author_id')))
+    for post_id, author_id, group_id in posts.order_by().values_list(
+            'pk', 'author_id', 'group_id'):
+        bump_post_scopes(post_id, author_id, group_id)
+
+
+@task
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task
+def index_search_document(doc_type, doc_id):
+    search.index_document(doc_type, doc_id)
@@ -0,0 +1,50 @@
+from django import template
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from posts.caching import FRAGMENT_TIMEOUT, article_key, fragment_cache
+from posts.reactions import DISLIKES, LIKES
+
+register = template.Library()
+
+# Сырой «<» не переживает автоэкранирования, поэтому текст поста
+# не может совпасть с метками.
+CSRF_PLACEHOLDER = mark_safe('<!--csrf_token-->')
+PATH_PLACEHOLDER = mark_safe('<!--request_path-->')
+LIKED_PLACEHOLDER = mark_safe('<!--liked-->')
+DISLIKED_PLACEHOLDER = mark_safe('<!--disliked-->')
+
+
+@register.simple_tag(takes_context=True)
+def article(context, post):
+    """Пост из кэша фрагментов.
+
+    CSRF, путь и реакция зрителя (viewer_reaction от feed.assemble)
+    подставляются при выводе.
+    """
+    cache = fragment_cache()
+    key = article_key(post)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('includes/article_content.html', {
+            'post': post,
+            'csrf_token': CSRF_PLACEHOLDER,
+            'request_path': PATH_PLACEHOLDER,
+            'liked': LIKED_PLACEHOLDER,
+            'disliked': DISLIKED_PLACEHOLDER,
+        })
+        cache.set(key, html, FRAGMENT_TIMEOUT)
+    reaction = getattr(post, 'viewer_reaction', None)
+    html = (
+        html.replace(LIKED_PLACEHOLDER, str(reaction == LIKES).lower())
+        .replace(DISLIKED_PLACEHOLDER, str(reaction == DISLIKES).lower())
+    )
+    request = context.get('request')
+    if request is None:
+        return mark_safe(html)
+    return mark_safe(
+        html.replace(CSRF_PLACEHOLDER, get_token(request))
+        .replace(PATH_PLACEHOLDER, escape(request.path))
+    )
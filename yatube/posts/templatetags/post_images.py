@@ -0,0 +1,28 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from posts.images import MIME_TYPES, fallback_format, srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(field_file, sizes='100vw', **attrs):
+    """<picture> с уменьшенными копиями изображения в srcset."""
+    if not field_file:
+        return ''
+    sources = srcset(field_file)
+    fallback = sources.pop(fallback_format(field_file.name), None)
+    if fallback:
+        attrs.update(srcset=fallback, sizes=sizes)
+    return format_html(
+        '<picture>{}<img src="{}"{}></picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            ((MIME_TYPES[fmt], value, sizes)
+             for fmt, value in sources.items()),
+        ),
+        field_file.url,
+        flatatt(attrs),
+    )
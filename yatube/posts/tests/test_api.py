@@ -0,0 +1,178 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.api import MESSAGES_LIMIT
+from posts.models import Comment, Follow, Group, Message, Post
+
+User = get_user_model()
+
+POSTS_COUNT = 25
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(POSTS_COUNT)
+        )
+        cls.post = Post.objects.latest('pk')
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feed_pages_by_cursor(self):
+        """Лента отдаётся страницами по курсору без повторов."""
+        url = reverse('posts:api_posts')
+        data = self.guest_client.get(url, {'limit': 10}).json()
+        seen = [post['id'] for post in data['results']]
+        while data['next']:
+            data = self.guest_client.get(
+                url, {'limit': 10, 'cursor': data['next']}).json()
+            seen.extend(post['id'] for post in data['results'])
+        self.assertEqual(len(seen), POSTS_COUNT)
+        self.assertEqual(len(set(seen)), POSTS_COUNT)
+
+    def test_sparse_fields(self):
+        """fields= ограничивает ответ и запрос."""
+        url = reverse('posts:api_group_posts', args=(self.group.slug,))
+        with self.assertNumQueries(2):
+            data = self.guest_client.get(url, {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        with self.assertNumQueries(2):
+            data = self.guest_client.get(
+                url, {'fields': 'id,author,group', 'limit': 100}).json()
+        self.assertEqual(data['results'][0]['author']['last_name'],
+                         'Толстой')
+        self.assertEqual(data['results'][0]['group']['slug'], 'group')
+        response = self.guest_client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся вместе с первой страницей комментариев."""
+        url = reverse('posts:api_post_detail', args=(self.post.pk,))
+        with self.assertNumQueries(2):
+            data = self.guest_client.get(url).json()
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual(data['comments']['results'][0]['text'],
+                         'Комментарий')
+        data = self.guest_client.get(url, {'fields': 'id'}).json()
+        self.assertEqual(data, {'id': self.post.pk})
+        response = self.guest_client.get(
+            reverse('posts:api_post_detail', args=(0,)))
+        self.assertEqual(response.status_code, 404)
+
+    def test_reactions(self):
+        """Лайк и дизлайк переключаются и возвращают счётчики."""
+        url = reverse('posts:api_like', args=(self.post.pk,))
+        self.assertEqual(self.guest_client.post(url).status_code, 401)
+        self.assertEqual(self.client.get(url).status_code, 405)
+        data = self.client.post(url).json()
+        self.assertEqual(data, {'active': True, 'likes_count': 1,
+                                'dislikes_count': 0})
+        data = self.client.post(
+            reverse('posts:api_dislike', args=(self.post.pk,))).json()
+        self.assertEqual(data, {'active': True, 'likes_count': 0,
+                                'dislikes_count': 1})
+
+    def test_follow_and_feed(self):
+        """Подписка через API наполняет ленту подписок."""
+        url = reverse('posts:api_follow', args=(self.author.username,))
+        self.assertEqual(self.client.post(url).json(), {'following': True})
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author).exists())
+        data = self.client.get(reverse('posts:api_follow_feed')).json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(self.client.delete(url).json(),
+                         {'following': False})
+        data = self.client.get(reverse('posts:api_follow_feed')).json()
+        self.assertEqual(data['results'], [])
+        response = self.client.post(
+            reverse('posts:api_follow', args=(self.reader.username,)))
+        self.assertEqual(response.status_code, 400)
+
+    def test_directs(self):
+        """Сообщения отправляются и читаются через API."""
+        url = reverse('posts:api_direct_thread',
+                      args=(self.author.username,))
+        response = self.client.post(url, {'body': 'Привет'})
+        self.assertEqual(response.status_code, 201)
+        message_id = response.json()['message']['id']
+        self.assertEqual(self.client.post(url, {'body': ''}).status_code, 400)
+
+        author_client = Client()
+        author_client.force_login(self.author)
+        inbox = author_client.get(reverse('posts:api_directs')).json()
+        self.assertEqual(inbox['results'][0]['user'], 'reader')
+        self.assertEqual(inbox['results'][0]['unread'], 1)
+        thread = author_client.get(reverse(
+            'posts:api_direct_thread', args=(self.reader.username,))).json()
+        self.assertEqual([item['id'] for item in thread['results']],
+                         [message_id])
+        self.assertEqual(thread['unread'], 0)
+        self.assertEqual(Message.objects.count(), 1)
+
+    def test_token_auth(self):
+        """Клиент без cookie работает по токену, без CSRF-токена."""
+        self.reader.set_password('secret')
+        self.reader.save()
+        client = Client(enforce_csrf_checks=True)
+        url = reverse('posts:api_token')
+        response = client.post(url, {'username': 'reader',
+                                     'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+        response = client.post(url, {'username': 'reader',
+                                     'password': 'secret'})
+        self.assertEqual(response.status_code, 201)
+        key = response.json()['token']
+
+        like_url = reverse('posts:api_like', args=(self.post.pk,))
+        response = client.post(like_url, HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(response.json()['likes_count'], 1)
+        response = client.post(
+            reverse('posts:api_direct_thread', args=(self.author.username,)),
+            {'body': 'Привет'}, HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(response.status_code, 201)
+        response = client.post(like_url, HTTP_AUTHORIZATION='Token wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_requires_csrf(self):
+        """Запрос по сессии без CSRF-токена отклоняется."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        response = client.post(
+            reverse('posts:api_like', args=(self.post.pk,)))
+        self.assertEqual(response.status_code, 403)
+
+    def test_thread_pages_back_from_newest(self):
+        """Диалог открывается последними сообщениями и листается назад."""
+        sent = [
+            Message.send_message(self.author, self.reader, f'Сообщение {i}')
+            for i in range(MESSAGES_LIMIT + 5)
+        ]
+        url = reverse('posts:api_direct_thread',
+                      args=(self.author.username,))
+        data = self.client.get(url).json()
+        self.assertEqual([item['id'] for item in data['results']],
+                         [message.pk for message in sent[5:]])
+        self.assertEqual(data['before'], sent[5].pk)
+        data = self.client.get(url, {'before': data['before']}).json()
+        self.assertEqual([item['id'] for item in data['results']],
+                         [message.pk for message in sent[:5]])
+        self.assertIsNone(data['before'])
+        data = self.client.get(url, {'after': sent[-2].pk}).json()
+        self.assertEqual([item['id'] for item in data['results']],
+                         [sent[-1].pk])
@@ -0,0 +1,91 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache, caches
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, TestCase
+
+from core.middleware import InstrumentationMiddleware, ReplicaMiddleware
+from posts import async_views
+from posts.models import Group, Message, Post
+from posts.pagecache import page_cache, page_key
+
+User = get_user_model()
+
+
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Асинхронный пост')
+        Message.send_message(cls.author, cls.reader, 'Привет')
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+
+    def request(self, path, user=None):
+        request = RequestFactory().get(path)
+        request.session = SessionStore()
+        request.user = user or AnonymousUser()
+        return request
+
+    async def test_read_views(self):
+        """async-представления отдают те же страницы, что и синхронные."""
+        calls = (
+            (async_views.index, (), {}),
+            (async_views.group_posts, (), {'slug': 'group'}),
+            (async_views.profile, (), {'username': 'author'}),
+            (async_views.post_detail, (), {'post_id': self.post.pk}),
+        )
+        for view, args, kwargs in calls:
+            with self.subTest(view=view.__name__):
+                response = await view(
+                    self.request('/', self.reader), *args, **kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Асинхронный пост', response.content.decode())
+                self.assertIn('ETag', response)
+
+    async def test_missing_objects(self):
+        """Несуществующие объекты дают 404."""
+        with self.assertRaises(Http404):
+            await async_views.group_posts(self.request('/'), slug='nope')
+        with self.assertRaises(Http404):
+            await async_views.post_detail(self.request('/'), post_id=0)
+
+    async def test_inbox(self):
+        """Входящие требуют входа и показывают диалог."""
+        response = await async_views.inbox(self.request('/directs/'))
+        self.assertEqual(response.status_code, 302)
+        response = await async_views.inbox(
+            self.request('/directs/', self.reader))
+        self.assertContains(response, 'Привет')
+
+    async def test_anonymous_page_cache(self):
+        """Кэш анонимных страниц работает и для async-представлений."""
+        request = self.request('/')
+        await async_views.index(request)
+        entry = await sync_to_async(page_cache().get)(page_key(request))
+        self.assertIn('Асинхронный пост', entry['content'])
+        response = await async_views.index(self.request('/'))
+        self.assertContains(response, 'Асинхронный пост')
+
+    def test_middleware_async_mode(self):
+        """Свои middleware работают в async-цепочке без адаптера."""
+        async def view(request):
+            return HttpResponse('ok')
+
+        for middleware in (InstrumentationMiddleware, ReplicaMiddleware):
+            with self.subTest(middleware=middleware.__name__):
+                instance = middleware(view)
+                self.assertTrue(asyncio.iscoroutinefunction(instance))
+                response = asyncio.run(instance(self.request('/')))
+                self.assertEqual(response.content, b'ok')
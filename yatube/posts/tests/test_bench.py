@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import LiveServerTestCase, TestCase
+
+from posts.management.commands.bench_servers import load
+from posts.models import (Comment, Conversation, Follow, Message,
+                          MessageState, Post, User)
+
+
+class BenchCommandsTests(TestCase):
+    def test_seed_and_run(self):
+        """seed_bench создаёт данные, run_bench пишет JSON с замерами."""
+        call_command(
+            'seed_bench', users=20, posts=200, groups=2, follows=5,
+            likes=100, comments=50, messages=40, stdout=StringIO())
+        self.assertEqual(
+            User.objects.filter(username__startswith='bench_').count(), 20)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(Message.objects.count(), 40)
+        self.assertFalse(
+            Conversation.objects.filter(last_message_at=None).exists())
+        conversation = Conversation.objects.first()
+        last = conversation.messages.order_by('-date').first()
+        self.assertEqual(conversation.last_message_at, last.date)
+        self.assertEqual(conversation.last_snippet, last.body[:100])
+        self.assertEqual(
+            Post.objects.filter(likes_count__gt=0).count(),
+            Post.likes.through.objects.values('post').distinct().count())
+        self.assertEqual(
+            sum(Conversation.unread_total(user)
+                for user in User.objects.filter(
+                    username__startswith='bench_')),
+            MessageState.objects.filter(is_read=False).count())
+        author = Post.objects.first().author
+        self.assertEqual(author.profile.posts_count, author.posts.count())
+        comment = Comment.objects.order_by('?').first()
+        self.assertEqual(comment.path, str(comment.pk).zfill(10))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            call_command('run_bench', iterations=2, warmup=0,
+                         output=path, stdout=StringIO())
+            with open(path, encoding='utf-8') as file:
+                report = json.load(file)
+        self.assertEqual(
+            set(report['views']),
+            {'index', 'group_posts', 'profile', 'post_detail',
+             'follow_index', 'inbox', 'directs'})
+        for result in report['views'].values():
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertGreater(result['queries'], 0)
+
+
+class ServerLoadTests(LiveServerTestCase):
+    def test_load(self):
+        """load() считает пропускную способность, задержки и ошибки."""
+        result = load(f'{self.live_server_url}/about/author/', 10, 4)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['rps'], 0)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        result = load(f'{self.live_server_url}/missing/', 3, 2)
+        self.assertEqual(result['errors'], 3)
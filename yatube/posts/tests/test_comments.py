@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.comments import comment_page
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ThreadedCommentsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def comment(self, text, parent=None, **kwargs):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text, parent=parent,
+            **kwargs)
+
+    def test_materialized_path(self):
+        """Ответы идут сразу за родителем, поддерево — одним запросом."""
+        first = self.comment('первый')
+        second = self.comment('второй')
+        reply = self.comment('ответ', parent=first)
+        nested = self.comment('вложенный', parent=reply)
+        self.assertEqual(reply.depth, 1)
+        self.assertTrue(nested.path.startswith(reply.path + '.'))
+        page, _ = comment_page(self.post)
+        self.assertEqual(page, [first, reply, nested, second])
+        with self.assertNumQueries(1):
+            self.assertEqual(list(first.subtree()), [first, reply, nested])
+        self.assertIn('comment_post_path_idx', first.subtree().explain())
+
+    def test_depth_is_limited(self):
+        """Слишком глубокий ответ прикрепляется к предку на пределе."""
+        parent = self.comment('корень')
+        for _ in range(Comment.MAX_DEPTH + 2):
+            parent = self.comment('ответ', parent=parent)
+        self.assertEqual(parent.depth, Comment.MAX_DEPTH)
+
+    def test_pages_skip_inactive(self):
+        """Страницы по курсору без неактивных комментариев."""
+        comments = [self.comment(f'комментарий {number}')
+                    for number in range(5)]
+        self.comment('скрытый', active=False)
+        page, cursor = comment_page(self.post, limit=3)
+        self.assertEqual(page, comments[:3])
+        page, cursor = comment_page(self.post, after=cursor, limit=3)
+        self.assertEqual(page, comments[3:])
+        self.assertIsNone(cursor)
+
+    def test_json_endpoint(self):
+        """JSON отдаёт страницу и поддерево по root."""
+        root = self.comment('корень')
+        self.comment('ответ', parent=root)
+        self.comment('другой')
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        data = self.client.get(url).json()
+        self.assertEqual(
+            [item['text'] for item in data['comments']],
+            ['корень', 'ответ', 'другой'])
+        self.assertIsNone(data['next'])
+        data = self.client.get(url, {'root': root.pk}).json()
+        self.assertEqual(
+            [item['depth'] for item in data['comments']], [0, 1])
+
+    def test_reply_through_form(self):
+        """Форма комментария принимает parent."""
+        root = self.comment('корень')
+        self.authorized_client.post(
+            reverse('posts:comment_post', args=(self.post.pk,)),
+            {'text': 'ответ', 'parent': root.pk})
+        self.assertEqual(root.replies.get().text, 'ответ')
@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.checks import check_shared_caches, check_shared_caches_deploy
+from posts.models import Comment, Group, Post
+from posts.reactions import LIKES, toggle_reaction
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        caches['fragments'].clear()
+        self.client = Client()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'post': reverse('posts:post_detail', args=(self.post.pk,)),
+        }
+
+    def etags(self):
+        return {name: self.client.get(url)['ETag']
+                for name, url in self.urls.items()}
+
+    def test_not_modified(self):
+        """Совпавший If-None-Match даёт 304 без рендера шаблона."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                self.assertIn('no-cache', response['Cache-Control'])
+                with CaptureQueriesContext(connection) as queries:
+                    cached = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.templates, [])
+                self.assertLessEqual(len(queries), 1)
+
+    def test_etag_changes_with_content(self):
+        """Новый пост, комментарий и лайк меняют ETag своих страниц."""
+        before = self.etags()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, group=self.group,
+                                text='Новый пост')
+        after_post = self.etags()
+        for name in self.urls:
+            with self.subTest(page=name):
+                self.assertNotEqual(after_post[name], before[name])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.reader,
+                                   text='Комментарий')
+        after_comment = self.etags()
+        self.assertNotEqual(after_comment['post'], after_post['post'])
+        self.assertEqual(after_comment['index'], after_post['index'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            toggle_reaction(self.post, self.reader, LIKES)
+        after_like = self.etags()
+        for name in self.urls:
+            with self.subTest(page=name):
+                self.assertNotEqual(after_like[name], after_comment[name])
+
+    def test_author_rename_changes_group_etag(self):
+        """Смена имени автора меняет ETag страниц его групп."""
+        url = self.urls['group']
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Пётр'
+            self.author.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_viewer(self):
+        """Разные пользователи получают разные ETag одной страницы."""
+        anonymous = self.client.get(self.urls['index'])
+        self.client.force_login(self.reader)
+        logged_in = self.client.get(self.urls['index'])
+        self.assertNotEqual(anonymous['ETag'], logged_in['ETag'])
+        self.assertIn('private', logged_in['Cache-Control'])
+        self.assertIn('Cookie', logged_in['Vary'])
+
+    def test_missing_object(self):
+        """Для несуществующих объектов остаётся 404 без ETag."""
+        response = self.client.get(
+            reverse('posts:profile', args=('nobody',)))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def ids(self, check):
+        return [message.id for message in check(None)]
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_single_process_is_fine(self):
+        """Без отдельного воркера кэш в памяти процесса допустим."""
+        self.assertEqual(self.ids(check_shared_caches), [])
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_worker_with_local_cache_warns(self):
+        """Воркер в своём процессе не сбросит локальный кэш версий."""
+        self.assertEqual(self.ids(check_shared_caches),
+                         ['posts.W001', 'posts.W001'])
+        self.assertEqual(self.ids(check_shared_caches_deploy),
+                         ['posts.W002', 'posts.W002'])
+
+    @override_settings(
+        TASKS_ALWAYS_EAGER=False,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/yatube-check-cache',
+        }},
+        POSTS_FRAGMENT_CACHE='default')
+    def test_shared_cache_passes(self):
+        """Общий кэш снимает предупреждения."""
+        self.assertEqual(self.ids(check_shared_caches), [])
+        self.assertEqual(self.ids(check_shared_caches_deploy), [])
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import feed
+from posts.models import Group, Post, Profile
+from posts.reactions import DISLIKES, LIKES, toggle_reaction
+
+User = get_user_model()
+
+
+class FeedAssemblyTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.viewer = User.objects.create_user(username='viewer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}',
+                                     first_name='Имя', last_name=str(i))
+            for i in range(5)
+        ]
+        Profile.objects.create(user=cls.authors[0])
+        for number, author in enumerate(cls.authors * 2):
+            Post.objects.create(
+                author=author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None)
+        cls.liked, cls.disliked = Post.objects.order_by('pk')[:2]
+        toggle_reaction(cls.liked, cls.viewer, LIKES)
+        toggle_reaction(cls.disliked, cls.viewer, DISLIKES)
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+
+    def touch(self, posts):
+        for post in posts:
+            post.author.get_full_name()
+            post.group and post.group.slug
+            getattr(post.author, 'profile', None)
+
+    def test_fixed_number_of_queries(self):
+        """Число запросов не зависит от размера страницы."""
+        for size in (2, 10):
+            with self.subTest(size=size):
+                posts = list(Post.objects.all()[:size])
+                with self.assertNumQueries(3):
+                    feed.assemble(posts, self.viewer)
+                    self.touch(posts)
+
+    def test_known_objects_are_not_reloaded(self):
+        """Переданные представлением автор и группа не перечитываются."""
+        author = self.authors[1]
+        posts = list(Post.objects.filter(author=author, group=self.group))
+        with self.assertNumQueries(1):
+            feed.assemble(posts, self.viewer, authors=[author],
+                          groups=[self.group])
+        self.assertIs(posts[0].author, author)
+
+    def test_viewer_reactions(self):
+        """Пост помечается реакцией текущего зрителя."""
+        posts = feed.assemble(Post.objects.all(), self.viewer)
+        reactions = {post.pk: post.viewer_reaction for post in posts}
+        self.assertEqual(reactions.pop(self.liked.pk), LIKES)
+        self.assertEqual(reactions.pop(self.disliked.pk), DISLIKES)
+        self.assertEqual(set(reactions.values()), {None})
+        anonymous = feed.assemble(Post.objects.all())
+        self.assertEqual({post.viewer_reaction for post in anonymous}, {None})
+
+    def test_feed_pages_show_reaction(self):
+        """Ленты отмечают посты, которые зритель лайкнул."""
+        client = Client()
+        client.force_login(self.viewer)
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_list', args=(self.group.slug,)),
+                    reverse('posts:profile', args=('author0',))):
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), 'aria-pressed="true"')
+        self.assertNotContains(Client().get(reverse('posts:index')),
+                               'aria-pressed="true"')
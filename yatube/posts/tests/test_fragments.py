@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.caching import article_key
+from posts.models import Post
+from posts.templatetags.post_fragments import (
+    CSRF_PLACEHOLDER, LIKED_PLACEHOLDER, PATH_PLACEHOLDER)
+
+User = get_user_model()
+
+
+class ArticleFragmentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='fragment', first_name='Иван')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        caches['fragments'].clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.authorized_client.get(
+                reverse('posts:index')).content.decode()
+
+    def test_fragment_is_cached_without_csrf(self):
+        """Фрагмент хранится в кэше без CSRF-токена и пути запроса."""
+        html = self.index()
+        fragment = caches['fragments'].get(article_key(self.post))
+        self.assertIn('Пост', fragment)
+        self.assertIn(CSRF_PLACEHOLDER, fragment)
+        self.assertNotIn(CSRF_PLACEHOLDER, html)
+        self.assertIn('value="/"', html)
+
+    def test_text_cannot_forge_placeholders(self):
+        """Текст поста, похожий на метки, выводится без подстановок."""
+        text = ' '.join((CSRF_PLACEHOLDER, PATH_PLACEHOLDER,
+                         LIKED_PLACEHOLDER, '__csrf_token__'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.user, text=text)
+        html = self.index()
+        self.assertIn('&lt;!--csrf_token--&gt;', html)
+        self.assertIn('&lt;!--request_path--&gt;', html)
+        self.assertIn('&lt;!--liked--&gt;', html)
+        self.assertIn('__csrf_token__', html)
+        self.assertNotIn(CSRF_PLACEHOLDER, html)
+
+    def test_post_edit_invalidates(self):
+        """Редактирование поста сбрасывает фрагмент."""
+        self.index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(self.post.pk,)),
+                {'text': 'Новый текст'})
+        self.assertIn('Новый текст', self.index())
+
+    def test_like_and_profile_edit_invalidate(self):
+        """Лайк и смена имени автора сбрасывают фрагмент."""
+        self.index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(
+                reverse('posts:like', args=(self.post.pk,)))
+        self.assertIn('<span>1</span>', self.index())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Пётр'
+            self.user.save()
+        self.assertIn('Пётр', self.index())
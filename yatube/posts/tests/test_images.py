@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.caching import fragment_cache
+from posts.images import derivative_name, derivatives_key, srcset
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   IMAGE_DERIVATIVE_WIDTHS=(100, 200, 1000))
+class ImageDerivativesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def image_file(self, name='photo.jpg', fmt='JPEG', color='red'):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        exif[0x0112] = 1
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), color).save(
+            buffer, format=fmt, exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def upload(self, text='Фото', **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(reverse('posts:post_create'), {
+                'text': text, 'image': self.image_file(**kwargs)})
+        return Post.objects.get(text=text)
+
+    def test_derivatives_created_on_upload(self):
+        """При загрузке создаются копии без EXIF только меньше оригинала."""
+        post = self.upload()
+        storage = post.image.storage
+        small = derivative_name(post.image.name, 100, 'jpg')
+        self.assertTrue(storage.exists(small))
+        self.assertTrue(storage.exists(
+            derivative_name(post.image.name, 200, 'webp')))
+        self.assertFalse(storage.exists(
+            derivative_name(post.image.name, 1000, 'jpg')))
+        with storage.open(small) as image_file:
+            image = Image.open(image_file)
+            self.assertEqual(image.size, (100, 75))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_picture_tag_emits_srcset(self):
+        """Тег picture выводит srcset с копиями."""
+        post = self.upload()
+        html = Template(
+            '{% load post_images %}{% picture image sizes="400px" %}'
+        ).render(Context({'image': post.image}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('.w100.jpg 100w', html)
+        self.assertIn(f'src="{post.image.url}"', html)
+
+    def test_srcset_uses_remembered_derivatives(self):
+        """Список копий запоминается при генерации, а после сброса кэша
+        восстанавливается по хранилищу."""
+        post = self.upload()
+        key = derivatives_key(post.image.name)
+        available = fragment_cache().get(key)
+        self.assertIn((100, 'jpg'), available)
+        self.assertNotIn((1000, 'jpg'), available)
+        sources = srcset(post.image)
+        fragment_cache().delete(key)
+        self.assertEqual(srcset(post.image), sources)
+        self.assertCountEqual(fragment_cache().get(key), available)
+
+    def test_original_is_stripped(self):
+        """Оригинал сохраняется без EXIF."""
+        post = self.upload()
+        with post.image.open() as image_file:
+            self.assertEqual(len(Image.open(image_file).getexif()), 0)
+
+    def test_same_stem_different_extension(self):
+        """Копии a.jpg и a.png из одного каталога не совпадают."""
+        jpg = self.upload(text='jpg', name='same.jpg')
+        png = self.upload(
+            text='png', name='same.png', fmt='PNG', color='blue')
+        self.assertNotEqual(
+            derivative_name(jpg.image.name, 100, 'jpg'),
+            derivative_name(png.image.name, 100, 'jpg'))
+        with png.image.storage.open(
+                derivative_name(png.image.name, 100, 'png')) as image_file:
+            self.assertEqual(
+                Image.open(image_file).convert('RGB').getpixel((0, 0)),
+                (0, 0, 255))
+
+    def test_files_removed_with_post_and_on_replace(self):
+        """Замена изображения и удаление поста убирают файлы и копии."""
+        post = self.upload()
+        storage = post.image.storage
+        old = post.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                {'text': 'Фото', 'image': self.image_file(name='new.jpg')})
+        post.refresh_from_db()
+        self.assertFalse(storage.exists(old))
+        self.assertFalse(storage.exists(derivative_name(old, 100, 'jpg')))
+        current = post.image.name
+        self.assertTrue(storage.exists(derivative_name(current, 100, 'jpg')))
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertFalse(storage.exists(current))
+        self.assertFalse(storage.exists(derivative_name(current, 100, 'jpg')))
@@ -0,0 +1,53 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class FeedIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='feed', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент идут по составным индексам без сортировки."""
+        feed = Post.objects.order_by('-pub_date', '-id')
+        self.assertUsesIndex(feed[:10], 'post_pub_date_idx')
+        self.assertUsesIndex(
+            feed.filter(group=self.group)[:10], 'post_group_pub_date_idx')
+        self.assertUsesIndex(
+            feed.filter(author=self.author)[:10], 'post_author_pub_date_idx')
+        self.assertIn(
+            'post_author_pub_date_idx',
+            timeline.follow_feed(self.user).order_by(
+                '-pub_date', '-id')[:10].explain())
+
+    def test_follow_and_comment_lookups_use_indexes(self):
+        """Подписка и комментарии поста ищутся по индексам."""
+        self.assertRegex(
+            Follow.objects.filter(user=self.user, author=self.author)
+            .explain(),
+            r'SEARCH posts_follow USING COVERING INDEX \S+ '
+            r'\(user_id=\? AND author_id=\?\)')
+        self.assertUsesIndex(
+            Comment.objects.filter(post=self.post).order_by('created'),
+            'comment_post_created_idx')
@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core.context_processors.directs import directs_count
+from posts.models import Conversation, Message, MessageState
+
+User = get_user_model()
+
+
+class ConversationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='owner')
+        cls.friends = [
+            User.objects.create_user(username=f'friend{i}')
+            for i in range(3)
+        ]
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def test_send_message_updates_summary(self):
+        """Отправка сообщения обновляет сводку и счётчик получателя."""
+        friend = self.friends[0]
+        Message.send_message(self.user, friend, 'привет')
+        Message.send_message(self.user, friend, 'как дела')
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.last_snippet, 'как дела')
+        self.assertEqual(conversation.unread_for(friend), 2)
+        self.assertEqual(conversation.unread_for(self.user), 0)
+        self.assertEqual(Conversation.unread_total(friend), 2)
+
+    def test_inbox_list_is_one_query(self):
+        """Список диалогов строится одним запросом."""
+        for friend in self.friends:
+            Message.send_message(friend, self.user, 'сообщение')
+        with self.assertNumQueries(1):
+            messages = Message.get_messages(self.user)
+            self.assertEqual(
+                [message['user'] for message in messages],
+                self.friends[::-1],
+            )
+            self.assertEqual(messages[0]['unread'], 1)
+
+    def test_directs_marks_thread_read(self):
+        """Открытие диалога обнуляет непрочитанные сообщения."""
+        friend = self.friends[1]
+        Message.send_message(friend, self.user, 'привет')
+        self.authorized_client.get(
+            reverse('posts:directs', args=(friend.username,)))
+        self.assertEqual(Conversation.unread_total(self.user), 0)
+        self.assertFalse(
+            MessageState.objects.filter(
+                user=self.user, is_read=False).exists())
+
+    def test_message_is_stored_once(self):
+        """Сообщение хранится одной строкой и видно обоим участникам."""
+        friend = self.friends[2]
+        Message.send_message(self.user, friend, 'раз')
+        Message.send_message(friend, self.user, 'два')
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertEqual(MessageState.objects.count(), 2)
+        for user, partner in ((self.user, friend), (friend, self.user)):
+            self.assertEqual(
+                [message.body for message in Message.thread(user, partner)],
+                ['раз', 'два'],
+            )
+
+    def test_hidden_message_is_not_in_thread(self):
+        """Удалённое участником сообщение пропадает только у него."""
+        friend = self.friends[0]
+        message = Message.send_message(self.user, friend, 'секрет')
+        message.hide_for(self.user)
+        self.assertFalse(Message.thread(self.user, friend).exists())
+        self.assertTrue(Message.thread(friend, self.user).exists())
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.friend = User.objects.create_user(username='writer')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        caches['fragments'].clear()
+
+    def badge(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return directs_count(request)['directs_count']
+
+    def send(self, body):
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.send_message(self.friend, self.user, body)
+
+    def test_badge_is_served_from_cache(self):
+        """После первого подсчёта значок не ходит в БД, новое
+        сообщение сбрасывает закэшированный счётчик."""
+        self.send('раз')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.badge(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.badge(), 1)
+        self.send('два')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.badge(), 2)
+
+    def test_reading_thread_resets_badge(self):
+        """Открытие входящих обнуляет значок."""
+        self.send('привет')
+        self.assertEqual(self.badge(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.authorized_client.get(reverse('posts:inbox'))
+        self.assertEqual(self.badge(), 0)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response.context['directs_count'], 0)
+
+    def test_new_message_changes_etag(self):
+        """Новое сообщение меняет ETag страницы, чтобы значок не устарел."""
+        url = reverse('posts:index')
+        etag = self.authorized_client.get(url)['ETag']
+        self.send('привет')
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'bg-danger">1<')
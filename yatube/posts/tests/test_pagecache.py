@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.pagecache import CSRF_PLACEHOLDER, page_cache, page_key
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+        Post.objects.create(author=cls.author, group=cls.group, text='Пост')
+        Post.objects.create(
+            author=cls.author, group=cls.other_group, text='Другой пост')
+
+    def setUp(self):
+        page_cache().clear()
+        caches['fragments'].clear()
+        self.client = Client()
+
+    def test_anonymous_hit(self):
+        """Повторный анонимный запрос отдаётся из кэша без шаблонов."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertTrue(first.templates)
+        self.assertEqual(second.templates, [])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotIn(CSRF_PLACEHOLDER, second.content.decode())
+        self.assertIn('csrfmiddlewaretoken', second.content.decode())
+
+    def test_text_keeps_placeholder_lookalikes(self):
+        """Текст поста, похожий на метку CSRF, не подменяется токеном."""
+        Post.objects.create(author=self.author, group=self.group,
+                            text=f'__csrf_token__ {CSRF_PLACEHOLDER}')
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.client.get(url)
+        content = self.client.get(url).content.decode()
+        self.assertIn('__csrf_token__ &lt;!--csrf_token--&gt;', content)
+
+    def test_pages_cached_separately(self):
+        """Номер страницы входит в ключ кэша."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        response = self.client.get(url, {'page': 'last'})
+        self.assertTrue(response.templates)
+
+    def test_segment_invalidation(self):
+        """Новый пост в группе сбрасывает её страницу и ленту, не трогая
+        другие группы."""
+        urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'other': reverse('posts:group_list',
+                             args=(self.other_group.slug,)),
+        }
+        for url in urls.values():
+            self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, group=self.group,
+                                text='Свежий пост')
+        for name, url in urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url)
+                self.assertEqual(bool(response.templates), name != 'other')
+                self.assertEqual(
+                    'Свежий пост' in response.content.decode(),
+                    name != 'other')
+
+    def test_author_rename_refreshes_group_page(self):
+        """Новое имя автора сразу видно на кэшированной странице группы."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Переименованный'
+            self.author.save()
+        content = self.client.get(url).content.decode()
+        self.assertIn('Переименованный', content)
+
+    def test_stale_copy_while_locked(self):
+        """Пока другой процесс пересобирает страницу, отдаётся старая
+        копия."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(author=self.author, text='Свежий пост')
+        key = page_key(RequestFactory().get(url))
+        page_cache().add(f'{key}:lock', 1)
+        stale = self.client.get(url)
+        self.assertEqual(stale.templates, [])
+        self.assertNotIn('Свежий пост', stale.content.decode())
+
+        page_cache().delete(f'{key}:lock')
+        fresh = self.client.get(url)
+        self.assertIn('Свежий пост', fresh.content.decode())
+
+    def test_authorized_not_cached(self):
+        """Страницы авторизованных пользователей не кэшируются."""
+        self.client.force_login(self.author)
+        url = reverse('about:author')
+        self.client.get(url)
+        self.assertTrue(self.client.get(url).templates)
+        self.client.logout()
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).templates, [])
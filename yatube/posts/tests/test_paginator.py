@@ -0,0 +1,96 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginator import CursorPaginator
+
+User = get_user_model()
+
+POSTS_COUNT = 25
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cursor')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}')
+            for i in range(POSTS_COUNT)
+        )
+        cls.guest_client = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_cover_all_posts_once(self):
+        """Курсоры вперёд обходят все посты без повторов."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page()
+        seen = [post.pk for post in page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(post.pk for post in page)
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(page.number, 3)
+
+    def test_previous_cursor_returns_same_page(self):
+        """Курсор назад возвращает ту же страницу, что и при переходе."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+        self.assertFalse(back.has_previous())
+
+    def test_last_and_bad_cursor(self):
+        """Последняя страница и испорченный курсор обрабатываются."""
+        paginator = CursorPaginator(Post.objects.all(), 10, count_key='t')
+        last = paginator.get_page(paginator.get_page().last_cursor)
+        self.assertFalse(last.has_next())
+        self.assertEqual(last.number, paginator.num_pages)
+        self.assertEqual(len(paginator.get_page('garbage')), 10)
+
+    async def test_async_pages_match_sync(self):
+        """aget_page() отдаёт те же страницы, что и get_page()."""
+        paginator = CursorPaginator(Post.objects.all(), 10, count_key='a')
+        first = await paginator.aget_page()
+        second = await paginator.aget_page(first.next_cursor)
+        cases = (
+            ((), first),
+            ((first.next_cursor,), second),
+            ((second.previous_cursor,), first),
+            ((first.last_cursor,), None),
+            ((None, '99'), None),
+        )
+        for args, expected in cases:
+            with self.subTest(args=args):
+                page = await paginator.aget_page(*args)
+                if expected is not None:
+                    self.assertEqual(list(page), list(expected))
+                self.assertEqual(
+                    (list(page), page.number, page.has_next(),
+                     page.has_previous()),
+                    await sync_to_async(self.sync_page)(paginator, args))
+
+    def sync_page(self, paginator, args):
+        page = paginator.get_page(*args)
+        return (list(page), page.number, page.has_next(),
+                page.has_previous())
+
+    def test_index_uses_cursor(self):
+        """Главная страница отдаёт страницы по курсору."""
+        response = self.guest_client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': page_obj.next_cursor})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(len(response.context['page_obj']), 10)
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import tasks
+from core.models import Task
+from posts.caching import get_versions, post_version_key
+from posts import reactions
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ReactionCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='liker')
+        cls.author = User.objects.create_user(username='author')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def setUp(self):
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def test_like_toggle_updates_counter(self):
+        """Лайк ставится и снимается, счётчик совпадает с M2M."""
+        url = reverse('posts:like', args=(self.post.pk,))
+        self.authorized_client.post(url, HTTP_REFERER='/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertTrue(self.post.likes.filter(pk=self.user.pk).exists())
+        self.authorized_client.post(url, HTTP_REFERER='/')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_toggle_without_deferred_loads(self):
+        """Клик читает пост одним запросом, без догрузки полей."""
+        url = reverse('posts:like', args=(self.post.pk,))
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.post(url, HTTP_REFERER='/')
+        post_reads = [
+            query for query in queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertEqual(len(post_reads), 1)
+
+    def test_double_insert_counts_once(self):
+        """Повторная вставка той же реакции не падает и не считается."""
+        through = Post.likes.through
+        self.assertTrue(reactions._insert(through, self.post.pk, self.user.pk))
+        self.assertFalse(
+            reactions._insert(through, self.post.pk, self.user.pk))
+        self.assertEqual(through.objects.filter(post=self.post).count(), 1)
+
+    def test_dislike_replaces_like(self):
+        """Дизлайк снимает лайк того же пользователя."""
+        self.authorized_client.post(
+            reverse('posts:like', args=(self.post.pk,)))
+        self.authorized_client.post(
+            reverse('posts:dislike', args=(self.post.pk,)))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+        self.assertEqual(self.post.dislikes_count, 1)
+
+    def test_m2m_changes_and_recount_command(self):
+        """Изменения M2M напрямую и команда пересчёта чинят счётчики."""
+        self.post.likes.add(self.user, self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7)
+        call_command('recount_reactions', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 2)
+        self.user.likes.clear()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_deferred_recount_invalidates_post(self):
+        """Кэш поста сбрасывается, когда воркер пересчитал счётчики."""
+        key = post_version_key(self.post.pk)
+        version = get_versions([key])[key]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.likes.add(self.user)
+        self.assertEqual(get_versions([key])[key], version)
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.execute(Task.objects.get().pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertNotEqual(get_versions([key])[key], version)
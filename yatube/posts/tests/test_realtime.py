@@ -0,0 +1,76 @@
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Message
+from posts.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class DirectConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username='sender')
+        self.recipient = User.objects.create_user(username='recipient')
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), '/ws/directs/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_message_is_pushed_to_both_sides(self):
+        """Сообщение по WebSocket приходит получателю со счётчиком."""
+        sender = await self.connect(self.sender)
+        recipient = await self.connect(self.recipient)
+        await sender.send_json_to({'to_user': 'recipient', 'body': 'привет'})
+        event = await recipient.receive_json_from(timeout=3)
+        self.assertEqual(event['message']['body'], 'привет')
+        self.assertEqual(event['unread'], 1)
+        event = await sender.receive_json_from(timeout=3)
+        self.assertIsNone(event['unread'])
+        self.assertEqual(
+            await sync_to_async(Message.objects.count)(), 1)
+        await sender.disconnect()
+        await recipient.disconnect()
+
+
+@override_settings(DIRECTS_POLL_INTERVAL=7)
+class DirectPollTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='poller')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def test_poll_returns_new_messages(self):
+        """Опрос сразу отдаёт только сообщения новее after и паузу до
+        следующего запроса."""
+        first = Message.send_message(self.friend, self.user, 'раз')
+        Message.send_message(self.friend, self.user, 'два')
+        response = self.authorized_client.get(
+            reverse('posts:poll_directs', args=('friend',)),
+            {'after': first.pk})
+        data = response.json()
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(
+            [message['body'] for message in data['messages']], ['два'])
+        self.assertEqual(data['unread'], 0)
+
+    def test_send_direct_json(self):
+        """Отправка с Accept: application/json не рендерит шаблон."""
+        response = self.authorized_client.post(
+            reverse('posts:send_direct'),
+            {'to_user': 'friend', 'body': 'json'},
+            HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json()['message']['body'], 'json')
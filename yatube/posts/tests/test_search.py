@@ -0,0 +1,119 @@
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post, SearchTerm, SearchTermStats
+from posts.stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Разные формы слова приводятся к одной основе."""
+        self.assertEqual(stem('книгами'), stem('книга'))
+        self.assertEqual(stem('постами'), stem('пост'))
+        self.assertEqual(stem('Ёлки'), stem('елка'))
+        self.assertEqual(stem('Django'), 'django')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='searcher')
+        cls.client_ = Client()
+
+    def create(self, model, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return model.objects.create(author=self.user, **kwargs)
+
+    def check_backend(self):
+        post = self.create(Post, text='Читаю интересные книги о городах')
+        other = self.create(Post, text='Книга о путешествиях')
+        comment = self.create(
+            Comment, post=other, text='Отличная книга про города')
+        self.assertCountEqual(search.search_posts('книгами'), [post, other])
+        self.assertEqual(search.search_posts('город книга'), [post])
+        self.assertEqual(search.search_comments('городами'), [comment])
+        self.assertEqual(search.search_posts('и в на'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.text = 'Теперь пишу о музыке'
+            post.save()
+        self.assertEqual(search.search_posts('город'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.active = False
+            comment.save()
+        self.assertEqual(search.search_comments('город'), [])
+        other.delete()
+        self.assertEqual(search.search_posts('книга'), [])
+
+    def test_fts5_backend(self):
+        """Индекс FTS5 находит формы слов и следует за изменениями."""
+        if not search.fts_available():
+            self.skipTest('FTS5 недоступен')
+        with override_settings(POSTS_SEARCH_BACKEND='fts5'):
+            self.check_backend()
+
+    @override_settings(POSTS_SEARCH_BACKEND='table')
+    def test_table_backend(self):
+        """Табличный индекс находит формы слов и следует за изменениями."""
+        self.check_backend()
+        self.assertFalse(SearchTerm.objects.filter(doc_id=0).exists())
+
+    @override_settings(POSTS_SEARCH_BACKEND='table')
+    def test_table_backend_keeps_statistics(self):
+        """Частоты слов ведутся при индексации, поиск их только читает."""
+        first = self.create(Post, text='Кот и собака')
+        self.create(Post, text='Кот на крыше')
+        backend = search.get_backend()
+
+        def stats():
+            return dict(
+                SearchTermStats.objects.filter(doc_type=0, documents__gt=0)
+                .values_list('term', 'documents'))
+
+        self.assertEqual(stats()[search.DOCUMENTS_TERM], 2)
+        self.assertEqual(stats()[stem('кот')], 2)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(backend.search([stem('кот')])), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.text = 'Только собака'
+            first.save()
+        self.assertEqual(stats()[stem('кот')], 1)
+        first.delete()
+        self.assertEqual(stats(), {search.DOCUMENTS_TERM: 1,
+                                   stem('кот'): 1, stem('крыше'): 1})
+
+    def test_migration_backfills_existing_documents(self):
+        """Миграция индексирует посты, созданные до появления индекса."""
+        migration = import_module(
+            'posts.migrations.0028_backfill_search_index')
+        post = Post.objects.create(author=self.user, text='Старые книги')
+        backends = ['table']
+        if search.fts_available():
+            backends.append('fts5')
+        for backend in backends:
+            with self.subTest(backend=backend), override_settings(
+                    POSTS_SEARCH_BACKEND=backend):
+                self.assertEqual(search.search_posts('книга'), [])
+                migration.backfill_search_index(
+                    apps, SimpleNamespace(connection=connection))
+                self.assertEqual(search.search_posts('книга'), [post])
+                search.get_backend().clear()
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные записи."""
+        self.create(Post, text='Заметка про котов')
+        response = self.client_.get(
+            reverse('posts:post_search'), {'q': 'кот'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['post_list']), 1)
+        self.assertContains(response, 'Заметка про котов')
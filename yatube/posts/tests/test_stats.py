@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import tasks
+from core.models import Task
+from posts import stats
+from posts.models import Follow, Post, Profile
+from posts.reactions import LIKES, toggle_reaction
+
+User = get_user_model()
+
+
+class ProfileStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Profile.objects.create(user=cls.author)
+        Profile.objects.create(user=cls.reader)
+
+    def counters(self, user):
+        return Profile.objects.values(*stats.COUNTERS).get(user=user)
+
+    def test_signals_keep_counters(self):
+        """Посты, подписки и лайки меняют счётчики профиля."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.create(author=self.author, text='Ещё пост')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        toggle_reaction(post, self.reader, LIKES)
+        self.assertEqual(self.counters(self.author), {
+            'posts_count': 2, 'followers_count': 1,
+            'following_count': 0, 'likes_received': 1,
+        })
+        self.assertEqual(self.counters(self.reader)['following_count'], 1)
+
+        post.likes.remove(self.reader)
+        self.assertEqual(self.counters(self.author)['likes_received'], 0)
+        self.reader.likes.add(post)
+        self.assertEqual(self.counters(self.author)['likes_received'], 1)
+        post.delete()
+        follow.delete()
+        self.assertEqual(self.counters(self.author), {
+            'posts_count': 1, 'followers_count': 0,
+            'following_count': 0, 'likes_received': 0,
+        })
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_m2m_likes_recounted_by_task(self):
+        """Лайки мимо toggle пересчитывает фоновая задача, не запрос."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        post.likes.add(self.reader)
+        self.assertEqual(self.counters(self.author)['likes_received'], 0)
+        tasks.execute(Task.objects.get().pk)
+        self.assertEqual(self.counters(self.author)['likes_received'], 1)
+
+    def test_reconcile_command(self):
+        """Команда находит и исправляет разошедшиеся счётчики."""
+        Post.objects.create(author=self.author, text='Пост')
+        Profile.objects.filter(user=self.author).update(
+            posts_count=7, followers_count=3)
+        out = StringIO()
+        call_command('reconcile_profile_stats', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(self.counters(self.author)['posts_count'], 1)
+        self.assertEqual(self.counters(self.author)['followers_count'], 0)
+        self.assertEqual(stats.reconcile(), 0)
+
+    def test_profile_page_uses_counters(self):
+        """Страница профиля берёт числа из профиля, а не считает заново."""
+        Post.objects.create(author=self.author, text='Пост')
+        Profile.objects.filter(user=self.author).update(
+            posts_count=42, followers_count=5)
+        response = Client().get(
+            reverse('posts:profile', args=('author',)))
+        self.assertContains(response, 'Всего постов: 42')
+        self.assertContains(response, 'Подписчиков: 5')
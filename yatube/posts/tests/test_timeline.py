@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry, TimelineState
+
+User = get_user_model()
+
+TIMELINE = {
+    'ENABLED': True,
+    'BACKEND': 'posts.timeline.DatabaseTimeline',
+    'MAX_ENTRIES': 5,
+    'CELEBRITY_FOLLOWERS': 10,
+}
+
+
+@override_settings(POSTS_TIMELINE=TIMELINE)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def follow(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_create_fans_out(self):
+        """Подписка заполняет ленту, новый пост попадает в неё сразу."""
+        Post.objects.create(author=self.author, text='старый')
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 1)
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'новый'})
+        self.assertEqual(self.feed(), ['новый', 'старый'])
+
+    def test_unfollow_prunes(self):
+        """Отписка убирает посты автора из ленты."""
+        Post.objects.create(author=self.author, text='пост')
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,)))
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,)))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_timeline_is_capped(self):
+        """Лента не растёт больше MAX_ENTRIES записей с запасом."""
+        self.follow()
+        for i in range(10):
+            self.author_client.post(
+                reverse('posts:post_create'), {'text': f'пост {i}'})
+        self.assertLessEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 6)
+
+    @override_settings(POSTS_TIMELINE={**TIMELINE, 'CELEBRITY_FOLLOWERS': 0})
+    def test_celebrity_is_read_on_request(self):
+        """Посты популярного автора читаются без раскладки по лентам."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'звезда'})
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), ['звезда'])
+
+    @override_settings(POSTS_TIMELINE={
+        **TIMELINE, 'BACKEND': 'posts.timeline.CacheTimeline'})
+    def test_cache_backend(self):
+        """Ленты в кэше собираются при подписке и пополняются постами."""
+        Post.objects.create(author=self.author, text='первый')
+        self.follow()
+        self.assertEqual(timeline.get_backend().read(self.reader.pk),
+                         [Post.objects.get().pk])
+        self.assertEqual(self.feed(), ['первый'])
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'второй'})
+        self.assertEqual(self.feed(), ['второй', 'первый'])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_reading_never_writes(self):
+        """Несобранная лента читается запросом по подпискам, без записи."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='пост')
+        self.assertEqual(self.feed(), ['пост'])
+        self.assertFalse(TimelineState.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_empty_timeline_is_built_once(self):
+        """Пустая собранная лента не пересобирается на каждом чтении."""
+        self.follow()
+        self.assertTrue(
+            TimelineState.objects.filter(user=self.reader).exists())
+        self.assertEqual(timeline.get_backend().read(self.reader.pk), [])
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                list(timeline.follow_feed(self.reader)), [])
+        with self.assertNumQueries(2):
+            list(timeline.follow_feed(self.reader))
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import user_index
+from posts.models import UserSearchToken
+
+User = get_user_model()
+
+
+class UserIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.ivan = User.objects.create_user(
+            username='ivan_petrov', first_name='Иван', last_name='Петров')
+        cls.ivanna = User.objects.create_user(
+            username='ivanna', first_name='Иванна', last_name='Сёмина')
+        cls.ivan2 = User.objects.create_user(username='ivan')
+        cls.oleg = User.objects.create_user(username='oleg')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.oleg)
+
+    def test_prefix_search(self):
+        """Точное совпадение логина идёт первым, затем префиксы."""
+        self.assertEqual(
+            user_index.search('ivan'), [self.ivan2, self.ivanna, self.ivan])
+        self.assertEqual(user_index.search('пет'), [self.ivan])
+        self.assertEqual(user_index.search('Ива Пет'), [self.ivan])
+        self.assertEqual(user_index.search('семина'), [self.ivanna])
+        self.assertEqual(user_index.search('   '), [])
+
+    def test_short_prefix_sorts_limited_candidates(self):
+        """Однобуквенный префикс не сортирует всех подходящих."""
+        users = User.objects.bulk_create(
+            User(username=f'z{i:04d}')
+            for i in range(user_index.PREFIX_CANDIDATES + 50))
+        UserSearchToken.objects.bulk_create(
+            UserSearchToken(user=user, token=user.username)
+            for user in users)
+        exact = User.objects.create_user(username='z')
+        with CaptureQueriesContext(connection) as queries:
+            found = user_index.search('z')
+        self.assertEqual(found[0], exact)
+        self.assertEqual(len(found), user_index.DEFAULT_LIMIT)
+        self.assertIn(f'LIMIT {user_index.PREFIX_CANDIDATES}',
+                      queries[0]['sql'])
+
+    def test_trigram_search(self):
+        """Опечатка и подстрока находятся по триграммам."""
+        self.assertEqual(user_index.search('petrow'), [self.ivan])
+        self.assertIn(self.ivan, user_index.search('petrov'))
+
+    def test_index_follows_edits(self):
+        """Смена имени обновляет индекс, вход в систему — нет."""
+        self.ivanna.last_name = 'Орлова'
+        self.ivanna.save()
+        self.assertEqual(user_index.search('орл'), [self.ivanna])
+        self.assertEqual(user_index.search('семина'), [])
+        with self.assertNumQueries(1):
+            self.ivanna.save(update_fields=['last_login'])
+        self.assertTrue(
+            UserSearchToken.objects.filter(token='орлова').exists())
+
+    def test_autocomplete_endpoint(self):
+        """Автодополнение отдаёт top-k без подсчёта всех совпадений."""
+        with self.assertNumQueries(4):
+            response = self.authorized_client.get(
+                reverse('posts:user_autocomplete'),
+                {'q': 'ivan', 'limit': 2})
+        results = response.json()['results']
+        self.assertEqual(
+            [result['username'] for result in results], ['ivan', 'ivanna'])
+        self.assertEqual(
+            results[0]['url'],
+            reverse('posts:newconversation', args=('ivan',)))
+
+    def test_user_search_page(self):
+        """Страница поиска собеседника использует индекс."""
+        response = self.authorized_client.get(
+            reverse('posts:usersearch'), {'q': 'петров'})
+        self.assertContains(response, '@ivan_petrov')
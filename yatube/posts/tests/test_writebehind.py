@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed, reactions
+from posts.models import Post
+from posts.reactions import DISLIKES, LIKES, ReactionBuffer
+
+User = get_user_model()
+
+
+class WriteBehindTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.users = [User.objects.create_user(username=f'user{i}')
+                     for i in range(3)]
+
+    def setUp(self):
+        caches['fragments'].clear()
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.log_dir.cleanup)
+        self.buffer = ReactionBuffer(self.log_dir.name, batch_size=100)
+
+    def likes(self):
+        return set(self.post.likes.values_list('pk', flat=True))
+
+    def test_toggles_are_deferred_and_deduplicated(self):
+        """Клики копятся в буфере, в БД попадает только итог."""
+        user = self.users[0]
+        self.assertTrue(self.buffer.toggle(self.post.pk, user.pk, LIKES))
+        self.assertFalse(self.buffer.toggle(self.post.pk, user.pk, LIKES))
+        self.assertTrue(self.buffer.toggle(self.post.pk, user.pk, DISLIKES))
+        key = (self.post.pk, user.pk)
+        self.assertEqual(reactions.pending_states([key])[key][0], DISLIKES)
+        self.assertFalse(self.post.dislikes.exists())
+        self.assertEqual(self.buffer.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.likes_count, self.post.dislikes_count), (0, 1))
+        self.assertEqual(os.listdir(self.log_dir.name), [])
+
+    def test_toggle_reads_state_once(self):
+        """Текущая реакция читается одним запросом, и с fsync клик
+        сразу попадает в журнал."""
+        self.post.dislikes.add(self.users[0])
+        buffer = ReactionBuffer(self.log_dir.name, batch_size=100,
+                                fsync=True)
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                buffer.toggle(self.post.pk, self.users[0].pk, LIKES))
+        key = (self.post.pk, self.users[0].pk)
+        self.assertEqual(reactions.read_log(buffer.path)[key][0], LIKES)
+        self.assertEqual(
+            reactions.current_reaction(self.post.pk, self.users[1].pk),
+            None)
+
+    def test_toggles_agree_across_processes(self):
+        """Второй клик в другом процессе считается от первого, а не от БД,
+        и порядок сброса журналов не важен."""
+        other_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(other_dir.cleanup)
+        other = ReactionBuffer(other_dir.name, batch_size=100)
+        user = self.users[0]
+        self.assertTrue(self.buffer.toggle(self.post.pk, user.pk, LIKES))
+        self.assertFalse(other.toggle(self.post.pk, user.pk, LIKES))
+        other.flush()
+        self.buffer.flush()
+        self.assertEqual(self.likes(), set())
+        self.assertTrue(other.toggle(self.post.pk, user.pk, LIKES))
+        other.flush()
+        self.assertEqual(self.likes(), {user.pk})
+
+    def test_flush_writes_batch(self):
+        """Реакции многих пользователей записываются одним пакетом."""
+        self.post.dislikes.add(self.users[2])
+        for user in self.users:
+            self.buffer.toggle(self.post.pk, user.pk, LIKES)
+        with self.assertNumQueries(9):
+            self.buffer.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.likes(), {user.pk for user in self.users})
+        self.assertEqual(
+            (self.post.likes_count, self.post.dislikes_count), (3, 0))
+
+    def test_recover_applies_orphaned_log(self):
+        """Журнал упавшего процесса применяется, оборванная строка
+        пропускается."""
+        path = os.path.join(self.log_dir.name, 'reactions-999999999.log')
+        with open(path, 'w', encoding='utf-8') as file:
+            for user in self.users[:2]:
+                file.write(json.dumps([self.post.pk, user.pk, LIKES]) + '\n')
+            file.write(json.dumps([self.post.pk, self.users[1].pk, None]))
+            file.write('\n[' + str(self.post.pk))
+        self.assertEqual(reactions.recover(self.log_dir.name), 2)
+        self.assertEqual(self.likes(), {self.users[0].pk})
+        self.assertFalse(os.path.exists(path))
+
+    def test_live_process_log_is_kept(self):
+        """Журнал живого процесса не трогается без force."""
+        self.buffer.toggle(self.post.pk, self.users[0].pk, LIKES)
+        self.assertEqual(reactions.recover(self.log_dir.name), 0)
+        self.assertEqual(reactions.recover(self.log_dir.name, force=True), 1)
+        self.assertEqual(self.likes(), {self.users[0].pk})
+
+
+class WriteBehindViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='liker')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        caches['fragments'].clear()
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        settings = override_settings(POSTS_REACTIONS_WRITE_BEHIND={
+            'ENABLED': True,
+            'LOG_DIR': log_dir.name,
+            'FLUSH_INTERVAL': None,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(setattr, reactions, '_buffer', None)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_like_is_visible_before_flush(self):
+        """Зритель сразу видит свой лайк, в БД он появится после сброса."""
+        self.client.post(reverse('posts:like', args=(self.post.pk,)))
+        self.assertFalse(self.post.likes.exists())
+        [post] = feed.assemble([self.post], self.user)
+        self.assertEqual(post.viewer_reaction, LIKES)
+        reactions.get_buffer().flush()
+        self.assertTrue(self.post.likes.filter(pk=self.user.pk).exists())
@@ -0,0 +1,277 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q
+from django.utils.module_loading import import_string
+
+from .models import Follow, Post, TimelineEntry, TimelineState
+
+DEFAULTS = {
+    'ENABLED': False,
+    'BACKEND': 'posts.timeline.DatabaseTimeline',
+    'MAX_ENTRIES': 500,
+    'CELEBRITY_FOLLOWERS': 1000,
+    'CELEBRITY_CACHE_TIMEOUT': 300,
+    'CACHE_ALIAS': 'default',
+}
+
+
+def timeline_settings():
+    return {**DEFAULTS, **getattr(settings, 'POSTS_TIMELINE', {})}
+
+
+class DatabaseTimeline:
+    """Ленты хранятся в таблице TimelineEntry.
+
+    Собранная лента отмечена строкой TimelineState, поэтому пустая
+    лента отличается от несобранной.
+    """
+
+    def __init__(self, options):
+        self.max_entries = options['MAX_ENTRIES']
+
+    def push(self, user_ids, post):
+        user_ids = list(
+            TimelineState.objects.filter(user_id__in=user_ids)
+            .values_list('user_id', flat=True))
+        if not user_ids:
+            return
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=post.pk,
+                              pub_date=post.pub_date)
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True,
+        )
+        overflow = (
+            TimelineEntry.objects.filter(user_id__in=user_ids)
+            .values('user_id')
+            .annotate(total=Count('id'))
+            .filter(total__gt=self.max_entries + self.max_entries // 4)
+            .values_list('user_id', flat=True)
+        )
+        for user_id in overflow:
+            self.trim(user_id)
+
+    def extend(self, user_id, posts, create=False):
+        if create:
+            TimelineState.objects.update_or_create(user_id=user_id)
+        elif not TimelineState.objects.filter(user_id=user_id).exists():
+            return
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=post_id,
+                              pub_date=pub_date)
+                for pub_date, post_id in posts
+            ],
+            ignore_conflicts=True,
+        )
+        self.trim(user_id)
+
+    def prune(self, user_id, author_id):
+        TimelineEntry.objects.filter(
+            user_id=user_id, post__author_id=author_id).delete()
+
+    def clear(self, user_id):
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        TimelineState.objects.filter(user_id=user_id).delete()
+
+    def trim(self, user_id):
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        oldest_kept = (
+            entries.order_by('-pub_date', '-post_id')
+            .values_list('pub_date', flat=True)[self.max_entries - 1:]
+            .first()
+        )
+        if oldest_kept is not None:
+            entries.filter(pub_date__lt=oldest_kept).delete()
+
+    def read(self, user_id):
+        post_ids = list(
+            TimelineEntry.objects.filter(
+                user_id=user_id, user__timeline_state__isnull=False)
+            .order_by('-pub_date', '-post_id')
+            .values_list('post_id', flat=True)[:self.max_entries]
+        )
+        if post_ids or TimelineState.objects.filter(
+                user_id=user_id).exists():
+            return post_ids
+        return None
+
+
+class CacheTimeline:
+    """Ленты хранятся в кэше списками [timestamp, post_id]."""
+
+    def __init__(self, options):
+        self.max_entries = options['MAX_ENTRIES']
+        self.cache = caches[options['CACHE_ALIAS']]
+
+    def key(self, user_id):
+        return f'timeline:{user_id}'
+
+    def push(self, user_ids, post):
+        keys = {self.key(user_id): user_id for user_id in user_ids}
+        stored = self.cache.get_many(keys)
+        entry = [post.pub_date.timestamp(), post.pk]
+        self.cache.set_many(
+            {
+                key: [entry] + entries[:self.max_entries - 1]
+                for key, entries in stored.items()
+            },
+            timeout=None,
+        )
+
+    def extend(self, user_id, posts, create=False):
+        entries = self.cache.get(self.key(user_id))
+        if entries is None and not create:
+            return
+        entries = (entries or []) + [
+            [pub_date.timestamp(), post_id] for pub_date, post_id in posts]
+        entries = sorted({tuple(entry) for entry in entries}, reverse=True)
+        self.cache.set(
+            self.key(user_id),
+            [list(entry) for entry in entries[:self.max_entries]],
+            timeout=None,
+        )
+
+    def prune(self, user_id, author_id):
+        # В кэше нет автора поста, лента соберётся заново при чтении.
+        self.clear(user_id)
+
+    def clear(self, user_id):
+        self.cache.delete(self.key(user_id))
+
+    def read(self, user_id):
+        entries = self.cache.get(self.key(user_id))
+        if entries is None:
+            return None
+        return [post_id for _, post_id in entries]
+
+
+def get_backend():
+    options = timeline_settings()
+    return import_string(options['BACKEND'])(options)
+
+
+def is_enabled():
+    return timeline_settings()['ENABLED']
+
+
+def _followers(author_id):
+    """Подписчики автора или None, если автор слишком популярен."""
+    limit = timeline_settings()['CELEBRITY_FOLLOWERS']
+    followers = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)[:limit + 1]
+    )
+    if len(followers) > limit:
+        return None
+    return followers
+
+
+def _celebrities_key(user_id):
+    return f'timeline:celebrities:{user_id}'
+
+
+def _celebrities(user_id):
+    """Популярные авторы из подписок пользователя.
+
+    Список кэшируется на CELEBRITY_CACHE_TIMEOUT секунд и сбрасывается
+    при подписке и отписке; автор, ставший популярным, появится в нём
+    не позже таймаута.
+    """
+    options = timeline_settings()
+    cache = caches[options['CACHE_ALIAS']]
+    celebrities = cache.get(_celebrities_key(user_id))
+    if celebrities is None:
+        celebrities = list(
+            Follow.objects.filter(
+                author__in=Follow.objects.filter(user_id=user_id)
+                .values('author'))
+            .values('author')
+            .annotate(total=Count('id'))
+            .filter(total__gt=options['CELEBRITY_FOLLOWERS'])
+            .values_list('author', flat=True)
+        )
+        cache.set(_celebrities_key(user_id), celebrities,
+                  options['CELEBRITY_CACHE_TIMEOUT'])
+    return celebrities
+
+
+def _forget_celebrities(user_id):
+    caches[timeline_settings()['CACHE_ALIAS']].delete(
+        _celebrities_key(user_id))
+
+
+def _recent_posts(author_ids):
+    return (
+        Post.objects.filter(author_id__in=author_ids)
+        .order_by('-pub_date', '-id')
+        .values_list('pub_date', 'id')[:timeline_settings()['MAX_ENTRIES']]
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_enabled():
+        return
+    followers = _followers(post.author_id)
+    if followers:
+        get_backend().push(followers, post)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту посты автора после подписки.
+
+    Несобранная лента собирается здесь целиком, а не при чтении.
+    """
+    if not is_enabled():
+        return
+    _forget_celebrities(user_id)
+    backend = get_backend()
+    if backend.read(user_id) is None:
+        rebuild(user_id)
+    elif _followers(author_id) is not None:
+        backend.extend(user_id, _recent_posts([author_id]))
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    if not is_enabled():
+        return
+    _forget_celebrities(user_id)
+    backend = get_backend()
+    backend.prune(user_id, author_id)
+    if backend.read(user_id) is None:
+        rebuild(user_id)
+
+
+def rebuild(user_id):
+    """Собирает ленту пользователя заново из подписок."""
+    _forget_celebrities(user_id)
+    celebrities = _celebrities(user_id)
+    authors = (
+        Follow.objects.filter(user_id=user_id)
+        .exclude(author_id__in=celebrities)
+        .values_list('author_id', flat=True)
+    )
+    backend = get_backend()
+    backend.clear(user_id)
+    backend.extend(user_id, _recent_posts(list(authors)), create=True)
+    return celebrities
+
+
+def follow_feed(user):
+    """Посты ленты подписок: готовый список id плюс популярные авторы.
+
+    Только читает: несобранная (или вытесненная из кэша) лента
+    отдаётся обычным запросом по подпискам до следующей подписки,
+    отписки или manage.py rebuild_timelines.
+    """
+    if not is_enabled():
+        return Post.objects.filter(author__following__user=user)
+    post_ids = get_backend().read(user.pk)
+    if post_ids is None:
+        return Post.objects.filter(author__following__user=user)
+    return Post.objects.filter(
+        Q(pk__in=post_ids) | Q(author_id__in=_celebrities(user.pk)))
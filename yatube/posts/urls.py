@@ -1,24 +1,47 @@
 from django.conf import settings
 from django.conf.urls.static import static
-from django.urls import path
+from django.urls import include, path
 
-from . import views
+from . import api, async_views, views
 
 app_name = 'posts'
 
+read_views = async_views if settings.POSTS_ASYNC_VIEWS else views
+
+api_urlpatterns = [
+    path('token/', api.token, name='api_token'),
+    path('posts/', api.posts, name='api_posts'),
+    path('posts/<int:post_id>/', api.post_detail, name='api_post_detail'),
+    path('posts/<int:post_id>/like/', api.like, name='api_like'),
+    path('posts/<int:post_id>/dislike/', api.dislike, name='api_dislike'),
+    path('groups/<slug:slug>/posts/', api.group_posts,
+         name='api_group_posts'),
+    path('users/<str:username>/posts/', api.user_posts,
+         name='api_user_posts'),
+    path('users/<str:username>/follow/', api.follow, name='api_follow'),
+    path('feed/', api.follow_feed, name='api_follow_feed'),
+    path('directs/', api.directs, name='api_directs'),
+    path('directs/<str:username>/', api.direct_thread,
+         name='api_direct_thread'),
+]
+
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('group/<slug:slug>/', views.group_posts, name='group_list'),
-    path('profile/<str:username>/', views.profile, name='profile'),
-    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('', read_views.index, name='index'),
+    path('group/<slug:slug>/', read_views.group_posts, name='group_list'),
+    path('profile/<str:username>/', read_views.profile, name='profile'),
+    path('posts/<int:post_id>/', read_views.post_detail,
+         name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/delete/', views.post_delete, name='post_delete'),
     path('posts/<int:post_id>/comment/',
          views.comment_post, name='comment_post'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments, name='post_comments'),
     path('edit/', views.edit_profile, name='edit'),
     path('<int:pk>/like/', views.add_like, name='like'),
     path('<int:pk>/dislike/', views.add_dislike, name='dislike'),
+    path('search/', views.post_search, name='post_search'),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -30,11 +53,16 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
-    path('directs/', views.inbox, name='inbox'),
+    path('directs/', read_views.inbox, name='inbox'),
     path('directs/<username>', views.directs, name='directs'),
+    path('directs/<username>/poll/', views.poll_directs,
+         name='poll_directs'),
     path('new/', views.user_search, name='usersearch'),
+    path('new/autocomplete/', views.user_autocomplete,
+         name='user_autocomplete'),
     path('new/<username>', views.new_conversation, name='newconversation'),
     path('send/', views.send_direct, name='send_direct'),
+    path(f'api/{api.API_VERSION}/', include(api_urlpatterns)),
 ]
 if settings.DEBUG:
     urlpatterns += static(
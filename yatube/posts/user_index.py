@@ -0,0 +1,131 @@
+import re
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.functions import Length
+
+from .models import User, UserSearchToken, UserTrigram
+
+INDEXED_FIELDS = ('username', 'first_name', 'last_name')
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 20
+TRIGRAM_MIN_LENGTH = 3
+TRIGRAM_THRESHOLD = 0.5
+PREFIX_END = '\uffff'
+# Сколько пользователей по префиксу сортируется по длине логина. Без
+# потолка короткий префикс ('а') сортировал бы почти всю таблицу.
+PREFIX_CANDIDATES = 200
+
+SEPARATOR_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def normalize(text):
+    return (text or '').strip().lower().replace('ё', 'е')
+
+
+def words(text):
+    return [word for word in SEPARATOR_RE.split(normalize(text)) if word]
+
+
+def user_tokens(user):
+    """Слова из логина и имени; логин целиком тоже, с подчёркиваниями."""
+    tokens = {normalize(user.username)}
+    for field in INDEXED_FIELDS:
+        tokens.update(words(getattr(user, field)))
+    tokens.discard('')
+    return tokens
+
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def update_user(user):
+    """Перестраивает записи индекса, если имя пользователя изменилось."""
+    tokens = user_tokens(user)
+    current = set(
+        UserSearchToken.objects.filter(user=user)
+        .values_list('token', flat=True))
+    if tokens == current:
+        return
+    grams = set().union(*(trigrams(token) for token in tokens))
+    with transaction.atomic():
+        UserSearchToken.objects.filter(user=user).delete()
+        UserTrigram.objects.filter(user=user).delete()
+        UserSearchToken.objects.bulk_create(
+            UserSearchToken(user=user, token=token) for token in tokens)
+        UserTrigram.objects.bulk_create(
+            UserTrigram(user=user, trigram=gram) for gram in grams)
+
+
+def rebuild():
+    UserSearchToken.objects.all().delete()
+    UserTrigram.objects.all().delete()
+    total = 0
+    for user in User.objects.only(*INDEXED_FIELDS).iterator():
+        update_user(user)
+        total += 1
+    return total
+
+
+def _token_range(word):
+    return UserSearchToken.objects.filter(
+        token__gte=word, token__lt=word + PREFIX_END)
+
+
+def _prefix_matches(query_words, limit):
+    """Пользователи, у которых каждое слово запроса начинает какое-то слово.
+
+    Диапазон token >= q AND token < q + U+FFFF идёт по индексу, в отличие
+    от LIKE 'q%', который SQLite без учёта регистра по индексу не ищет.
+    Кандидаты берутся по самому длинному слову в порядке индекса и не
+    больше PREFIX_CANDIDATES: точное и короткие совпадения идут в этом
+    порядке первыми, а сортировка не зависит от числа пользователей.
+    """
+    longest = max(query_words, key=len)
+    candidates = _token_range(longest).order_by('token', 'user_id').values(
+        'user_id')[:PREFIX_CANDIDATES]
+    users = User.objects.filter(pk__in=candidates)
+    for word in query_words:
+        if word != longest:
+            users = users.filter(
+                pk__in=_token_range(word).values('user_id'))
+    exact = normalize(' '.join(query_words))
+    return list(
+        users.annotate(exact=Case(
+            When(username__iexact=exact, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        ))
+        .order_by('exact', Length('username'), 'username')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def _trigram_matches(query_words, limit, exclude):
+    grams = set().union(*(trigrams(word) for word in query_words))
+    needed = max(1, round(len(grams) * TRIGRAM_THRESHOLD))
+    return list(
+        UserTrigram.objects.filter(trigram__in=grams)
+        .exclude(user_id__in=exclude)
+        .values('user_id')
+        .annotate(hits=Count('id'))
+        .filter(hits__gte=needed)
+        .order_by('-hits', 'user_id')
+        .values_list('user_id', flat=True)[:limit]
+    )
+
+
+def search(query, limit=DEFAULT_LIMIT):
+    """Сначала совпадения по префиксу, затем добор по триграммам."""
+    query_words = words(query)
+    if not query_words:
+        return []
+    limit = min(limit, MAX_LIMIT) if limit > 0 else DEFAULT_LIMIT
+    ids = _prefix_matches(query_words, limit)
+    if (len(ids) < limit
+            and len(''.join(query_words)) >= TRIGRAM_MIN_LENGTH):
+        ids += _trigram_matches(query_words, limit - len(ids), ids)
+    users = User.objects.only(*INDEXED_FIELDS).in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
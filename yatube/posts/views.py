@@ -1,29 +1,38 @@
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template import loader
-from django.db.models import Q
+from django.urls import reverse
+
+from core.routers import replica_reads
 
+from . import comments, feed, search, stats, timeline, user_index
+from .conditional import (feed_scopes, group_scopes, post_scopes,
+                          profile_scopes, versioned)
 from .forms import CommentForm, PostForm, ProfileEditForm, UserEditForm
-from .models import Comment, Follow, Group, Message, Post, Profile, User
+from .models import (Conversation, Follow, Group, Message, Post, Profile,
+                     User)
+from .pagecache import cache_anonymous
+from .paginator import get_page
+from .reactions import DISLIKES, LIKES, toggle_reaction
+from .realtime import serialize_message
+from .tasks import fan_out_post, make_image_derivatives
 
 POSTS_PER_PAGE = 10
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    post_list = (
-        Post.objects.filter(author__following__user=request.user)
-        .select_related('group')
-    )
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    post_list = timeline.follow_feed(request.user)
+    page_obj = get_page(request, post_list, POSTS_PER_PAGE)
+    feed.assemble(page_obj, request.user)
     context = {
         'post_list': post_list,
         'page_obj': page_obj,
-        'paginator': paginator,
+        'paginator': page_obj.paginator,
     }
     return render(request, 'posts/follow.html', context)
 
@@ -34,7 +43,9 @@ def profile_follow(request, username):
     user = User.objects.get(username=request.user.username)
     if author == user:
         return redirect('posts:profile', username)
-    Follow.objects.get_or_create(author=author, user=user)
+    _, created = Follow.objects.get_or_create(author=author, user=user)
+    if created:
+        timeline.backfill(user.pk, author.pk)
     return redirect('posts:profile', username)
 
 
@@ -43,51 +54,25 @@ def profile_unfollow(request, username):
     author = User.objects.get(username=username)
     user = User.objects.get(username=request.user.username)
     Follow.objects.filter(author=author, user=user).delete()
+    timeline.prune(user.pk, author.pk)
     return redirect('posts:profile', username)
 
 
+def _toggle_reaction(request, pk, reaction):
+    post = get_object_or_404(
+        Post.objects.only('pk', 'author_id', 'group_id'), pk=pk)
+    toggle_reaction(post, request.user, reaction)
+    return redirect(request.META.get('HTTP_REFERER', 'posts:index'))
+
+
 @login_required
 def add_like(request, pk, *args, **kwargs):
-    post = Post.objects.get(pk=pk)
-    is_dislike = False
-    for dislike in post.dislikes.all():
-        if dislike == request.user:
-            is_dislike = True
-            break
-    if is_dislike:
-        post.dislikes.remove(request.user)
-    is_like = False
-    for like in post.likes.all():
-        if like == request.user:
-            is_like = True
-            break
-    if not is_like:
-        post.likes.add(request.user)
-    if is_like:
-        post.likes.remove(request.user)
-    return redirect(request.META.get('HTTP_REFERER'))
+    return _toggle_reaction(request, pk, LIKES)
 
 
 @login_required
 def add_dislike(request, pk, *args, **kwargs):
-    post = Post.objects.get(pk=pk)
-    is_like = False
-    for like in post.likes.all():
-        if like == request.user:
-            is_like = True
-            break
-    if is_like:
-        post.likes.remove(request.user)
-    is_dislike = False
-    for dislike in post.dislikes.all():
-        if dislike == request.user:
-            is_dislike = True
-            break
-    if not is_dislike:
-        post.dislikes.add(request.user)
-    if is_dislike:
-        post.dislikes.remove(request.user)
-    return redirect(request.META.get('HTTP_REFERER'))
+    return _toggle_reaction(request, pk, DISLIKES)
 
 
 @login_required
@@ -100,7 +85,11 @@ def edit_profile(request):
             files=request.FILES)
         if user_form.is_valid() and profile_form.is_valid():
             user_form.save()
-            profile_form.save()
+            profile = profile_form.save()
+            if 'profile_photo' in profile_form.changed_data:
+                make_image_derivatives.delay(
+                    model='posts.Profile', pk=profile.pk,
+                    field='profile_photo')
         return redirect('posts:index')
     else:
         user_form = UserEditForm(instance=request.user)
@@ -118,10 +107,28 @@ def comment_post(request, post_id,):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = comments.find_parent(
+            post, request.POST.get('parent'))
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    root = comments.find_parent(post, request.GET.get('root'))
+    if root is not None:
+        page = comments.comment_subtree(root)
+        next_cursor = None
+    else:
+        page, next_cursor = comments.comment_page(
+            post, request.GET.get('after'))
+    return JsonResponse({
+        'comments': [comments.serialize_comment(item) for item in page],
+        'next': next_cursor,
+    })
+
+
 @login_required
 def post_edit(request, post_id):
     is_edit = True
@@ -131,10 +138,14 @@ def post_edit(request, post_id):
     if user != post.author:
         return redirect('posts:post_detail', post.id)
     if request.method == "POST":
-        form = PostForm(request.POST or None, instance=post)
+        form = PostForm(request.POST or None, request.FILES or None,
+                        instance=post)
         if form.is_valid():
             post = form.save(commit=False)
             post.save()
+            if 'image' in form.changed_data:
+                make_image_derivatives.delay(
+                    model='posts.Post', pk=post.pk, field='image')
             return redirect('posts:post_detail', post.id)
         return render(request, template, {'form': form})
     form = PostForm(instance=post)
@@ -164,42 +175,51 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            if post.image:
+                make_image_derivatives.delay(
+                    model='posts.Post', pk=post.pk, field='image')
+            fan_out_post.delay(post_id=post.pk)
             return redirect('posts:profile', post.author)
         return render(request, template, {'form': form})
     form = PostForm()
     return render(request, template, {'form': form})
 
 
+@replica_reads
+@versioned(profile_scopes)
 def profile(request, username):
     user = get_object_or_404(User, username=username)
     template = 'posts/profile.html'
-    name = Profile.objects.filter(user=user)
+    author_stats = stats.for_user(user)
+    name = [author_stats] if author_stats.pk else []
     following = (
         request.user.is_authenticated
         and user.following.filter(user=request.user).exists()
     )
-    posts = user.posts.all()
-    post_count = Post.objects.filter(author=user).count()
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page(request, user.posts.all(), POSTS_PER_PAGE,
+                        count_key=f'author:{user.pk}')
+    feed.assemble(page_obj, request.user, authors=[user])
     context = {
         'following': following,
         'name': name,
-        'post_count': post_count,
+        'stats': author_stats,
+        'post_count': author_stats.posts_count,
         'author': user,
         'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@replica_reads
+@versioned(post_scopes)
 def post_detail(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    comment = Comment.objects.select_related('author').filter(post_id=post)
+    comment, next_cursor = comments.comment_page(post)
     comment_form = CommentForm(data=request.POST or None)
-    post_count = post.author.posts.count()
+    post_count = stats.for_user(post.author).posts_count
     context = {
         'comment': comment,
+        'next_cursor': next_cursor,
         'comment_form': comment_form,
         'post_count': post_count,
         'post': post,
@@ -207,12 +227,14 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+@versioned(feed_scopes)
+@cache_anonymous(feed_scopes)
 def index(request):
-    posts = Post.objects.select_related('author', 'group')
     comment_form = CommentForm(data=request.POST or None)
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page(request, Post.objects.all(), POSTS_PER_PAGE,
+                        count_key='index')
+    feed.assemble(page_obj, request.user)
     template = 'posts/index.html'
     context = {
         'comment_form': comment_form,
@@ -221,13 +243,15 @@ def index(request):
     return render(request, template, context)
 
 
+@replica_reads
+@versioned(group_scopes)
+@cache_anonymous(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    posts = group.posts.select_related('author')
-    paginator = Paginator(posts, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page(request, group.posts.all(), POSTS_PER_PAGE,
+                        count_key=f'group:{group.pk}')
+    feed.assemble(page_obj, request.user, groups=[group])
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -235,6 +259,17 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'post_list': feed.assemble(
+            search.search_posts(query) if query else [], request.user),
+        'comment_list': search.search_comments(query) if query else [],
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def inbox(request):
     messages = Message.get_messages(user=request.user)
@@ -244,14 +279,9 @@ def inbox(request):
     if messages:
         message = messages[0]
         active_direct = message['user'].username
-        directs = Message.objects.filter(
-            user=request.user,
-            recipient=message['user']
-        )
-        directs.update(is_read=True)
-        for message in messages:
-            if message['user'].username == active_direct:
-                message['unread'] = 0
+        directs = Message.thread(request.user, message['user'])
+        Message.mark_read(request.user, message['user'])
+        message['unread'] = 0
 
     context = {
         'directs': directs,
@@ -266,32 +296,44 @@ def inbox(request):
 
 @login_required
 def user_search(request):
-    query = request.GET.get("q")
+    query = request.GET.get('q')
     context = {}
     if query:
-        users = User.objects.filter(Q(username__icontains=query))
-        paginator = Paginator(users, 6)
-        page_number = request.GET.get('page')
-        users_paginator = paginator.get_page(page_number)
-        context = {
-            'users': users_paginator,
-        }
+        context['users'] = user_index.search(
+            query, limit=user_index.MAX_LIMIT)
     template = loader.get_template('direct/search_user.html')
     return HttpResponse(template.render(context, request))
 
 
+@login_required
+def user_autocomplete(request):
+    try:
+        limit = int(request.GET.get('limit', user_index.DEFAULT_LIMIT))
+    except ValueError:
+        return HttpResponseBadRequest()
+    users = user_index.search(request.GET.get('q', ''), limit=limit)
+    return JsonResponse({'results': [
+        {
+            'username': user.username,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'url': reverse('posts:newconversation', args=(user.username,)),
+        }
+        for user in users
+    ]})
+
+
 @login_required
 def directs(request, username):
     user = request.user
+    partner = get_object_or_404(User, username=username)
     messages = Message.get_messages(user=user)
     active_direct = username
-    directs = Message.objects.filter(user=user, recipient__username=username)
-    directs.update(is_read=True)
-    users = User.objects.get(username=username)
-    image = Profile.objects.filter(user=users)
-    print(image)
+    directs = Message.thread(user, partner)
+    Message.mark_read(user, partner)
+    image = Profile.objects.filter(user=partner)
     for message in messages:
-        if message['user'].username == username:
+        if message['user'] == partner:
             message['unread'] = 0
 
     context = {
@@ -321,21 +363,35 @@ def new_conversation(request, username):
 
 @login_required
 def send_direct(request):
-    from_user = request.user
-    to_user_username = request.POST.get('to_user')
-    body = request.POST.get('body')
-    if request.method == 'POST':
-        to_user = User.objects.get(username=to_user_username)
-        Message.send_message(from_user, to_user, body)
-        return redirect('posts:inbox')
-    else:
-        HttpResponseBadRequest()
+    if request.method != 'POST':
+        return HttpResponseBadRequest()
+    to_user = get_object_or_404(User, username=request.POST.get('to_user'))
+    message = Message.send_message(
+        request.user, to_user, request.POST.get('body'))
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({'message': serialize_message(message)})
+    return redirect('posts:inbox')
 
 
-def check_directs(request):
-    directs_count = 0
-    if request.user.is_authenticated:
-        directs_count = Message.objects.filter(
-            user=request.user,
-            is_read=False).count()
-    return {'directs_count': directs_count}
+@login_required
+def poll_directs(request, username):
+    """Короткий опрос: сообщения диалога новее ?after=<id>.
+
+    Отвечает сразу, Retry-After подсказывает паузу до следующего
+    запроса — воркер не занят ожиданием.
+    """
+    partner = get_object_or_404(User, username=username)
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return HttpResponseBadRequest()
+    messages = list(
+        Message.thread(request.user, partner).filter(pk__gt=after))
+    if messages:
+        Message.mark_read(request.user, partner)
+    response = JsonResponse({
+        'messages': [serialize_message(message) for message in messages],
+        'unread': Conversation.unread_total(request.user),
+    })
+    response.headers['Retry-After'] = settings.DIRECTS_POLL_INTERVAL
+    return response
@@ -0,0 +1,76 @@
+(function () {
+  const list = document.getElementById('comments');
+  if (!list) {
+    return;
+  }
+  const more = document.getElementById('comments-more');
+  const parent = document.getElementById('comment-parent');
+  const authenticated = Boolean(parent);
+  let next = list.dataset.next;
+  let loading = false;
+
+  function render(comment) {
+    const box = document.createElement('div');
+    box.className = 'comment';
+    box.dataset.id = comment.id;
+    box.style.marginLeft = comment.depth + 'em';
+    const info = document.createElement('p');
+    info.className = 'info';
+    info.textContent = 'Коментарий ' + comment.author + ' ' +
+      new Date(comment.created).toLocaleString();
+    const text = document.createElement('p');
+    text.textContent = comment.text;
+    box.append(info, text);
+    if (authenticated) {
+      const reply = document.createElement('button');
+      reply.type = 'button';
+      reply.className = 'btn btn-link btn-sm comment-reply';
+      reply.dataset.id = comment.id;
+      reply.textContent = 'Ответить';
+      box.append(reply);
+    }
+    list.append(box);
+  }
+
+  function load() {
+    if (!next || loading) {
+      return;
+    }
+    loading = true;
+    fetch(list.dataset.url + '?after=' + encodeURIComponent(next), {
+      headers: {'Accept': 'application/json'},
+    })
+      .then(function (response) { return response.json(); })
+      .then(function (data) {
+        data.comments.forEach(render);
+        next = data.next;
+        if (!next && more) {
+          more.remove();
+        }
+      })
+      .finally(function () { loading = false; });
+  }
+
+  if (more) {
+    more.addEventListener('click', load);
+    if ('IntersectionObserver' in window) {
+      new IntersectionObserver(function (entries) {
+        if (entries.some(function (entry) { return entry.isIntersecting; })) {
+          load();
+        }
+      }).observe(more);
+    }
+  }
+
+  list.addEventListener('click', function (event) {
+    const button = event.target.closest('.comment-reply');
+    if (!button || !parent) {
+      return;
+    }
+    parent.value = button.dataset.id;
+    const field = parent.form.querySelector('textarea');
+    if (field) {
+      field.focus();
+    }
+  });
+})();
@@ -0,0 +1,77 @@
+(function () {
+  const area = document.getElementById('chat-area');
+  const form = document.getElementById('direct-form');
+  if (!area || !area.dataset.partner) {
+    return;
+  }
+  const partner = area.dataset.partner;
+  const list = document.getElementById('chat-messages');
+  let lastId = parseInt(area.dataset.lastId || '0', 10);
+
+  function append(message) {
+    if (message.id <= lastId) {
+      return;
+    }
+    if (message.sender !== partner && message.recipient !== partner) {
+      return;
+    }
+    lastId = message.id;
+    const box = document.createElement('div');
+    box.className = 'box';
+    const author = document.createElement('strong');
+    author.textContent = message.sender;
+    const date = document.createElement('small');
+    date.textContent = new Date(message.date).toLocaleString();
+    const body = document.createElement('p');
+    body.textContent = message.body;
+    box.append(author, ' от: ', date, body);
+    list.append(box);
+  }
+
+  function poll() {
+    let delay = 3000;
+    fetch(area.dataset.pollUrl + '?after=' + lastId, {credentials: 'same-origin'})
+      .then((response) => {
+        delay = 1000 * (parseInt(response.headers.get('Retry-After'), 10) || 3);
+        return response.json();
+      })
+      .then((data) => data.messages.forEach(append))
+      .catch(() => null)
+      .finally(() => setTimeout(poll, delay));
+  }
+
+  const scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+  let socket = null;
+  if ('WebSocket' in window) {
+    socket = new WebSocket(scheme + window.location.host + '/ws/directs/');
+    socket.onmessage = (event) => append(JSON.parse(event.data).message);
+    socket.onclose = () => {
+      socket = null;
+      poll();
+    };
+  } else {
+    poll();
+  }
+
+  form.addEventListener('submit', (event) => {
+    const body = form.elements.body.value.trim();
+    if (!body) {
+      return;
+    }
+    event.preventDefault();
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({to_user: partner, body: body}));
+      form.elements.body.value = '';
+      return;
+    }
+    fetch(form.action, {
+      method: 'POST',
+      body: new FormData(form),
+      headers: {Accept: 'application/json'},
+      credentials: 'same-origin',
+    })
+      .then((response) => response.json())
+      .then((data) => append(data.message));
+    form.elements.body.value = '';
+  });
+})();
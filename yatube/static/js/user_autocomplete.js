@@ -0,0 +1,40 @@
+(function () {
+  const input = document.querySelector('input[data-autocomplete-url]');
+  const list = document.getElementById('user-suggestions');
+  if (!input || !list) {
+    return;
+  }
+  let timer = null;
+  let controller = null;
+
+  function render(results) {
+    list.replaceChildren(...results.map(function (user) {
+      const option = document.createElement('option');
+      option.value = user.username;
+      option.label = [user.first_name, user.last_name].join(' ').trim();
+      return option;
+    }));
+  }
+
+  function load() {
+    const query = input.value.trim();
+    if (!query) {
+      render([]);
+      return;
+    }
+    if (controller) {
+      controller.abort();
+    }
+    controller = new AbortController();
+    const url = input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query);
+    fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}})
+      .then(function (response) { return response.json(); })
+      .then(function (data) { render(data.results); })
+      .catch(function () {});
+  }
+
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(load, 150);
+  });
+})();
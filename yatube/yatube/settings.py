@@ -31,20 +31,84 @@ INSTALLED_APPS = [
 ]
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
-} 
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'default'),
+    },
+    'fragments': {
+        'BACKEND': os.getenv(
+            'FRAGMENT_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('FRAGMENT_CACHE_LOCATION', 'fragments'),
+    },
+}
+POSTS_FRAGMENT_CACHE = 'fragments'
+# Кэш страниц целиком для анонимных посетителей (posts.pagecache).
+POSTS_PAGE_CACHE = 'default'
+
+POSTS_TIMELINE = {
+    'ENABLED': False,
+    'BACKEND': 'posts.timeline.DatabaseTimeline',
+    'MAX_ENTRIES': 500,
+    'CELEBRITY_FOLLOWERS': 1000,
+    'CELEBRITY_CACHE_TIMEOUT': 300,
+}
+# Лайки и дизлайки через журнал и пакетную запись (posts.reactions).
+POSTS_REACTIONS_WRITE_BEHIND = {
+    'ENABLED': os.getenv('REACTIONS_WRITE_BEHIND') == '1',
+    'LOG_DIR': os.path.join(BASE_DIR, 'reactions_log'),
+    'FLUSH_INTERVAL': 0.3,
+    'BATCH_SIZE': 1000,
+    # fsync на каждый клик; иначе раз на пакет (см. ReactionBuffer).
+    'FSYNC': False,
+    # Сколько живёт в общем кэше ещё не записанный клик, в секундах.
+    'PENDING_TIMEOUT': 60 * 60,
+}
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Потолок запросов к БД на один ответ. По умолчанию превышение пишется
+# предупреждением в лог; в строгом режиме (QUERY_BUDGETS_STRICT=1 или
+# тесты, см. core.test_runner) оно роняет запрос.
+QUERY_BUDGETS = {
+    'posts:index': 12,
+    'posts:group_list': 12,
+    'posts:profile': 15,
+    'posts:post_detail': 12,
+    'posts:post_comments': 4,
+    'posts:follow_index': 12,
+    'posts:post_search': 8,
+    'posts:inbox': 10,
+    'posts:directs': 12,
+    'posts:poll_directs': 10,
+    'posts:send_direct': 15,
+    'posts:usersearch': 6,
+    'posts:user_autocomplete': 5,
+    'posts:api_token': 4,
+    'posts:api_posts': 4,
+    'posts:api_group_posts': 4,
+    'posts:api_user_posts': 4,
+    'posts:api_follow_feed': 6,
+    'posts:api_post_detail': 4,
+    'posts:api_like': 13,
+    'posts:api_dislike': 13,
+    'posts:api_follow': 12,
+    'posts:api_directs': 4,
+    'posts:api_direct_thread': 15,
+}
+QUERY_BUDGETS_STRICT = os.getenv('QUERY_BUDGETS_STRICT') == '1'
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
@@ -60,6 +124,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.directs.directs_count',
                 #'core.context_processors.modal_comment.get_context_data',
             ],
         },
@@ -67,15 +132,77 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Ленты, профиль, пост и входящие — async def (posts.async_views).
+# yatube/asgi.py включает их по умолчанию, WSGI остаётся на синхронных.
+POSTS_ASYNC_VIEWS = os.getenv('POSTS_ASYNC_VIEWS') == '1'
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
+# Пауза между опросами диалога без WebSocket, в секундах.
+DIRECTS_POLL_INTERVAL = 3
+
+# Без воркера (manage.py runworker) задачи выполняются сразу в запросе.
+TASKS_ALWAYS_EAGER = DEBUG
 
 
+SQLITE_PROFILES = {
+    'development': {
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pragmas': {'busy_timeout': 5000},
+        },
+    },
+    'production': {
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'cache_size': -64000,
+                'mmap_size': 268435456,
+                'temp_store': 'MEMORY',
+            },
+        },
+    },
+}
+SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'development')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        **SQLITE_PROFILES[SQLITE_PROFILE],
     }
 }
 
+# Реплики для чтения: пути к копиям SQLite через запятую. Локально
+# их наполняет manage.py sync_replicas.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.getenv('SQLITE_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    profile = SQLITE_PROFILES[SQLITE_PROFILE]
+    DATABASES[alias] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': path,
+        **profile,
+        'OPTIONS': {
+            **profile['OPTIONS'],
+            'pragmas': {**profile['OPTIONS']['pragmas'], 'query_only': 1},
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 5
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -3,8 +3,11 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import request_stats
+
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path('admin/stats/requests/', request_stats, name='request_stats'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),